@@ -4,7 +4,6 @@ Script to add sample products to the database
 """
 import os
 import sys
-import json
 from datetime import datetime
 
 # Add the backend directory to the Python path
@@ -158,9 +157,9 @@ def create_sample_products():
                 is_on_sale=product_data['is_on_sale'],
                 stock=product_data['stock'],
                 section_id=section.id,
-                images=json.dumps(product_data['images']),
-                sizes=json.dumps(product_data['sizes']),
-                colors=json.dumps(product_data['colors']),
+                images=product_data['images'],
+                sizes=product_data['sizes'],
+                colors=product_data['colors'],
                 is_active=True
             )
             
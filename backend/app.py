@@ -1,16 +1,24 @@
 import os
-from flask import Flask, jsonify, send_from_directory
+from flask import Flask, jsonify
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from config import Config
 from models import db
 from routes.auth import auth_bp
 from routes.admin import admin_bp
-from routes.products import products_bp
+from routes.products import products_bp, catalog_validator
 from routes.cart import cart_bp
 from routes.wishlist import wishlist_bp
 from routes.orders import orders_bp
 from routes.addresses import addresses_bp
+from utils.query_counter import query_budget
+from utils.cache import init_cache, catalog_cache
+from utils.reservations import init_reservations
+from utils.receipt_jobs import init_receipt_renderer
+from utils.storage import init_storage
+from utils.index_advisor import init_index_advisor
+from utils.http_cache import conditional
+from utils.uploads import send_upload
 
 def create_app():
     app = Flask(__name__)
@@ -20,9 +28,14 @@ def create_app():
     CORS(app, resources={
         r"/api/*": {"origins": "*"},
         r"/uploads/*": {"origins": "*"}
-    })
+    }, expose_headers=['X-Next-Cursor', 'ETag', 'Last-Modified', 'Location', 'Retry-After'])
     db.init_app(app)
     JWTManager(app)
+    init_cache(app)
+    init_reservations(app)
+    init_receipt_renderer(app)
+    init_storage(app)
+    init_index_advisor(app)
     
     # Create upload folder
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -36,29 +49,15 @@ def create_app():
     app.register_blueprint(orders_bp, url_prefix='/api/orders')
     app.register_blueprint(addresses_bp, url_prefix='/api/addresses')
     
-    # Serve uploaded files
+    # Serve uploaded files (see utils/uploads.py)
     @app.route('/api/admin/uploads/<path:filename>')
     def uploaded_file_api(filename):
-        try:
-            response = send_from_directory(app.config['UPLOAD_FOLDER'], filename)
-            response.headers['Access-Control-Allow-Origin'] = '*'
-            response.headers['Cache-Control'] = 'public, max-age=3600'
-            return response
-        except Exception as e:
-            print(f"Error serving file {filename}: {e}")
-            return jsonify({'error': 'File not found'}), 404
+        return send_upload(filename)
     
     # Alternative route for direct access
     @app.route('/uploads/<path:filename>')
     def uploaded_file_direct(filename):
-        try:
-            response = send_from_directory(app.config['UPLOAD_FOLDER'], filename)
-            response.headers['Access-Control-Allow-Origin'] = '*'
-            response.headers['Cache-Control'] = 'public, max-age=3600'
-            return response
-        except Exception as e:
-            print(f"Error serving file {filename}: {e}")
-            return jsonify({'error': 'File not found'}), 404
+        return send_upload(filename)
     
     # Health check
     @app.route('/api/health')
@@ -89,10 +88,11 @@ def create_app():
     
     # Public sections endpoint
     @app.route('/api/sections')
+    @query_budget(3)  # the catalog version, the validator and the read
+    @conditional(catalog_validator)
     def get_sections():
-        from models import Section
-        sections = Section.query.filter_by(is_active=True).order_by(Section.display_order).all()
-        return jsonify([section.to_dict() for section in sections])
+        from routes.products import load_active_sections
+        return jsonify(catalog_cache().get_or_set('sections', None, load_active_sections))
     
     # Error handlers
     @app.errorhandler(404)
@@ -60,8 +60,28 @@ class Config:
     # File Upload Settings
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 
                                   os.getenv('UPLOAD_FOLDER', 'uploads'))
+    # Public URL of UPLOAD_FOLDER with local storage (see STORAGE_BACKEND)
+    UPLOAD_BASE_URL = os.getenv('UPLOAD_BASE_URL', 'http://localhost:5000/uploads')
     MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
+    # Rendered receipt PDFs; keep this outside UPLOAD_FOLDER, which is served publicly
+    RECEIPT_CACHE_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                        os.getenv('RECEIPT_CACHE_FOLDER', 'receipt_cache'))
+    # Receipts are pre-rendered by this many worker processes (0 renders inline on download)
+    RECEIPT_WORKERS = int(os.getenv('RECEIPT_WORKERS', 2))
+    RECEIPT_QUEUE_SIZE = int(os.getenv('RECEIPT_QUEUE_SIZE', 64))
+    # Uploaded import sheets, kept until their job completes so it can be resumed
+    IMPORT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 os.getenv('IMPORT_FOLDER', 'import_files'))
+    # Worker processes that optimize images during bulk product imports
+    BULK_IMAGE_WORKERS = int(os.getenv('BULK_IMAGE_WORKERS', os.cpu_count() or 2))
+    # Unreferenced product images are only deleted once unused for this many seconds
+    IMAGE_GC_GRACE = int(os.getenv('IMAGE_GC_GRACE', 24 * 60 * 60))
     ALLOWED_EXTENSIONS = set(os.getenv('ALLOWED_EXTENSIONS', 'png,jpg,jpeg,gif,webp').split(','))
+    # How /uploads files are sent: '' streams them from Python; 'x-accel-redirect' (nginx)
+    # or 'x-sendfile' (Apache/lighttpd) lets the web server send them
+    UPLOAD_SENDFILE = os.getenv('UPLOAD_SENDFILE', '').lower()
+    # nginx internal location aliasing UPLOAD_FOLDER, used with x-accel-redirect
+    UPLOAD_ACCEL_PREFIX = os.getenv('UPLOAD_ACCEL_PREFIX', '/protected-uploads/')
     
     # Domain Configuration
     MAIN_DOMAIN = os.getenv('MAIN_DOMAIN', 'truaxis.com')
@@ -79,12 +99,40 @@ class Config:
     
     # Application Settings
     ITEMS_PER_PAGE = int(os.getenv('ITEMS_PER_PAGE', 20))
+    PRODUCTS_PAGE_SIZE = int(os.getenv('PRODUCTS_PAGE_SIZE', 100))
+    PRODUCTS_MAX_PAGE_SIZE = int(os.getenv('PRODUCTS_MAX_PAGE_SIZE', 200))
+    ORDERS_PAGE_SIZE = int(os.getenv('ORDERS_PAGE_SIZE', 20))
+    ORDERS_MAX_PAGE_SIZE = int(os.getenv('ORDERS_MAX_PAGE_SIZE', 100))
+    ADMIN_PAGE_SIZE = int(os.getenv('ADMIN_PAGE_SIZE', 20))
+    ADMIN_MAX_PAGE_SIZE = int(os.getenv('ADMIN_MAX_PAGE_SIZE', 200))
+    # Seconds a filtered admin listing's total is reused with count=estimate
+    LISTING_COUNT_CACHE_TTL = int(os.getenv('LISTING_COUNT_CACHE_TTL', 60))
     SESSION_TIMEOUT = int(os.getenv('SESSION_TIMEOUT', 60))
     
+    # Search Settings
+    # memory: in-process inverted index; fulltext: MySQL FULLTEXT / PostgreSQL tsvector
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'memory').lower()
+    SEARCH_INDEX_TTL = int(os.getenv('SEARCH_INDEX_TTL', 300))
+    # Storefront search results (the admin product search isn't capped)
+    SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', 1000))
+    
+    # Checkout Settings
+    # Retries of a checkout that hit a deadlock / lock timeout, with exponential backoff (seconds)
+    CHECKOUT_MAX_RETRIES = int(os.getenv('CHECKOUT_MAX_RETRIES', 5))
+    CHECKOUT_RETRY_BACKOFF = float(os.getenv('CHECKOUT_RETRY_BACKOFF', 0.05))
+    
+    # Stock Reservation Settings
+    # memory (per process), redis (shared between workers), fakeredis (tests) or null (disabled)
+    RESERVATION_BACKEND = os.getenv('RESERVATION_BACKEND', 'memory').lower()
+    RESERVATION_TTL = int(os.getenv('RESERVATION_TTL', 900))
+    RESERVATION_SWEEP_INTERVAL = int(os.getenv('RESERVATION_SWEEP_INTERVAL', 60))
+    
     # Logging Settings
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FILE = os.getenv('LOG_FILE', 'logs/truaxis.log')
     LOG_SQL_QUERIES = os.getenv('LOG_SQL_QUERIES', 'False').lower() == 'true'
+    # Development only: EXPLAIN each new query shape per endpoint and flag full scans (utils/index_advisor.py)
+    INDEX_ADVISOR = os.getenv('INDEX_ADVISOR', 'False').lower() == 'true'
     
     # Email Settings (Optional)
     MAIL_SERVER = os.getenv('MAIL_SERVER')
@@ -110,6 +158,13 @@ class Config:
     AWS_S3_BUCKET = os.getenv('AWS_S3_BUCKET')
     AWS_S3_REGION = os.getenv('AWS_S3_REGION', 'us-east-1')
     AWS_S3_CUSTOM_DOMAIN = os.getenv('AWS_S3_CUSTOM_DOMAIN')
+    # Any S3-compatible store (MinIO, a local moto server in tests); unset for AWS
+    AWS_S3_ENDPOINT_URL = os.getenv('AWS_S3_ENDPOINT_URL')
+    # Uploads larger than this are split into parts sent S3_MAX_CONCURRENCY at a time
+    S3_MULTIPART_THRESHOLD = int(os.getenv('S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024))
+    S3_MAX_CONCURRENCY = int(os.getenv('S3_MAX_CONCURRENCY', 10))
+    # Where uploads are stored: local (UPLOAD_FOLDER) or s3
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 's3' if USE_S3_STORAGE else 'local')
     
     # Cache Settings (Optional)
     REDIS_HOST = os.getenv('REDIS_HOST', 'localhost')
@@ -118,6 +173,7 @@ class Config:
     REDIS_PASSWORD = os.getenv('REDIS_PASSWORD')
     CACHE_TYPE = os.getenv('CACHE_TYPE', 'simple')
     CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 300))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
     
     # Production Settings
     PREFERRED_URL_SCHEME = os.getenv('PREFERRED_URL_SCHEME', 'https')
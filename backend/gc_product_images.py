@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Remove product images that no product references any more.
+
+Deleting or editing a product removes the images it dropped right away,
+unless they were uploaded within IMAGE_GC_GRACE seconds (they may belong to
+a product that is still being filled in). This sweep collects those, and
+any files left behind by older versions. Run it from cron, e.g. daily.
+
+Usage:
+    python gc_product_images.py            # remove unused images
+    python gc_product_images.py --dry-run  # only list them
+"""
+
+import argparse
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from utils.image_store import IMAGE_FOLDERS, unused_images, collect_unused_images
+
+def gc_product_images(dry_run=False):
+    app = create_app()
+
+    with app.app_context():
+        try:
+            for folder in IMAGE_FOLDERS:
+                if dry_run:
+                    filenames = unused_images(folder)
+                    for filename in filenames:
+                        print(f"   {folder}/{filename}")
+                    print(f"ℹ️  {len(filenames)} unused images in '{folder}'")
+                else:
+                    filenames = collect_unused_images(folder)
+                    print(f"✅ Removed {len(filenames)} unused images from '{folder}'")
+
+            print("\n✅ Cleanup completed successfully!")
+
+        except Exception as e:
+            print(f"\n❌ Cleanup failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Remove unreferenced product images')
+    parser.add_argument('--dry-run', action='store_true', help='list unused images without removing them')
+    args = parser.parse_args()
+
+    print("Starting product image cleanup...")
+    print("=" * 50)
+    gc_product_images(args.dry_run)
+    print("=" * 50)
@@ -111,9 +111,9 @@ def init_database():
                         is_on_sale=product_data.get('is_on_sale', False),
                         stock=product_data.get('stock', 0),
                         section_id=section.id,
-                        images=json.dumps(product_data.get('images', [])),
-                        sizes=json.dumps(product_data.get('sizes', [])),
-                        colors=json.dumps(product_data.get('colors', [])),
+                        images=product_data.get('images', []),
+                        sizes=product_data.get('sizes', []),
+                        colors=product_data.get('colors', []),
                         is_active=True
                     )
                     db.session.add(product)
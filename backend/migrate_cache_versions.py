@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the cache_versions table
+(the catalog cache version shared by every worker when CACHE_TYPE=simple)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db, CacheVersion
+
+def migrate_cache_versions():
+    app = create_app()
+
+    with app.app_context():
+        try:
+            if db.inspect(db.engine).has_table(CacheVersion.__tablename__):
+                print("ℹ️  'cache_versions' table already exists")
+                return
+
+            CacheVersion.__table__.create(db.engine)
+            print("✅ Created 'cache_versions' table")
+
+            print("\n✅ Migration completed successfully!")
+
+        except Exception as e:
+            print(f"\n❌ Migration failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    print("Starting cache versions migration...")
+    print("=" * 50)
+    migrate_cache_versions()
+    print("=" * 50)
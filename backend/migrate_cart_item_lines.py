@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the unique index on cart_items
+(user_id, product_id, size, color) that the cart upsert relies on.
+
+Missing sizes/colors are rewritten from NULL to '' (NULLs never conflict in a
+unique index), and duplicate lines left by concurrent adds are merged into
+the oldest one first.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db, CartItem
+
+OPTION_COLUMNS = ('size', 'color')
+
+def merge_duplicate_lines(conn):
+    duplicates = conn.execute(db.text(
+        "SELECT user_id, product_id, size, color, MIN(id), SUM(quantity) FROM cart_items "
+        "GROUP BY user_id, product_id, size, color HAVING COUNT(*) > 1"
+    )).fetchall()
+    for user_id, product_id, size, color, keep_id, quantity in duplicates:
+        key = {'user_id': user_id, 'product_id': product_id, 'size': size, 'color': color, 'keep_id': keep_id}
+        conn.execute(db.text(
+            "DELETE FROM cart_items WHERE user_id = :user_id AND product_id = :product_id "
+            "AND size = :size AND color = :color AND id <> :keep_id"
+        ), key)
+        conn.execute(db.text("UPDATE cart_items SET quantity = :quantity WHERE id = :keep_id"),
+                     {'quantity': quantity, 'keep_id': keep_id})
+    return len(duplicates)
+
+def migrate_cart_item_lines():
+    app = create_app()
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        index = next(index for index in CartItem.__table__.indexes if index.name == 'uq_cart_items_line')
+
+        try:
+            if index.name in {existing['name'] for existing in db.inspect(db.engine).get_indexes('cart_items')}:
+                print(f"ℹ️  '{index.name}' already exists")
+                return
+
+            with db.engine.begin() as conn:
+                for column in OPTION_COLUMNS:
+                    result = conn.execute(db.text(f"UPDATE cart_items SET {column} = '' WHERE {column} IS NULL"))
+                    print(f"✅ Set {result.rowcount} missing '{column}' values to ''")
+
+                merged = merge_duplicate_lines(conn)
+                print(f"✅ Merged {merged} sets of duplicate cart lines")
+
+                if dialect in ('mysql', 'mariadb'):
+                    for column in OPTION_COLUMNS:
+                        conn.execute(db.text(f"ALTER TABLE cart_items MODIFY {column} VARCHAR(50) NOT NULL DEFAULT ''"))
+                    print("✅ Made size/color NOT NULL DEFAULT ''")
+                elif dialect == 'postgresql':
+                    for column in OPTION_COLUMNS:
+                        conn.execute(db.text(
+                            f"ALTER TABLE cart_items ALTER COLUMN {column} SET DEFAULT '', "
+                            f"ALTER COLUMN {column} SET NOT NULL"
+                        ))
+                    print("✅ Made size/color NOT NULL DEFAULT ''")
+                else:
+                    print(f"ℹ️  {dialect} keeps size/color nullable; the app writes '' itself")
+
+            index.create(db.engine)
+            print(f"✅ Created index '{index.name}'")
+
+            print("\n✅ Migration completed successfully!")
+
+        except Exception as e:
+            print(f"\n❌ Migration failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    print("Starting cart item line migration...")
+    print("=" * 50)
+    migrate_cart_item_lines()
+    print("=" * 50)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the import_jobs and import_rows tables
+(checkpoints and per-row results of bulk product imports)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db, ImportJob, ImportRow
+
+def migrate_import_jobs():
+    app = create_app()
+
+    with app.app_context():
+        try:
+            inspector = db.inspect(db.engine)
+            for model in (ImportJob, ImportRow):
+                if inspector.has_table(model.__tablename__):
+                    print(f"ℹ️  '{model.__tablename__}' table already exists")
+                    continue
+
+                model.__table__.create(db.engine)
+                print(f"✅ Created '{model.__tablename__}' table")
+
+            print("\n✅ Migration completed successfully!")
+
+        except Exception as e:
+            print(f"\n❌ Migration failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    print("Starting import jobs migration...")
+    print("=" * 50)
+    migrate_import_jobs()
+    print("=" * 50)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Migration script to add products.image_variants and backfill it: srcset
+variants (narrower JPEG/WebP/AVIF copies) are generated for every uploaded
+image that doesn't have them yet.
+
+Safe to run again; images that already have a manifest are left alone.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from io import BytesIO
+from PIL import Image
+from app import create_app
+from models import db, Product
+from utils.images import uploaded_file, load_manifest, save_variants, image_variants
+from utils.storage import storage
+
+def add_column():
+    columns = [column['name'] for column in db.inspect(db.engine).get_columns('products')]
+    if 'image_variants' in columns:
+        print("ℹ️  'image_variants' column already exists")
+        return
+
+    column_type = {'postgresql': 'JSONB', 'mysql': 'JSON', 'mariadb': 'JSON'}.get(db.engine.dialect.name, 'TEXT')
+    with db.engine.begin() as conn:
+        conn.execute(db.text(f"ALTER TABLE products ADD COLUMN image_variants {column_type} NULL"))
+    print("✅ Added 'image_variants' column to products table")
+
+def generate_missing_variants(urls):
+    generated = 0
+    for url in urls:
+        location = uploaded_file(storage(), url)
+        if not location:
+            continue
+        folder, filename = location
+        if not storage().exists(f'{folder}/{filename}') or load_manifest(storage(), folder, filename) is not None:
+            continue
+        try:
+            with storage().open(f'{folder}/{filename}') as f:
+                data = f.read()
+            with Image.open(BytesIO(data)) as img:
+                img.load()
+                save_variants(img.convert('RGB'), storage(), folder, filename)
+            generated += 1
+        except Exception as e:
+            print(f"⚠️  Skipped {url}: {e}")
+    return generated
+
+def migrate_product_image_variants():
+    app = create_app()
+
+    with app.app_context():
+        try:
+            add_column()
+
+            generated = 0
+            updated = 0
+            for product in Product.query.all():
+                generated += generate_missing_variants(product.images or [])
+                variants = image_variants(product.images, storage())
+                if product.image_variants != variants:
+                    product.image_variants = variants
+                    updated += 1
+            db.session.commit()
+            print(f"✅ Generated variants for {generated} images")
+            print(f"✅ Updated image_variants of {updated} products")
+
+            print("\n✅ Migration completed successfully!")
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"\n❌ Migration failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    print("Starting product image variants migration...")
+    print("=" * 50)
+    migrate_product_image_variants()
+    print("=" * 50)
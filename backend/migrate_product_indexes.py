@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the composite indexes used by storefront product listing
+(keyset pagination on newest / price / title, optionally filtered by section)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db, Product
+
+def migrate_product_indexes():
+    app = create_app()
+
+    with app.app_context():
+        existing = {index['name'] for index in db.inspect(db.engine).get_indexes('products')}
+
+        for index in Product.__table__.indexes:
+            if index.name in existing:
+                print(f"ℹ️  '{index.name}' already exists")
+                continue
+            index.create(db.engine)
+            print(f"✅ Created index '{index.name}'")
+
+        print("\n✅ Migration completed successfully!")
+
+if __name__ == '__main__':
+    print("Starting product index migration...")
+    print("=" * 50)
+    migrate_product_indexes()
+    print("=" * 50)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Migration script to convert products.images / sizes / colors from JSON text
+to native JSON storage (MySQL JSON, PostgreSQL JSONB) and index sizes/colors
+so storefront size and color filters can be answered by the database.
+
+On SQLite the columns stay TEXT; only malformed values are repaired.
+"""
+
+import sys
+import os
+import json
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db
+
+JSON_COLUMNS = ('images', 'sizes', 'colors')
+
+def normalize_value(raw):
+    """Return valid JSON list text for a legacy column value"""
+    if raw is None or not str(raw).strip():
+        return '[]'
+    try:
+        value = json.loads(raw)
+    except (TypeError, ValueError):
+        # Salvage comma separated values written by hand
+        value = [part.strip() for part in str(raw).split(',') if part.strip()]
+    if not isinstance(value, list):
+        value = [value]
+    return json.dumps(value)
+
+def normalize_rows(conn):
+    rows = conn.execute(db.text(f"SELECT id, {', '.join(JSON_COLUMNS)} FROM products")).fetchall()
+    fixed = 0
+    for row in rows:
+        updates = {}
+        for column, raw in zip(JSON_COLUMNS, row[1:]):
+            if not isinstance(raw, str) and raw is not None:
+                continue  # Already decoded by a native JSON column
+            normalized = normalize_value(raw)
+            if normalized != raw:
+                updates[column] = normalized
+        if updates:
+            assignments = ', '.join(f'{column} = :{column}' for column in updates)
+            conn.execute(db.text(f"UPDATE products SET {assignments} WHERE id = :id"), {**updates, 'id': row[0]})
+            fixed += 1
+    return fixed
+
+def create_index(statement, column):
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(db.text(statement))
+        print(f"✅ Indexed '{column}' elements")
+    except Exception as e:
+        print(f"ℹ️  Skipped '{column}' element index: {e}")
+
+def migrate_product_json_columns():
+    app = create_app()
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        column_types = {column['name']: str(column['type']).upper()
+                        for column in db.inspect(db.engine).get_columns('products')}
+
+        try:
+            with db.engine.begin() as conn:
+                fixed = normalize_rows(conn)
+                print(f"✅ Normalized {fixed} product rows")
+
+                if dialect in ('mysql', 'mariadb'):
+                    for column in JSON_COLUMNS:
+                        if 'JSON' in column_types.get(column, ''):
+                            print(f"ℹ️  '{column}' is already JSON")
+                            continue
+                        conn.execute(db.text(f"ALTER TABLE products MODIFY {column} JSON NULL"))
+                        print(f"✅ Converted '{column}' to JSON")
+
+                elif dialect == 'postgresql':
+                    for column in JSON_COLUMNS:
+                        if 'JSON' in column_types.get(column, ''):
+                            print(f"ℹ️  '{column}' is already JSONB")
+                            continue
+                        conn.execute(db.text(
+                            f"ALTER TABLE products ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"
+                        ))
+                        print(f"✅ Converted '{column}' to JSONB")
+
+                else:
+                    print(f"ℹ️  {dialect} keeps JSON as TEXT, no column changes needed")
+
+            # Element indexes for the size/color filters (best effort, they depend on server version)
+            if dialect in ('mysql', 'mariadb'):
+                for column in ('sizes', 'colors'):
+                    create_index(f"CREATE INDEX ix_products_{column}_mv ON products "
+                                 f"((CAST({column} AS CHAR(50) ARRAY)))", column)
+            elif dialect == 'postgresql':
+                for column in ('sizes', 'colors'):
+                    create_index(f"CREATE INDEX IF NOT EXISTS ix_products_{column}_gin "
+                                 f"ON products USING GIN ({column})", column)
+
+            print("\n✅ Migration completed successfully!")
+
+        except Exception as e:
+            print(f"\n❌ Migration failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    print("Starting product JSON column migration...")
+    print("=" * 50)
+    migrate_product_json_columns()
+    print("=" * 50)
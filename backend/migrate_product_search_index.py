@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the full-text index used when SEARCH_BACKEND=fulltext
+(MySQL FULLTEXT or a PostgreSQL GIN index over the product tsvector)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db
+
+INDEX_NAME = 'ft_products_search'
+
+def migrate_product_search_index():
+    app = create_app()
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        existing = {index['name'] for index in db.inspect(db.engine).get_indexes('products')}
+
+        if INDEX_NAME in existing:
+            print(f"ℹ️  '{INDEX_NAME}' already exists")
+            return
+
+        try:
+            with db.engine.begin() as conn:
+                if dialect in ('mysql', 'mariadb'):
+                    conn.execute(db.text(
+                        f"ALTER TABLE products ADD FULLTEXT INDEX {INDEX_NAME} (title, sku, description)"
+                    ))
+                elif dialect == 'postgresql':
+                    conn.execute(db.text(
+                        f"CREATE INDEX {INDEX_NAME} ON products USING GIN ("
+                        "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(sku, '') "
+                        "|| ' ' || coalesce(description, '')))"
+                    ))
+                else:
+                    print(f"ℹ️  {dialect} has no full-text index support, SEARCH_BACKEND=memory will be used")
+                    return
+
+            print(f"✅ Created full-text index '{INDEX_NAME}'")
+            print("\n✅ Migration completed successfully!")
+            print("Set SEARCH_BACKEND=fulltext to use it")
+
+        except Exception as e:
+            print(f"\n❌ Migration failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    print("Starting product search index migration...")
+    print("=" * 50)
+    migrate_product_search_index()
+    print("=" * 50)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the receipt_jobs table
+(tracks receipts being pre-rendered by the background worker pool)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db, ReceiptJob
+
+def migrate_receipt_jobs():
+    app = create_app()
+
+    with app.app_context():
+        try:
+            if db.inspect(db.engine).has_table(ReceiptJob.__tablename__):
+                print("ℹ️  'receipt_jobs' table already exists")
+                return
+
+            ReceiptJob.__table__.create(db.engine)
+            print("✅ Created 'receipt_jobs' table")
+
+            print("\n✅ Migration completed successfully!")
+
+        except Exception as e:
+            print(f"\n❌ Migration failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    print("Starting receipt jobs migration...")
+    print("=" * 50)
+    migrate_receipt_jobs()
+    print("=" * 50)
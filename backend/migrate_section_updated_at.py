@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the updated_at column to the sections table
+(used to validate cached catalog responses with ETag / Last-Modified)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db
+
+def migrate_section_updated_at():
+    app = create_app()
+
+    with app.app_context():
+        try:
+            columns = [column['name'] for column in db.inspect(db.engine).get_columns('sections')]
+            if 'updated_at' in columns:
+                print("ℹ️  'updated_at' column already exists")
+                return
+
+            with db.engine.begin() as conn:
+                timestamp_type = 'TIMESTAMP' if db.engine.dialect.name == 'postgresql' else 'DATETIME'
+                conn.execute(db.text(f"ALTER TABLE sections ADD COLUMN updated_at {timestamp_type} NULL"))
+                conn.execute(db.text("UPDATE sections SET updated_at = created_at"))
+            print("✅ Added 'updated_at' column to sections table")
+
+            print("\n✅ Migration completed successfully!")
+
+        except Exception as e:
+            print(f"\n❌ Migration failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    print("Starting section updated_at migration...")
+    print("=" * 50)
+    migrate_section_updated_at()
+    print("=" * 50)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Migration script to create the stored_images table
+(hashes of uploaded image files, so uploading a file again reuses the stored image)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db, StoredImage
+
+def migrate_stored_images():
+    app = create_app()
+
+    with app.app_context():
+        try:
+            if db.inspect(db.engine).has_table(StoredImage.__tablename__):
+                print("ℹ️  'stored_images' table already exists")
+                return
+
+            StoredImage.__table__.create(db.engine)
+            print("✅ Created 'stored_images' table")
+
+            print("\n✅ Migration completed successfully!")
+
+        except Exception as e:
+            print(f"\n❌ Migration failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    print("Starting stored images migration...")
+    print("=" * 50)
+    migrate_stored_images()
+    print("=" * 50)
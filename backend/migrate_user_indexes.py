@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the indexes used by per-user and order queries
+(wishlist, addresses, order history newest first, admin order listing by
+status, order items / payment details of an order)
+
+cart_items gets its unique line index from migrate_cart_item_lines.py.
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import create_app
+from models import db, WishlistItem, Address, Order, OrderItem, PaymentDetail
+
+INDEXED_MODELS = (WishlistItem, Address, Order, OrderItem, PaymentDetail)
+
+def migrate_user_indexes():
+    app = create_app()
+
+    with app.app_context():
+        inspector = db.inspect(db.engine)
+
+        for model in INDEXED_MODELS:
+            table = model.__table__
+            existing = {index['name'] for index in inspector.get_indexes(table.name)}
+
+            for index in table.indexes:
+                if index.name in existing:
+                    print(f"ℹ️  '{index.name}' already exists")
+                    continue
+                index.create(db.engine)
+                print(f"✅ Created index '{index.name}'")
+
+        print("\n✅ Migration completed successfully!")
+
+if __name__ == '__main__':
+    print("Starting user index migration...")
+    print("=" * 50)
+    migrate_user_indexes()
+    print("=" * 50)
@@ -1,9 +1,70 @@
+import json
+import uuid
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.mutable import MutableList
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
 
+# Dialects that store JSONList natively (see migrate_product_json_columns.py)
+NATIVE_JSON_DIALECTS = ('mysql', 'mariadb', 'postgresql')
+
+class JSONList(db.TypeDecorator):
+    """
+    A list stored as JSON. MySQL uses the native JSON type and PostgreSQL uses
+    JSONB, so the database can filter on elements (see json_list_contains).
+    Other databases store JSON text. Values are decoded once when the row is
+    loaded and kept on the instance.
+    """
+    impl = db.Text
+    cache_ok = True
+    
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'postgresql':
+            return dialect.type_descriptor(JSONB())
+        if dialect.name in NATIVE_JSON_DIALECTS:
+            return dialect.type_descriptor(db.JSON())
+        return dialect.type_descriptor(db.Text())
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        value = list(value)
+        if dialect.name in NATIVE_JSON_DIALECTS:
+            return value
+        return json.dumps(value)
+    
+    def process_result_value(self, value, dialect):
+        if not value:
+            return []
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
+
+class JSONMutableList(MutableList):
+    """MutableList that also accepts pre-encoded JSON strings on assignment"""
+    
+    @classmethod
+    def coerce(cls, key, value):
+        if isinstance(value, str):
+            value = json.loads(value) if value else []
+        return super().coerce(key, value)
+
+def json_list_contains(column, value):
+    """SQL expression that is true when the JSONList `column` contains `value`"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        return column.op('@>')(db.literal([value], JSONB))
+    if dialect in NATIVE_JSON_DIALECTS:
+        return db.func.json_contains(column, db.func.json_quote(value)) == 1
+    if dialect == 'sqlite':
+        elements = db.func.json_each(column).table_valued('value')
+        return db.select(1).select_from(elements).where(elements.c.value == value).exists()
+    return db.cast(column, db.Text).contains(json.dumps(value), autoescape=True)
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -46,6 +107,10 @@ class User(db.Model):
 
 class Address(db.Model):
     __tablename__ = 'addresses'
+    __table_args__ = (
+        # A user's address book and their default address
+        db.Index('ix_addresses_user_default', 'user_id', 'is_default'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -82,6 +147,7 @@ class Section(db.Model):
     display_order = db.Column(db.Integer, default=0)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     products = db.relationship('Product', backref='section', lazy=True)
@@ -94,11 +160,24 @@ class Section(db.Model):
             'description': self.description,
             'display_order': self.display_order,
             'is_active': self.is_active,
-            'product_count': len(self.products)
+            'product_count': self.product_count
         }
 
 class Product(db.Model):
     __tablename__ = 'products'
+    __table_args__ = (
+        # Storefront listing sort orders (newest, price, title) with and without
+        # a category filter; `id` is the keyset pagination tie-breaker
+        db.Index('ix_products_active_created', 'is_active', 'created_at', 'id'),
+        db.Index('ix_products_active_price', 'is_active', 'price', 'id'),
+        db.Index('ix_products_active_title', 'is_active', 'title', 'id'),
+        db.Index('ix_products_section_created', 'section_id', 'is_active', 'created_at', 'id'),
+        db.Index('ix_products_section_price', 'section_id', 'is_active', 'price', 'id'),
+        db.Index('ix_products_section_title', 'section_id', 'is_active', 'title', 'id'),
+        # Admin listing (active or not, newest first) with and without a section filter
+        db.Index('ix_products_admin_created', 'created_at', 'id'),
+        db.Index('ix_products_admin_section_created', 'section_id', 'created_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     sku = db.Column(db.String(50), unique=True, nullable=False, index=True)
@@ -110,57 +189,90 @@ class Product(db.Model):
     is_on_sale = db.Column(db.Boolean, default=False)
     stock = db.Column(db.Integer, default=0)
     section_id = db.Column(db.Integer, db.ForeignKey('sections.id'), nullable=False)
-    images = db.Column(db.Text)  # JSON string of image URLs
-    sizes = db.Column(db.Text)  # JSON string of sizes
-    colors = db.Column(db.Text)  # JSON string of colors
+    images = db.Column(JSONMutableList.as_mutable(JSONList), default=list)  # image URLs
+    # srcset data for each entry of images, None where there are no variants (see utils/images.py)
+    image_variants = db.Column(JSONMutableList.as_mutable(JSONList), default=list)
+    sizes = db.Column(JSONMutableList.as_mutable(JSONList), default=list)
+    colors = db.Column(JSONMutableList.as_mutable(JSONList), default=list)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def to_dict(self):
-        import json
-        return {
-            'id': self.id,
-            'sku': self.sku,
-            'title': self.title,
-            'slug': self.slug,
-            'description': self.description,
-            'price': self.price,
-            'original_price': self.original_price,
-            'is_on_sale': self.is_on_sale,
-            'stock': self.stock,
-            'section_id': self.section_id,
-            'category': self.section.slug if self.section else None,
-            'images': json.loads(self.images) if self.images else [],
-            'sizes': json.loads(self.sizes) if self.sizes else [],
-            'colors': json.loads(self.colors) if self.colors else [],
-            'is_active': self.is_active
-        }
+    # Keys returned by to_dict, in order; `category` is derived from the section
+    SERIALIZABLE_FIELDS = (
+        'id', 'sku', 'title', 'slug', 'description', 'price', 'original_price',
+        'is_on_sale', 'stock', 'section_id', 'category', 'images', 'image_variants',
+        'sizes', 'colors', 'is_active'
+    )
+    JSON_FIELDS = ('images', 'image_variants', 'sizes', 'colors')
+    
+    @classmethod
+    def columns_for_fields(cls, fields):
+        """Return the column attributes needed to serialize `fields`"""
+        names = {'id'}
+        for field in fields:
+            names.add('section_id' if field == 'category' else field)
+        return [getattr(cls, name) for name in cls.SERIALIZABLE_FIELDS if name in names]
+    
+    def to_dict(self, fields=None):
+        if fields is None:
+            fields = self.SERIALIZABLE_FIELDS
+        
+        data = {}
+        for field in fields:
+            if field == 'category':
+                data[field] = self.section.slug if self.section else None
+            elif field in self.JSON_FIELDS:
+                data[field] = getattr(self, field) or []
+            else:
+                data[field] = getattr(self, field)
+        return data
+
+# Counted in SQL so listing sections does not load every product of every section
+Section.product_count = db.column_property(
+    db.select(db.func.count(Product.id))
+    .where(Product.section_id == Section.id)
+    .correlate_except(Product)
+    .scalar_subquery()
+)
 
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
+    __table_args__ = (
+        # One line per product option, the key the cart upsert conflicts on
+        # (utils/cart_batch.py). No size/color is stored as '': NULLs never collide.
+        db.Index('uq_cart_items_line', 'user_id', 'product_id', 'size', 'color', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, default=1)
-    size = db.Column(db.String(50))
-    color = db.Column(db.String(50))
+    size = db.Column(db.String(50), nullable=False, default='', server_default='')
+    color = db.Column(db.String(50), nullable=False, default='', server_default='')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     product = db.relationship('Product', backref='cart_items')
     
+    @validates('size', 'color')
+    def validate_option(self, key, value):
+        return value or ''
+    
     def to_dict(self):
         return {
             'id': self.id,
             'product': self.product.to_dict() if self.product else None,
             'quantity': self.quantity,
-            'size': self.size,
-            'color': self.color
+            'size': self.size or None,
+            'color': self.color or None
         }
 
 class WishlistItem(db.Model):
     __tablename__ = 'wishlist_items'
+    __table_args__ = (
+        # A user's wishlist and the "already in wishlist" check
+        db.Index('ix_wishlist_items_user_product', 'user_id', 'product_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -177,6 +289,13 @@ class WishlistItem(db.Model):
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    __table_args__ = (
+        # Order history (newest first), admin listing with and without a
+        # status filter, and the admin stats' status counts / recent orders
+        db.Index('ix_orders_user_created', 'user_id', 'created_at'),
+        db.Index('ix_orders_status_created', 'status', 'created_at'),
+        db.Index('ix_orders_created', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     order_number = db.Column(db.String(50), unique=True, nullable=False, index=True)
@@ -193,6 +312,7 @@ class Order(db.Model):
     address = db.relationship('Address', backref='orders')
     order_items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     payment_details = db.relationship('PaymentDetail', backref='order', uselist=False, cascade='all, delete-orphan')
+    receipt_job = db.relationship('ReceiptJob', backref='order', uselist=False, cascade='all, delete-orphan')
     
     def to_dict(self, include_user=False):
         result = {
@@ -213,12 +333,27 @@ class Order(db.Model):
             result['user'] = self.user.to_dict()
             
         return result
+    
+    def to_summary_dict(self, item_count=0, thumbnails=None):
+        """Order list entry: no address, items or payment details (see GET /api/orders/<id>)"""
+        return {
+            'id': self.id,
+            'order_number': self.order_number,
+            'receipt_number': self.receipt_number,
+            'total_amount': self.total_amount,
+            'status': self.status,
+            'payment_method': self.payment_method,
+            'payment_status': self.payment_status,
+            'item_count': item_count,
+            'thumbnails': thumbnails or [],
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Float, nullable=False)
@@ -241,7 +376,7 @@ class PaymentDetail(db.Model):
     __tablename__ = 'payment_details'
     
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False, index=True)
     payment_method = db.Column(db.String(50), nullable=False)  # card, upi
     
     # Card details (encrypted in production)
@@ -266,4 +401,128 @@ class PaymentDetail(db.Model):
             'card_expiry_year': self.card_expiry_year,
             'upi_id': self.upi_id,
             'upi_name': self.upi_name
-        }
\ No newline at end of file
+        }
+
+class ReceiptJob(db.Model):
+    __tablename__ = 'receipt_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), unique=True, nullable=False)
+    receipt_file = db.Column(db.String(100), nullable=False)  # Cache file name of the version being rendered
+    status = db.Column(db.String(20), default='queued')  # queued, rendering, ready, failed
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'order_id': self.order_id,
+            'status': self.status,
+            'error': self.error,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class ImportJob(db.Model):
+    """A bulk product import; chunks_done is the checkpoint a resumed run continues from"""
+    __tablename__ = 'import_jobs'
+    
+    id = db.Column(db.String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    filename = db.Column(db.String(255))  # Name of the uploaded file
+    file_path = db.Column(db.String(500), nullable=False)  # Saved copy the job reads from
+    file_hash = db.Column(db.String(64), index=True)  # SHA-256 of the upload
+    status = db.Column(db.String(20), default='queued')  # queued, running, completed, failed
+    error = db.Column(db.Text)
+    chunk_size = db.Column(db.Integer, nullable=False)
+    chunks_done = db.Column(db.Integer, default=0)
+    total_rows = db.Column(db.Integer)  # Estimated from the file
+    rows_done = db.Column(db.Integer, default=0)
+    created_count = db.Column(db.Integer, default=0)
+    failed_count = db.Column(db.Integer, default=0)
+    images_done = db.Column(db.Integer, default=0)
+    images_failed = db.Column(db.Integer, default=0)
+    run_started_at = db.Column(db.DateTime)  # Start of the latest run
+    run_start_rows = db.Column(db.Integer, default=0)  # rows_done when that run started
+    finished_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    rows = db.relationship('ImportRow', backref='job', lazy='dynamic', cascade='all, delete-orphan')
+    
+    def rows_per_second(self):
+        """Throughput of the latest run"""
+        if not self.run_started_at:
+            return None
+        elapsed = ((self.finished_at or datetime.utcnow()) - self.run_started_at).total_seconds()
+        rows = self.rows_done - (self.run_start_rows or 0)
+        return rows / elapsed if rows > 0 and elapsed > 0 else None
+    
+    def to_dict(self):
+        rate = self.rows_per_second()
+        eta = None
+        if self.status == 'running' and rate and self.total_rows is not None:
+            eta = max(self.total_rows - self.rows_done, 0) / rate
+        return {
+            'job_id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'error': self.error,
+            'progress': {
+                'total_rows': self.total_rows,
+                'finished_rows': self.rows_done,
+                'chunks_done': self.chunks_done,
+                'chunk_size': self.chunk_size,
+                'images_done': self.images_done,
+                'images_failed': self.images_failed,
+                'rows_per_second': round(rate, 1) if rate else None,
+                'eta_seconds': round(eta) if eta is not None else None,
+            },
+            'message': f'Bulk upload completed. {self.created_count} products created.'
+                       if self.status == 'completed' else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class ImportRow(db.Model):
+    """Outcome of one sheet row of an import, written in the same commit as its chunk"""
+    __tablename__ = 'import_rows'
+    __table_args__ = (
+        db.UniqueConstraint('job_id', 'row_number', name='uq_import_rows_job_row'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(32), db.ForeignKey('import_jobs.id'), nullable=False)
+    row_number = db.Column(db.Integer, nullable=False)
+    sku = db.Column(db.String(50))
+    status = db.Column(db.String(20), nullable=False)  # created, error
+    images = db.Column(db.Integer, default=0)
+    error_count = db.Column(db.Integer, default=0)
+    errors = db.Column(JSONList, default=list)
+    
+    def to_dict(self):
+        return {
+            'row': self.row_number,
+            'sku': self.sku,
+            'status': self.status,
+            'images': self.images,
+            'errors': self.errors or []
+        }
+
+class StoredImage(db.Model):
+    """Maps the hash of uploaded bytes to the stored image they produced, so a repeated upload skips decoding"""
+    __tablename__ = 'stored_images'
+    __table_args__ = (
+        db.UniqueConstraint('folder', 'source_hash', name='uq_stored_images_folder_source'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    folder = db.Column(db.String(50), nullable=False)  # Folder under UPLOAD_FOLDER
+    source_hash = db.Column(db.String(64), nullable=False)  # sha256 of the uploaded file
+    filename = db.Column(db.String(100), nullable=False, index=True)  # Content-addressed image it was stored as
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class CacheVersion(db.Model):
+    """Shared cache version counters (see utils/cache.py), so every worker sees a bump"""
+    __tablename__ = 'cache_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
@@ -1,13 +1,21 @@
-from flask import Blueprint, request, jsonify, current_app, send_from_directory, send_file
+from flask import Blueprint, request, jsonify, current_app, send_from_directory, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, User, Section, Product
+from utils.loading import product_loader_options, admin_order_loader_options
+from utils.query_counter import query_budget
+from utils.search import search_product_ids, index_product, unindex_product
+from utils.cache import bump_catalog_version
+from utils.receipt_jobs import prerender_receipt, receipt_response, receipt_status
+from utils.bulk_import import (SHEET_EXTENSIONS, save_upload, sheet_columns, missing_columns,
+                               find_unfinished_import, create_import_job, start_import_job,
+                               import_job_status)
+from utils.pagination import keyset_paginate, count_rows, COUNT_MODES
+from utils.images import image_variants
+from utils.image_store import store_upload, release_images, stored_file_hash, source_hash
+from utils.storage import storage
 from functools import wraps
 from werkzeug.utils import secure_filename
-import json
 import os
-import uuid
-from PIL import Image
-import pandas as pd
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -22,52 +30,63 @@ def admin_required(fn):
         return fn(*args, **kwargs)
     return wrapper
 
+def admin_page(query, table, order_columns, filters):
+    """
+    One page of an admin table, newest first: keyset pagination on
+    `order_columns` (?cursor=, ?per_page=), so deep pages cost the same as the
+    first. The total (?count=estimate|exact|none, see count_rows) comes with
+    the first page only. Returns (items, next_cursor, total, total_is_estimate);
+    raises ValueError with a message for bad arguments.
+    """
+    per_page = request.args.get('per_page', current_app.config['ADMIN_PAGE_SIZE'], type=int)
+    per_page = max(1, min(per_page, current_app.config['ADMIN_MAX_PAGE_SIZE']))
+    cursor = request.args.get('cursor')
+    count = request.args.get('count', 'estimate')
+    if count not in COUNT_MODES:
+        raise ValueError(f'Invalid count. Use one of: {", ".join(COUNT_MODES)}')
+    
+    items, next_cursor = keyset_paginate(query, order_columns, cursor, per_page, descending=True)
+    total, is_estimate = count_rows(query, table, 'none' if cursor else count, filters)
+    return items, next_cursor, total, is_estimate
+
+def page_response(key, items, next_cursor, total, is_estimate):
+    response = jsonify({key: items, 'next_cursor': next_cursor, 'total': total, 'total_is_estimate': is_estimate})
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in current_app.config['ALLOWED_EXTENSIONS']
 
 def save_image(file, folder='products'):
-    """Save uploaded image and return the filename"""
+    """Optimize an uploaded image and return its URL; None if it isn't a valid image"""
     if file and allowed_file(file.filename):
-        # Generate unique filename
-        filename = secure_filename(file.filename)
-        name, ext = os.path.splitext(filename)
-        unique_filename = f"{uuid.uuid4().hex}{ext}"
-        
-        # Create folder if it doesn't exist
-        upload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], folder)
-        os.makedirs(upload_path, exist_ok=True)
-        
-        # Save file
-        file_path = os.path.join(upload_path, unique_filename)
-        file.save(file_path)
-        
-        print(f"Image saved to: {file_path}")  # Debug log
-        
-        # Optimize image
+        # Decoded straight from the request; nothing is written before it is optimized.
+        # A file that was uploaded before returns the stored image without decoding.
         try:
-            with Image.open(file_path) as img:
-                # Convert to RGB if necessary
-                if img.mode in ('RGBA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Resize if too large (max 1200px width)
-                if img.width > 1200:
-                    ratio = 1200 / img.width
-                    new_height = int(img.height * ratio)
-                    img = img.resize((1200, new_height), Image.Resampling.LANCZOS)
-                
-                # Save optimized image
-                img.save(file_path, 'JPEG', quality=85, optimize=True)
+            manifest = store_upload(file.read(), folder)
         except Exception as e:
+            db.session.rollback()
             print(f"Image optimization failed: {e}")
+            return None
         
-        # Return URL that matches our route - use full backend URL
-        image_url = f"http://localhost:5000/uploads/{folder}/{unique_filename}"
+        # Local storage URLs point at /uploads; object storage URLs at the bucket or CDN
+        image_url = storage().url(f"{folder}/{manifest['filename']}")
         print(f"Returning image URL: {image_url}")  # Debug log
         return image_url
     return None
 
+def release_product_images(urls):
+    """Garbage collect images dropped by a committed change; never fails the request"""
+    if not urls:
+        return
+    try:
+        release_images(urls)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error deleting image files: {e}")
+
 # File upload endpoint
 @admin_bp.route('/upload-image', methods=['POST'])
 @admin_required
@@ -79,11 +98,14 @@ def upload_image():
     if file.filename == '':
         return jsonify({'error': 'No file selected'}), 400
     
+    if not allowed_file(file.filename):
+        return jsonify({'error': 'Invalid file type'}), 400
+    
     image_url = save_image(file)
     if image_url:
         return jsonify({'image_url': image_url}), 200
     else:
-        return jsonify({'error': 'Invalid file type'}), 400
+        return jsonify({'error': 'Invalid image file'}), 400
 
 
 
@@ -189,6 +211,7 @@ def toggle_user_status(user_id):
 
 # Section Management
 @admin_bp.route('/sections', methods=['GET'])
+@query_budget(2)
 @admin_required
 def get_sections():
     sections = Section.query.order_by(Section.display_order).all()
@@ -215,6 +238,7 @@ def create_section():
     
     db.session.add(section)
     db.session.commit()
+    bump_catalog_version()
     
     return jsonify({'message': 'Section created successfully', 'section': section.to_dict()}), 201
 
@@ -242,6 +266,7 @@ def update_section(section_id):
         section.is_active = data['is_active']
     
     db.session.commit()
+    bump_catalog_version()
     return jsonify({'message': 'Section updated successfully', 'section': section.to_dict()}), 200
 
 @admin_bp.route('/sections/<int:section_id>', methods=['DELETE'])
@@ -279,6 +304,7 @@ def delete_section(section_id):
     
     db.session.delete(section)
     db.session.commit()
+    bump_catalog_version()
     
     return jsonify({'message': 'Section deleted successfully'}), 200
 
@@ -291,42 +317,36 @@ def toggle_section_status(section_id):
     
     section.is_active = not section.is_active
     db.session.commit()
+    bump_catalog_version()
     
     return jsonify({'message': 'Section status updated successfully', 'section': section.to_dict()}), 200
 
 # Product Management
 @admin_bp.route('/products', methods=['GET'])
+@query_budget(4)  # admin check, page, count; one more when the search index is (re)built
 @admin_required
 def get_all_products():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
     section_id = request.args.get('section_id', type=int)
     search = request.args.get('search', '')
     
-    query = Product.query
+    query = Product.query.options(*product_loader_options())
     
     if section_id:
         query = query.filter_by(section_id=section_id)
     
     if search:
-        query = query.filter(
-            db.or_(
-                Product.title.contains(search),
-                Product.sku.contains(search),
-                Product.description.contains(search)
-            )
-        )
+        query = query.filter(Product.id.in_(search_product_ids(search)))
     
-    products = query.order_by(Product.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        products, next_cursor, total, is_estimate = admin_page(
+            query, Product.__table__, (Product.created_at, Product.id),
+            {'section_id': section_id, 'search': search} if section_id or search else None
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify({
-        'products': [product.to_dict() for product in products.items],
-        'total': products.total,
-        'pages': products.pages,
-        'current_page': page
-    }), 200
+    return page_response('products', [product.to_dict() for product in products],
+                         next_cursor, total, is_estimate), 200
 
 @admin_bp.route('/products/<int:product_id>', methods=['GET'])
 @admin_required
@@ -365,14 +385,17 @@ def create_product():
         is_on_sale=data.get('is_on_sale', False),
         stock=data.get('stock', 0),
         section_id=data['section_id'],
-        images=json.dumps(data.get('images', [])),
-        sizes=json.dumps(data.get('sizes', [])),
-        colors=json.dumps(data.get('colors', [])),
+        images=data.get('images', []),
+        image_variants=image_variants(data.get('images', []), storage()),
+        sizes=data.get('sizes', []),
+        colors=data.get('colors', []),
         is_active=data.get('is_active', True)
     )
     
     db.session.add(product)
     db.session.commit()
+    bump_catalog_version()
+    index_product(product)
     
     return jsonify({'message': 'Product created successfully', 'product': product.to_dict()}), 201
 
@@ -414,16 +437,22 @@ def update_product(product_id):
         if not section:
             return jsonify({'error': 'Section not found'}), 404
         product.section_id = data['section_id']
+    released = []
     if 'images' in data:
-        product.images = json.dumps(data['images'])
+        released = [url for url in product.images or [] if url not in data['images']]
+        product.images = data['images']
+        product.image_variants = image_variants(data['images'], storage())
     if 'sizes' in data:
-        product.sizes = json.dumps(data['sizes'])
+        product.sizes = data['sizes']
     if 'colors' in data:
-        product.colors = json.dumps(data['colors'])
+        product.colors = data['colors']
     if 'is_active' in data:
         product.is_active = data['is_active']
     
     db.session.commit()
+    bump_catalog_version()
+    index_product(product)
+    release_product_images(released)
     return jsonify({'message': 'Product updated successfully', 'product': product.to_dict()}), 200
 
 @admin_bp.route('/products/<int:product_id>/toggle-status', methods=['POST'])
@@ -435,6 +464,8 @@ def toggle_product_status(product_id):
     
     product.is_active = not product.is_active
     db.session.commit()
+    bump_catalog_version()
+    index_product(product)
     
     return jsonify({
         'message': f'Product {"activated" if product.is_active else "deactivated"} successfully',
@@ -465,22 +496,14 @@ def delete_product(product_id):
     if not product:
         return jsonify({'error': 'Product not found'}), 404
     
-    # Delete associated image files
-    try:
-        if product.images:
-            images = json.loads(product.images)
-            for image_url in images:
-                if image_url.startswith('/api/admin/uploads/'):
-                    # Extract filename from URL
-                    filename = image_url.replace('/api/admin/uploads/', '')
-                    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-    except Exception as e:
-        print(f"Error deleting image files: {e}")
-    
+    images = list(product.images or [])
     db.session.delete(product)
     db.session.commit()
+    bump_catalog_version()
+    unindex_product(product_id)
+    
+    # Image files are shared between products; only those nothing uses any more are removed
+    release_product_images(images)
     
     return jsonify({'message': 'Product deleted successfully'}), 200
 
@@ -488,190 +511,108 @@ def delete_product(product_id):
 @admin_bp.route('/bulk-upload-products', methods=['POST'])
 @admin_required
 def bulk_upload_products():
-    print("=== BULK PRODUCT UPLOAD DEBUG ===")
-    print(f"Request files: {request.files}")
-    
     if 'excel_file' not in request.files:
-        print("ERROR: No 'excel_file' key in request.files")
         return jsonify({'error': 'No Excel file provided'}), 400
     
     file = request.files['excel_file']
-    print(f"Excel file: {file.filename}")
-    
     if file.filename == '':
-        print("ERROR: No file selected")
         return jsonify({'error': 'No file selected'}), 400
     
-    if not file.filename.lower().endswith(('.xlsx', '.xls')):
-        print(f"ERROR: Invalid file type: {file.filename}")
-        return jsonify({'error': 'File must be an Excel file (.xlsx or .xls)'}), 400
+    if not file.filename.lower().endswith(SHEET_EXTENSIONS):
+        return jsonify({'error': 'File must be an Excel or CSV file (.xlsx, .xls or .csv)'}), 400
     
+    # The job streams the sheet from disk; only the header row is read here
+    path, file_hash = save_upload(file, current_app.config['IMPORT_FOLDER'])
     try:
-        # Read Excel file - try both sheet names
-        df = None
-        try:
-            df = pd.read_excel(file, sheet_name='Upload Template')
-            print("Successfully read 'Upload Template' sheet")
-        except:
-            try:
-                df = pd.read_excel(file, sheet_name=0)  # First sheet
-                print("Successfully read first sheet (index 0)")
-            except Exception as e:
-                print(f"ERROR reading Excel file: {str(e)}")
-                return jsonify({'error': f'Failed to read Excel file: {str(e)}'}), 400
-        
-        print(f"DataFrame shape: {df.shape}")
-        print(f"DataFrame columns: {list(df.columns)}")
-        print(f"First few rows:\n{df.head()}")
-        
-        # Validate required columns
-        required_columns = ['sku', 'title', 'slug', 'price', 'section_slug']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            error_msg = f'Missing required columns: {", ".join(missing_columns)}'
-            print(f"ERROR: {error_msg}")
-            return jsonify({'error': error_msg}), 400
-        
-        # Process each row
-        results = {
-            'success': 0,
-            'errors': [],
-            'created_products': []
-        }
-        
-        print(f"Processing {len(df)} rows...")
-        
-        for index, row in df.iterrows():
-            print(f"\n--- Processing row {index + 1} ---")
-            print(f"Row data: {dict(row)}")
-            
-            try:
-                # Skip empty rows
-                if pd.isna(row['sku']) or pd.isna(row['title']):
-                    print(f"Skipping row {index + 1}: Empty SKU or title")
-                    continue
-                
-                # Check if product already exists
-                existing_product = Product.query.filter_by(sku=row['sku']).first()
-                if existing_product:
-                    error_msg = f"Row {index + 2}: Product with SKU '{row['sku']}' already exists"
-                    print(f"ERROR: {error_msg}")
-                    results['errors'].append(error_msg)
-                    continue
-                
-                # Find section
-                section_slug = str(row['section_slug']).strip().lower()
-                print(f"Looking for section with slug: '{section_slug}'")
-                section = Section.query.filter_by(slug=section_slug).first()
-                if not section:
-                    # List available sections for debugging
-                    available_sections = [s.slug for s in Section.query.all()]
-                    error_msg = f"Row {index + 2}: Section '{section_slug}' not found. Available: {available_sections}"
-                    print(f"ERROR: {error_msg}")
-                    results['errors'].append(error_msg)
-                    continue
-                
-                print(f"Found section: {section.name} (ID: {section.id})")
-                
-                # Process image filenames
-                image_urls = []
-                if not pd.isna(row.get('image_filenames', '')):
-                    image_filenames = [name.strip() for name in str(row['image_filenames']).split(',')]
-                    print(f"Processing images: {image_filenames}")
-                    
-                    for filename in image_filenames:
-                        if filename:
-                            # Check if image exists in bulk_images folder
-                            bulk_image_path = os.path.join(current_app.config['UPLOAD_FOLDER'], 'bulk_images', filename)
-                            print(f"Looking for image: {bulk_image_path}")
-                            
-                            if os.path.exists(bulk_image_path):
-                                print(f"Found image: {filename}")
-                                # Move image to products folder
-                                products_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'products')
-                                os.makedirs(products_folder, exist_ok=True)
-                                
-                                # Generate unique filename
-                                name, ext = os.path.splitext(filename)
-                                unique_filename = f"{uuid.uuid4().hex}{ext}"
-                                new_path = os.path.join(products_folder, unique_filename)
-                                
-                                # Copy and optimize image
-                                try:
-                                    with Image.open(bulk_image_path) as img:
-                                        if img.mode in ('RGBA', 'P'):
-                                            img = img.convert('RGB')
-                                        if img.width > 1200:
-                                            ratio = 1200 / img.width
-                                            new_height = int(img.height * ratio)
-                                            img = img.resize((1200, new_height), Image.Resampling.LANCZOS)
-                                        img.save(new_path, 'JPEG', quality=85, optimize=True)
-                                    
-                                    image_url = f"http://localhost:5000/uploads/products/{unique_filename}"
-                                    image_urls.append(image_url)
-                                    print(f"Processed image: {filename} -> {unique_filename}")
-                                    
-                                except Exception as e:
-                                    error_msg = f"Row {index + 2}: Failed to process image '{filename}': {str(e)}"
-                                    print(f"ERROR: {error_msg}")
-                                    results['errors'].append(error_msg)
-                            else:
-                                error_msg = f"Row {index + 2}: Image '{filename}' not found in bulk_images folder"
-                                print(f"ERROR: {error_msg}")
-                                results['errors'].append(error_msg)
-                
-                # Create product
-                print(f"Creating product with SKU: {row['sku']}")
-                product = Product(
-                    sku=str(row['sku']).strip(),
-                    title=str(row['title']).strip(),
-                    slug=str(row['slug']).strip(),
-                    description=str(row.get('description', '')).strip(),
-                    price=float(row['price']),
-                    original_price=float(row['original_price']) if not pd.isna(row.get('original_price')) and row.get('original_price') != '' else None,
-                    is_on_sale=bool(row.get('is_on_sale', False)) if not pd.isna(row.get('is_on_sale')) else False,
-                    stock=int(row.get('stock', 0)) if not pd.isna(row.get('stock')) else 0,
-                    section_id=section.id,
-                    images=json.dumps(image_urls),
-                    sizes=json.dumps([s.strip() for s in str(row.get('sizes', '')).split(',') if s.strip()]) if not pd.isna(row.get('sizes')) else json.dumps([]),
-                    colors=json.dumps([c.strip() for c in str(row.get('colors', '')).split(',') if c.strip()]) if not pd.isna(row.get('colors')) else json.dumps([]),
-                    is_active=bool(row.get('is_active', True)) if not pd.isna(row.get('is_active')) else True
-                )
-                
-                db.session.add(product)
-                results['success'] += 1
-                results['created_products'].append({
-                    'sku': product.sku,
-                    'title': product.title
-                })
-                print(f"Product created successfully: {product.sku}")
-                
-            except Exception as e:
-                error_msg = f"Row {index + 2}: {str(e)}"
-                print(f"ERROR: {error_msg}")
-                results['errors'].append(error_msg)
-        
-        # Commit all changes
-        if results['success'] > 0:
-            db.session.commit()
-            print(f"Committed {results['success']} products to database")
-        else:
-            print("No products to commit")
-        
-        print(f"=== FINAL RESULTS ===")
-        print(f"Success: {results['success']}")
-        print(f"Errors: {len(results['errors'])}")
-        
-        return jsonify({
-            'message': f'Bulk upload completed. {results["success"]} products created.',
-            'results': results
-        }), 200
-        
+        columns = sheet_columns(path)
     except Exception as e:
-        db.session.rollback()
-        error_msg = f'Failed to process Excel file: {str(e)}'
-        print(f"CRITICAL ERROR: {error_msg}")
-        return jsonify({'error': error_msg}), 500
+        os.remove(path)
+        return jsonify({'error': f'Failed to read file: {str(e)}'}), 400
+    
+    # Validate required columns
+    missing = missing_columns(columns)
+    if missing:
+        os.remove(path)
+        return jsonify({'error': f'Missing required columns: {", ".join(missing)}'}), 400
+    
+    # Uploading a file whose import didn't finish picks that job up where it stopped
+    job = find_unfinished_import(file_hash)
+    if job:
+        if os.path.exists(job.file_path):
+            os.remove(path)
+        else:
+            job.file_path = path
+            db.session.commit()
+        message = 'Resuming the unfinished import of this file.'
+    else:
+        job = create_import_job(path, secure_filename(file.filename), file_hash)
+        message = 'Bulk upload started.'
+    
+    # Rows and images are processed in the background; poll the job for progress
+    start_import_job(current_app._get_current_object(), job.id)
+    return bulk_upload_accepted(job, message)
+
+def bulk_upload_accepted(job, message):
+    status_url = url_for('admin.get_bulk_upload_status', job_id=job.id)
+    response = jsonify({
+        'message': message,
+        'job_id': job.id,
+        'status_url': status_url
+    })
+    response.headers['Location'] = status_url
+    return response, 202
+
+@admin_bp.route('/bulk-upload-products/<job_id>', methods=['GET'])
+@admin_required
+def get_bulk_upload_status(job_id):
+    from models import ImportJob
+    
+    job = db.session.get(ImportJob, job_id)
+    if not job:
+        return jsonify({'error': 'Import job not found'}), 404
+    rows_url = url_for('admin.get_bulk_upload_rows', job_id=job.id)
+    return jsonify(import_job_status(job, rows_url)), 200
+
+@admin_bp.route('/bulk-upload-products/<job_id>/rows', methods=['GET'])
+@admin_required
+def get_bulk_upload_rows(job_id):
+    """Per-row outcome of an import in sheet order; ?status=created|error"""
+    from models import ImportJob, ImportRow
+    
+    job = db.session.get(ImportJob, job_id)
+    if not job:
+        return jsonify({'error': 'Import job not found'}), 404
+    
+    query = job.rows
+    status = request.args.get('status')
+    if status:
+        query = query.filter(ImportRow.status == status)
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+    
+    try:
+        rows, next_cursor = keyset_paginate(query, [ImportRow.row_number], request.args.get('cursor'), limit)
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    response = jsonify([row.to_dict() for row in rows])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response, 200
+
+@admin_bp.route('/bulk-upload-products/<job_id>/resume', methods=['POST'])
+@admin_required
+def resume_bulk_upload(job_id):
+    """Continue a failed or interrupted import after its last committed chunk"""
+    from models import ImportJob
+    
+    job = db.session.get(ImportJob, job_id)
+    if not job:
+        return jsonify({'error': 'Import job not found'}), 404
+    if job.status == 'completed':
+        return jsonify({'error': 'Import job already completed'}), 409
+    if not start_import_job(current_app._get_current_object(), job.id):
+        return jsonify({'error': 'Import job is already running'}), 409
+    return bulk_upload_accepted(job, 'Bulk upload resumed.')
 
 @admin_bp.route('/download-product-template', methods=['GET'])
 @admin_required
@@ -720,12 +661,6 @@ def bulk_upload_images():
         print("ERROR: No files selected or empty filename")
         return jsonify({'error': 'No files selected'}), 400
     
-    # Create bulk_images folder
-    bulk_images_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], 'bulk_images')
-    os.makedirs(bulk_images_folder, exist_ok=True)
-    print(f"Bulk images folder: {bulk_images_folder}")
-    print(f"Bulk images folder exists: {os.path.exists(bulk_images_folder)}")
-    
     results = {
         'success': 0,
         'errors': [],
@@ -743,26 +678,31 @@ def bulk_upload_images():
             try:
                 # Use original filename for bulk upload
                 filename = secure_filename(file.filename)
-                file_path = os.path.join(bulk_images_folder, filename)
-                print(f"Saving to: {file_path}")
+                key = f'bulk_images/{filename}'
+                print(f"Saving to: {key}")
+                
+                data = file.read()
                 
                 # Check if file already exists
-                if os.path.exists(file_path):
+                if storage().exists(key):
+                    if stored_file_hash(key) == source_hash(data):
+                        # Same image uploaded again; nothing to do
+                        print(f"File unchanged: {filename}")
+                        results['success'] += 1
+                        results['uploaded_files'].append(filename)
+                        continue
                     error_msg = f"File '{filename}' already exists"
                     print(f"ERROR: {error_msg}")
                     results['errors'].append(error_msg)
-                    continueint(f"ERROR: {error_msg}")
-                    results['errors'].append(error_msg)
                     continue
                 
                 # Save file
-                file.save(file_path)
+                storage().save(key, data)
                 print(f"File saved successfully: {filename}")
                 
                 # Verify file was saved
-                if os.path.exists(file_path):
-                    file_size = os.path.getsize(file_path)
-                    print(f"File verified - size: {file_size} bytes")
+                if storage().exists(key):
+                    print(f"File verified - size: {len(data)} bytes")
                     results['success'] += 1
                     results['uploaded_files'].append(filename)
                 else:
@@ -791,47 +731,47 @@ def bulk_upload_images():
 
 # Order Management
 @admin_bp.route('/orders', methods=['GET'])
+@query_budget(4)  # admin check, page, count, items (with products and sections)
 @admin_required
 def get_all_orders():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
     status = request.args.get('status')
     search = request.args.get('search', '')
     
     from models import Order, User
     
-    query = Order.query
+    query = Order.query.options(*admin_order_loader_options())
     
     if status:
         query = query.filter_by(status=status)
     
     if search:
-        query = query.join(User).filter(
+        # EXISTS rather than a join, so the eagerly joined user isn't joined twice
+        query = query.filter(
             db.or_(
                 Order.order_number.contains(search),
                 Order.receipt_number.contains(search),
-                User.email.contains(search),
-                User.name.contains(search)
+                Order.user.has(db.or_(User.email.contains(search), User.name.contains(search)))
             )
         )
     
-    orders = query.order_by(Order.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        orders, next_cursor, total, is_estimate = admin_page(
+            query, Order.__table__, (Order.created_at, Order.id),
+            {'status': status, 'search': search} if status or search else None
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    return jsonify({
-        'orders': [order.to_dict(include_user=True) for order in orders.items],
-        'total': orders.total,
-        'pages': orders.pages,
-        'current_page': page
-    }), 200
+    return page_response('orders', [order.to_dict(include_user=True) for order in orders],
+                         next_cursor, total, is_estimate), 200
 
 @admin_bp.route('/orders/<int:order_id>', methods=['GET'])
+@query_budget(3)
 @admin_required
 def get_admin_order(order_id):
     from models import Order
     
-    order = Order.query.get(order_id)
+    order = Order.query.options(*admin_order_loader_options()).filter_by(id=order_id).first()
     if not order:
         return jsonify({'error': 'Order not found'}), 404
     
@@ -856,6 +796,7 @@ def update_order_status(order_id):
     
     order.status = data['status']
     db.session.commit()
+    prerender_receipt(order)
     
     return jsonify({
         'message': 'Order status updated successfully',
@@ -866,24 +807,31 @@ def update_order_status(order_id):
 @admin_required
 def download_admin_receipt(order_id):
     from models import Order
-    from routes.orders import generate_receipt_pdf
     
     order = Order.query.get(order_id)
     if not order:
         return jsonify({'error': 'Order not found'}), 404
     
     try:
-        pdf_buffer = generate_receipt_pdf(order)
-        
-        return send_file(
-            pdf_buffer,
-            as_attachment=True,
-            download_name=f'receipt_{order.receipt_number}.pdf',
-            mimetype='application/pdf'
-        )
+        return receipt_response(order, url_for('admin.get_admin_receipt_status', order_id=order.id))
     except Exception as e:
         return jsonify({'error': 'Failed to generate receipt'}), 500
 
+@admin_bp.route('/orders/<int:order_id>/receipt/status', methods=['GET'])
+@admin_required
+def get_admin_receipt_status(order_id):
+    from models import Order
+    
+    order = Order.query.get(order_id)
+    if not order:
+        return jsonify({'error': 'Order not found'}), 404
+    
+    return jsonify(receipt_status(
+        order,
+        download_url=url_for('admin.download_admin_receipt', order_id=order.id),
+        poll_url=url_for('admin.get_admin_receipt_status', order_id=order.id)
+    )), 200
+
 @admin_bp.route('/orders/<int:order_id>', methods=['DELETE'])
 @admin_required
 def delete_order(order_id):
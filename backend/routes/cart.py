@@ -1,14 +1,20 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, CartItem, Product
+from utils.loading import cart_item_loader_options
+from utils.query_counter import query_budget
+from utils.reservations import cart_quantity, hold_stock, release_holds, shrink_hold
+from utils.stock import OutOfStockError
+from utils.cart_batch import apply_cart_batch, merge_guest_cart, line_key, upsert_cart_lines, CartBatchError
 
 cart_bp = Blueprint('cart', __name__)
 
 @cart_bp.route('', methods=['GET'])
+@query_budget(1)
 @jwt_required()
 def get_cart():
     user_id = get_jwt_identity()
-    cart_items = CartItem.query.filter_by(user_id=user_id).all()
+    cart_items = CartItem.query.options(*cart_item_loader_options()).filter_by(user_id=user_id).all()
     return jsonify({'items': [item.to_dict() for item in cart_items]}), 200
 
 @cart_bp.route('', methods=['POST'])
@@ -24,31 +30,58 @@ def add_to_cart():
     if not product or not product.is_active:
         return jsonify({'error': 'Product not found'}), 404
     
-    # Check if item already exists
-    existing = CartItem.query.filter_by(
-        user_id=user_id,
-        product_id=data['product_id'],
-        size=data.get('size'),
-        color=data.get('color')
-    ).first()
-    
-    if existing:
-        existing.quantity += data.get('quantity', 1)
-        db.session.commit()
-        return jsonify({'message': 'Cart updated', 'item': existing.to_dict()}), 200
-    
-    cart_item = CartItem(
-        user_id=user_id,
-        product_id=data['product_id'],
-        quantity=data.get('quantity', 1),
-        size=data.get('size'),
-        color=data.get('color')
-    )
-    
-    db.session.add(cart_item)
+    quantity = data.get('quantity', 1)
+    
+    # Hold the stock for the user's new total of this product
+    try:
+        reserved_until = hold_stock(user_id, product, cart_quantity(user_id, product.id) + quantity)
+    except OutOfStockError:
+        return jsonify({'error': f'Insufficient stock for {product.title}'}), 400
+    reserved_until = reserved_until.isoformat() if reserved_until else None
+    
+    # Insert the line or add to the existing one in a single statement, so two
+    # concurrent adds can't both create it
+    key = line_key(product.id, data.get('size'), data.get('color'))
+    upsert_cart_lines(user_id, {key: quantity})
     db.session.commit()
     
-    return jsonify({'message': 'Item added to cart', 'item': cart_item.to_dict()}), 201
+    cart_item = CartItem.query.filter_by(user_id=user_id, product_id=key[0], size=key[1], color=key[2]).one()
+    
+    # A line holding only what was just added is new
+    if cart_item.quantity == quantity:
+        return jsonify({'message': 'Item added to cart', 'item': cart_item.to_dict(), 'reserved_until': reserved_until}), 201
+    
+    return jsonify({'message': 'Cart updated', 'item': cart_item.to_dict(), 'reserved_until': reserved_until}), 200
+
+@cart_bp.route('/batch', methods=['POST'])
+@query_budget(6)
+@jwt_required()
+def batch_update_cart():
+    """Apply many add/update/remove operations in one transaction (see utils/cart_batch.py)"""
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        items, reserved_until = apply_cart_batch(user_id, data.get('operations'))
+    except CartBatchError as e:
+        return jsonify({'error': str(e)}), e.status
+    
+    return jsonify({'message': 'Cart updated', 'items': items, 'reserved_until': reserved_until}), 200
+
+@cart_bp.route('/merge', methods=['POST'])
+@query_budget(4)
+@jwt_required()
+def merge_cart():
+    """Merge a guest cart into the user's cart at login (see utils/cart_batch.py)"""
+    user_id = get_jwt_identity()
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        items, reserved_until, skipped = merge_guest_cart(user_id, data.get('lines'))
+    except CartBatchError as e:
+        return jsonify({'error': str(e)}), e.status
+    
+    return jsonify({'message': 'Cart merged', 'items': items, 'reserved_until': reserved_until, 'skipped': skipped}), 200
 
 @cart_bp.route('/<int:item_id>', methods=['PUT'])
 @jwt_required()
@@ -62,10 +95,22 @@ def update_cart_item(item_id):
     data = request.get_json()
     
     if 'quantity' in data:
-        if data['quantity'] <= 0:
+        quantity = max(data['quantity'], 0)
+        other_lines = cart_quantity(user_id, cart_item.product_id) - cart_item.quantity
+        
+        if cart_item.product and quantity > cart_item.quantity:
+            try:
+                hold_stock(user_id, cart_item.product, other_lines + quantity)
+            except OutOfStockError:
+                return jsonify({'error': f'Insufficient stock for {cart_item.product.title}'}), 400
+        elif cart_item.product:
+            # Lowering a line never checks availability
+            shrink_hold(user_id, cart_item.product, other_lines + quantity)
+        
+        if quantity == 0:
             db.session.delete(cart_item)
         else:
-            cart_item.quantity = data['quantity']
+            cart_item.quantity = quantity
     
     db.session.commit()
     return jsonify({'message': 'Cart updated'}), 200
@@ -79,6 +124,9 @@ def remove_from_cart(item_id):
     if not cart_item:
         return jsonify({'error': 'Cart item not found'}), 404
     
+    if cart_item.product:
+        shrink_hold(user_id, cart_item.product, cart_quantity(user_id, cart_item.product_id) - cart_item.quantity)
+    
     db.session.delete(cart_item)
     db.session.commit()
     
@@ -88,6 +136,8 @@ def remove_from_cart(item_id):
 @jwt_required()
 def clear_cart():
     user_id = get_jwt_identity()
+    product_ids = [row.product_id for row in db.session.query(CartItem.product_id).filter_by(user_id=user_id).distinct()]
     CartItem.query.filter_by(user_id=user_id).delete()
     db.session.commit()
+    release_holds(user_id, product_ids)
     return jsonify({'message': 'Cart cleared'}), 200
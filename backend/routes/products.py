@@ -1,41 +1,155 @@
-from flask import Blueprint, request, jsonify
-from models import db, Product, Section
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.orm import load_only
+from models import db, Product, Section, json_list_contains
+from utils.pagination import keyset_paginate, ranked_paginate
+from utils.loading import product_loader_options
+from utils.query_counter import query_budget
+from utils.search import search_product_ids
+from utils.cache import catalog_cache
+from utils.http_cache import conditional
 
 products_bp = Blueprint('products', __name__)
 
-@products_bp.route('', methods=['GET'])
-def get_products():
-    category = request.args.get('category')
-    search = request.args.get('search')
+# Storefront sort orders: sort key -> (keyset columns, descending).
+# Each one is backed by the matching composite index declared on Product.
+SORT_ORDERS = {
+    'newest': ((Product.created_at, Product.id), True),
+    'price_asc': ((Product.price, Product.id), False),
+    'price_desc': ((Product.price, Product.id), True),
+    'title': ((Product.title, Product.id), False),
+}
+
+def parse_fields(raw):
+    """Parse a comma separated `fields=` projection, or None for all fields"""
+    if not raw:
+        return None
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in Product.SERIALIZABLE_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    return fields
+
+def load_products_page(category, search, size, color, sort, cursor, limit, fields):
+    """Run the listing query for one page; raises ValueError on a bad cursor"""
+    order_columns, descending = SORT_ORDERS.get(sort, SORT_ORDERS['newest'])
     
-    query = Product.query.filter_by(is_active=True)
+    query = Product.query.options(*product_loader_options()).filter_by(is_active=True)
     
     if category:
         section = Section.query.filter_by(slug=category, is_active=True).first()
         if section:
             query = query.filter_by(section_id=section.id)
     
+    ranked_ids = None
     if search:
-        query = query.filter(Product.title.ilike(f'%{search}%'))
+        ranked_ids = search_product_ids(search, active_only=True, limit=current_app.config['SEARCH_MAX_RESULTS'])
+        query = query.filter(Product.id.in_(ranked_ids))
+    
+    if size:
+        query = query.filter(json_list_contains(Product.sizes, size))
     
-    products = query.all()
-    return jsonify([product.to_dict() for product in products]), 200
+    if color:
+        query = query.filter(json_list_contains(Product.colors, color))
+    
+    if fields:
+        # Only load the columns the projection needs, plus the keyset columns
+        query = query.options(load_only(*Product.columns_for_fields(fields), *order_columns))
+    
+    if sort == 'relevance':
+        products, next_cursor = ranked_paginate(query, Product.id, ranked_ids, cursor, limit)
+    else:
+        products, next_cursor = keyset_paginate(query, order_columns, cursor, limit, descending)
+    
+    return {
+        'items': [product.to_dict(fields) for product in products],
+        'next_cursor': next_cursor
+    }
+
+def load_active_product(**filters):
+    product = Product.query.options(*product_loader_options()).filter_by(is_active=True, **filters).first()
+    return product.to_dict() if product else None
+
+def load_active_sections():
+    sections = Section.query.filter_by(is_active=True).order_by(Section.display_order).all()
+    return [section.to_dict() for section in sections]
+
+def load_catalog_versions():
+    """Row versions of the whole catalog (products and sections) in one query"""
+    row = db.session.execute(db.select(
+        db.select(db.func.count(Product.id)).scalar_subquery(),
+        db.select(db.func.max(Product.updated_at)).scalar_subquery(),
+        db.select(db.func.count(Section.id)).scalar_subquery(),
+        db.select(db.func.max(Section.updated_at)).scalar_subquery(),
+    )).one()
+    timestamps = [value for value in (row[1], row[3]) if value]
+    return {
+        'seed': [row[0], str(row[1]), row[2], str(row[3])],
+        'last_modified': max(timestamps).isoformat() if timestamps else None
+    }
+
+def catalog_validator(*args, **kwargs):
+    """Validator for catalog responses, recomputed once per catalog version"""
+    versions = catalog_cache().get_or_set('versions', None, load_catalog_versions)
+    return versions['seed'], versions['last_modified']
+
+@products_bp.route('', methods=['GET'])
+@query_budget(6)  # 3, plus one when the search index is (re)built, one for the validator and one for the catalog version
+@conditional(catalog_validator)
+def get_products():
+    category = request.args.get('category')
+    search = request.args.get('search')
+    size = request.args.get('size')
+    color = request.args.get('color')
+    # Search results default to relevance order; `relevance` needs a search term
+    sort = request.args.get('sort', 'relevance' if search else 'newest')
+    cursor = request.args.get('cursor')
+    limit = request.args.get('limit', current_app.config['PRODUCTS_PAGE_SIZE'], type=int)
+    limit = max(1, min(limit, current_app.config['PRODUCTS_MAX_PAGE_SIZE']))
+    
+    if sort not in SORT_ORDERS and not (sort == 'relevance' and search):
+        return jsonify({'error': f'Invalid sort. Use one of: {", ".join(SORT_ORDERS)}'}), 400
+    
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    params = {
+        'category': category, 'search': search, 'size': size, 'color': color,
+        'sort': sort, 'cursor': cursor, 'limit': limit, 'fields': fields
+    }
+    try:
+        page = catalog_cache().get_or_set('products', params, lambda: load_products_page(**params))
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    
+    response = jsonify(page['items'])
+    if page['next_cursor']:
+        response.headers['X-Next-Cursor'] = page['next_cursor']
+    return response, 200
 
 @products_bp.route('/<int:product_id>', methods=['GET'])
+@query_budget(3)  # the catalog version, the validator and the read
+@conditional(catalog_validator)
 def get_product(product_id):
-    product = Product.query.filter_by(id=product_id, is_active=True).first()
+    product = catalog_cache().get_or_set('product', {'id': product_id},
+                                         lambda: load_active_product(id=product_id))
     if not product:
         return jsonify({'error': 'Product not found'}), 404
-    return jsonify(product.to_dict()), 200
+    return jsonify(product), 200
 
 @products_bp.route('/slug/<slug>', methods=['GET'])
+@query_budget(3)  # the catalog version, the validator and the read
+@conditional(catalog_validator)
 def get_product_by_slug(slug):
-    product = Product.query.filter_by(slug=slug, is_active=True).first()
+    product = catalog_cache().get_or_set('product_slug', {'slug': slug},
+                                         lambda: load_active_product(slug=slug))
     if not product:
         return jsonify({'error': 'Product not found'}), 404
-    return jsonify(product.to_dict()), 200
+    return jsonify(product), 200
 
 @products_bp.route('/sections', methods=['GET'])
+@query_budget(3)  # the catalog version, the validator and the read
+@conditional(catalog_validator)
 def get_sections():
-    sections = Section.query.filter_by(is_active=True).order_by(Section.display_order).all()
-    return jsonify([section.to_dict() for section in sections]), 200
+    return jsonify(catalog_cache().get_or_set('sections', None, load_active_sections)), 200
@@ -1,14 +1,31 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, WishlistItem, Product
+from models import db, WishlistItem, Product, Section
+from utils.loading import wishlist_item_loader_options
+from utils.query_counter import query_budget
+from utils.http_cache import conditional
 
 wishlist_bp = Blueprint('wishlist', __name__)
 
+def wishlist_validator():
+    user_id = get_jwt_identity()
+    count, added_at, product_updated_at, section_updated_at = db.session.query(
+        db.func.count(WishlistItem.id),
+        db.func.max(WishlistItem.created_at),
+        db.func.max(Product.updated_at),
+        db.func.max(Section.updated_at)
+    ).select_from(WishlistItem).join(Product).join(Section).filter(WishlistItem.user_id == user_id).one()
+    timestamps = [value for value in (added_at, product_updated_at, section_updated_at) if value]
+    seed = [user_id, count, str(added_at), str(product_updated_at), str(section_updated_at)]
+    return seed, max(timestamps) if timestamps else None
+
 @wishlist_bp.route('', methods=['GET'])
+@query_budget(2)
 @jwt_required()
+@conditional(wishlist_validator, private=True)
 def get_wishlist():
     user_id = get_jwt_identity()
-    wishlist_items = WishlistItem.query.filter_by(user_id=user_id).all()
+    wishlist_items = WishlistItem.query.options(*wishlist_item_loader_options()).filter_by(user_id=user_id).all()
     return jsonify({'items': [item.to_dict() for item in wishlist_items]}), 200
 
 @wishlist_bp.route('', methods=['POST'])
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the admin order list: the number of queries per page must not
+grow with per_page (every order has its own customer, address, payment
+details and items, so any relation loaded lazily shows up as a growing count).
+
+Usage:
+    python test_admin_order_queries.py                       # throwaway SQLite database
+    python test_admin_order_queries.py --orders 500 --sizes 10 50 100 200
+    DB_TYPE=mysql DB_NAME=truaxis_bench python test_admin_order_queries.py --use-env-db
+
+--use-env-db runs against the database configured in .env; it creates and then
+deletes its own products, users and orders, so point it at a scratch database.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description='Admin order list query count benchmark')
+parser.add_argument('--orders', type=int, default=200, help='orders to create, each by a different customer')
+parser.add_argument('--items', type=int, default=3, help='items per order')
+parser.add_argument('--sizes', type=int, nargs='+', default=[5, 20, 50, 100], help='per_page values to compare')
+parser.add_argument('--repeat', type=int, default=5, help='requests timed per page size')
+parser.add_argument('--use-env-db', action='store_true', help='use the database from .env instead of SQLite')
+args = parser.parse_args()
+
+if not args.use_env_db:
+    temp_dir = tempfile.mkdtemp()
+    os.environ['DB_TYPE'] = 'sqlite'
+    os.environ['DB_FILE'] = os.path.join(temp_dir, 'admin_orders_bench.db')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(temp_dir, 'uploads')
+
+os.environ['RECEIPT_WORKERS'] = '0'
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+from app import create_app
+from models import db, User, Section, Product, Address, Order, OrderItem, PaymentDetail
+from utils.query_counter import QueryCounter
+
+def setup(app):
+    """One customer, address and payment per order; items spread over several products and sections"""
+    with app.app_context():
+        db.create_all()
+        suffix = str(int(time.time() * 1000))
+
+        sections = []
+        for i in range(3):
+            section = Section(name=f'Bench {suffix} {i}', slug=f'bench-{suffix}-{i}')
+            db.session.add(section)
+            sections.append(section)
+        db.session.flush()
+
+        products = []
+        for i in range(10):
+            product = Product(
+                sku=f'BENCH-{suffix}-{i}', title=f'Bench Product {i}', slug=f'bench-product-{suffix}-{i}',
+                price=10 + i, stock=100, section_id=sections[i % len(sections)].id
+            )
+            db.session.add(product)
+            products.append(product)
+
+        admin = User(name='Bench Admin', email=f'bench-admin-{suffix}@example.com', role='admin')
+        admin.set_password('bench')
+        db.session.add(admin)
+        db.session.flush()
+
+        user_ids = [admin.id]
+        for i in range(args.orders):
+            user = User(name=f'Bench {i}', email=f'bench-{suffix}-{i}@example.com', role='customer')
+            user.set_password('bench')
+            db.session.add(user)
+            db.session.flush()
+            user_ids.append(user.id)
+
+            address = Address(
+                user_id=user.id, full_name=user.name, phone='0000000000',
+                address_line1='1 Bench Street', city='Test', state='Test', pincode='000000'
+            )
+            db.session.add(address)
+            db.session.flush()
+
+            order = Order(
+                order_number=f'BENCH-{suffix}-{i}', receipt_number=f'B{suffix[-7:]}{i}'[:20],
+                user_id=user.id, address_id=address.id, total_amount=0, payment_method='card'
+            )
+            db.session.add(order)
+            db.session.flush()
+
+            for j in range(args.items):
+                product = products[(i + j) % len(products)]
+                db.session.add(OrderItem(order_id=order.id, product_id=product.id, quantity=1, price=product.price))
+                order.total_amount += product.price
+            db.session.add(PaymentDetail(order_id=order.id, payment_method='card', card_number_last4='4242'))
+
+        db.session.commit()
+        return create_access_token(identity=str(admin.id)), user_ids, [product.id for product in products], [section.id for section in sections]
+
+def measure(app, token, per_page):
+    """(queries, orders returned, mean seconds) for one page of the admin order list"""
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    # count=exact: the default estimate is cached, so later sizes would skip the count
+    url = f'/api/admin/orders?per_page={per_page}&count=exact'
+    with app.app_context():
+        with QueryCounter(db.engine) as counter:
+            response = client.get(url, headers=headers)
+        if response.status_code != 200:
+            raise RuntimeError(f'per_page={per_page}: HTTP {response.status_code} {response.get_json()}')
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            client.get(url, headers=headers)
+        elapsed = (time.perf_counter() - started) / args.repeat
+    return counter.count, len(response.get_json()['orders']), elapsed
+
+def cleanup(app, user_ids, product_ids, section_ids):
+    with app.app_context():
+        for order in Order.query.filter(Order.user_id.in_(user_ids)).all():
+            db.session.delete(order)
+        for user in User.query.filter(User.id.in_(user_ids)).all():
+            db.session.delete(user)
+        Product.query.filter(Product.id.in_(product_ids)).delete(synchronize_session=False)
+        Section.query.filter(Section.id.in_(section_ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+def test_admin_order_queries():
+    print("=== ADMIN ORDER LIST QUERY BENCHMARK ===")
+    print(f"Orders: {args.orders} (one customer each), items per order: {args.items}")
+
+    app = create_app()
+    token, user_ids, product_ids, section_ids = setup(app)
+
+    results = []
+    print(f"\n{'per_page':>8} {'orders':>7} {'queries':>8} {'ms/request':>11}")
+    for per_page in args.sizes:
+        queries, returned, elapsed = measure(app, token, per_page)
+        results.append(queries)
+        print(f"{per_page:>8} {returned:>7} {queries:>8} {elapsed * 1000:>11.1f}")
+
+    if args.use_env_db:
+        cleanup(app, user_ids, product_ids, section_ids)
+
+    if len(set(results)) != 1:
+        print(f"\n❌ Query count grows with per_page: {results}")
+        return False
+    print(f"\n✅ Every page size takes {results[0]} queries")
+    return True
+
+if __name__ == '__main__':
+    sys.exit(0 if test_admin_order_queries() else 1)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Stress test for checkout: many customers order the same product at once and
+stock must never go negative or be oversold.
+
+Usage:
+    python test_checkout_concurrency.py                  # throwaway SQLite database
+    python test_checkout_concurrency.py --threads 50 --stock 20
+    DB_TYPE=mysql DB_NAME=truaxis_stress python test_checkout_concurrency.py --use-env-db
+
+--use-env-db runs against the database configured in .env; it creates and then
+deletes its own products, users and orders, so point it at a scratch database.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+parser = argparse.ArgumentParser(description='Concurrent checkout stress test')
+parser.add_argument('--threads', type=int, default=30, help='number of concurrent customers')
+parser.add_argument('--stock', type=int, default=10, help='initial stock of the contested product')
+parser.add_argument('--quantity', type=int, default=1, help='quantity each customer orders')
+parser.add_argument('--use-env-db', action='store_true', help='use the database from .env instead of SQLite')
+args = parser.parse_args()
+
+if not args.use_env_db:
+    temp_dir = tempfile.mkdtemp()
+    os.environ['DB_TYPE'] = 'sqlite'
+    os.environ['DB_FILE'] = os.path.join(temp_dir, 'checkout_stress.db')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(temp_dir, 'uploads')
+
+# Only checkout is measured; don't pre-render receipts for the orders
+os.environ['RECEIPT_WORKERS'] = '0'
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+from app import create_app
+from models import db, User, Section, Product, Address, CartItem, Order
+
+def setup(app):
+    """Create one contested product and a customer with it in their cart per thread"""
+    with app.app_context():
+        db.create_all()
+
+        section = Section.query.filter_by(slug='stress-test').first()
+        if not section:
+            section = Section(name='Stress Test', slug='stress-test')
+            db.session.add(section)
+            db.session.flush()
+
+        suffix = str(int(time.time() * 1000))
+        product = Product(
+            sku=f'STRESS-{suffix}',
+            title='Stress Test Product',
+            slug=f'stress-test-product-{suffix}',
+            price=10,
+            stock=args.stock,
+            section_id=section.id
+        )
+        db.session.add(product)
+        db.session.flush()
+
+        customers = []
+        for i in range(args.threads):
+            user = User(name=f'Stress {i}', email=f'stress-{suffix}-{i}@example.com', role='customer')
+            user.set_password('stress-test')
+            db.session.add(user)
+            db.session.flush()
+
+            address = Address(
+                user_id=user.id, full_name=user.name, phone='0000000000',
+                address_line1='1 Test Street', city='Test', state='Test', pincode='000000'
+            )
+            db.session.add(address)
+            db.session.add(CartItem(user_id=user.id, product_id=product.id, quantity=args.quantity))
+            db.session.flush()
+
+            customers.append({
+                'user_id': user.id,
+                'address_id': address.id,
+                'token': create_access_token(identity=str(user.id))
+            })
+
+        db.session.commit()
+        return product.id, customers
+
+def place_orders(app, customers):
+    """Fire every checkout at once and collect the status codes"""
+    results = []
+    results_lock = threading.Lock()
+    barrier = threading.Barrier(len(customers))
+
+    def checkout(customer):
+        client = app.test_client()
+        barrier.wait()
+        response = client.post(
+            '/api/orders',
+            json={'address_id': customer['address_id'], 'payment_method': 'COD'},
+            headers={'Authorization': f"Bearer {customer['token']}"}
+        )
+        with results_lock:
+            results.append((response.status_code, response.get_json()))
+
+    threads = [threading.Thread(target=checkout, args=(customer,)) for customer in customers]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+def cleanup(app, product_id, customers):
+    with app.app_context():
+        user_ids = [customer['user_id'] for customer in customers]
+        for order in Order.query.filter(Order.user_id.in_(user_ids)).all():
+            db.session.delete(order)
+        for user in User.query.filter(User.id.in_(user_ids)).all():
+            db.session.delete(user)
+        db.session.delete(db.session.get(Product, product_id))
+        db.session.commit()
+
+def test_checkout_concurrency():
+    print("=== CONCURRENT CHECKOUT STRESS TEST ===")
+    print(f"Customers: {args.threads}, stock: {args.stock}, quantity each: {args.quantity}")
+
+    app = create_app()
+    product_id, customers = setup(app)
+    results, elapsed = place_orders(app, customers)
+
+    created = [body for status, body in results if status == 201]
+    rejected = [body for status, body in results if status == 400]
+    errors = [(status, body) for status, body in results if status not in (201, 400)]
+
+    print(f"\nFinished in {elapsed:.2f}s")
+    print(f"Orders placed: {len(created)}")
+    print(f"Rejected (insufficient stock): {len(rejected)}")
+    print(f"Errors: {len(errors)}")
+    for status, body in errors[:5]:
+        print(f"  {status}: {body}")
+
+    with app.app_context():
+        final_stock = db.session.get(Product, product_id).stock
+        ordered = sum(
+            item['quantity']
+            for body in created
+            for item in body['order']['items']
+        )
+
+    expected_orders = min(args.threads, args.stock // args.quantity)
+    print(f"\nFinal stock: {final_stock}")
+    print(f"Units ordered: {ordered}")
+
+    ok = True
+    if errors:
+        print("❌ Some checkouts failed with unexpected errors")
+        ok = False
+    if final_stock < 0:
+        print("❌ Stock went negative")
+        ok = False
+    if ordered != args.stock - final_stock:
+        print("❌ Units ordered do not match the stock taken")
+        ok = False
+    if len(created) != expected_orders:
+        print(f"❌ Expected {expected_orders} orders, got {len(created)}")
+        ok = False
+
+    if args.use_env_db:
+        cleanup(app, product_id, customers)
+
+    if ok:
+        print("✅ No oversell: every unit of stock was sold exactly once")
+    return ok
+
+if __name__ == '__main__':
+    sys.exit(0 if test_checkout_concurrency() else 1)
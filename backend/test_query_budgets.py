@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Query budget check: calls every endpoint declared with @query_budget under
+TESTING, where going over its budget raises AssertionError. Each check runs
+with cold caches (catalog cache and search index cleared right before it) and
+again with warm ones, with its filters, sorts and a second page. Endpoints with a budget that no check calls fail too, so
+new budgets need a check here.
+
+Usage:
+    python test_query_budgets.py                    # throwaway SQLite database
+    python test_query_budgets.py --products 200 --orders 30
+    DB_TYPE=mysql DB_NAME=truaxis_budget python test_query_budgets.py --use-env-db
+
+--use-env-db runs against the database configured in .env; it creates and then
+deletes its own products, users and orders, so point it at a scratch database.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description='Per-endpoint query budget check')
+parser.add_argument('--products', type=int, default=60, help='products to create, over three sections')
+parser.add_argument('--orders', type=int, default=12, help='orders to create for the customer')
+parser.add_argument('--items', type=int, default=3, help='items per order and cart lines')
+parser.add_argument('--use-env-db', action='store_true', help='use the database from .env instead of SQLite')
+args = parser.parse_args()
+
+if not args.use_env_db:
+    temp_dir = tempfile.mkdtemp()
+    os.environ['DB_TYPE'] = 'sqlite'
+    os.environ['DB_FILE'] = os.path.join(temp_dir, 'query_budgets.db')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(temp_dir, 'uploads')
+
+os.environ['RECEIPT_WORKERS'] = '0'
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask_jwt_extended import create_access_token
+from app import create_app
+from models import db, User, Section, Product, Address, Order, OrderItem, PaymentDetail, CartItem, WishlistItem
+from utils.cache import catalog_cache
+from utils.search import invalidate_search_index
+
+def setup(app):
+    """Sections, products, a customer with cart, wishlist and orders, and an admin"""
+    with app.app_context():
+        db.create_all()
+        suffix = str(int(time.time() * 1000))
+
+        sections = []
+        for i in range(3):
+            section = Section(name=f'Budget {suffix} {i}', slug=f'budget-{suffix}-{i}')
+            db.session.add(section)
+            sections.append(section)
+        db.session.flush()
+
+        products = []
+        for i in range(args.products):
+            product = Product(
+                sku=f'BUDGET-{suffix}-{i}', title=f'Budget Soap {i}', slug=f'budget-soap-{suffix}-{i}',
+                description='Herbal soap with aloe vera', price=10 + i % 7, stock=100,
+                section_id=sections[i % len(sections)].id,
+                images=json.dumps([f'http://localhost:5000/uploads/products/{i}.jpg']),
+                sizes=json.dumps(['S', 'M']), colors=json.dumps(['Red'])
+            )
+            db.session.add(product)
+            products.append(product)
+
+        admin = User(name='Budget Admin', email=f'budget-admin-{suffix}@example.com', role='admin')
+        admin.set_password('budget')
+        customer = User(name='Budget Customer', email=f'budget-{suffix}@example.com', role='customer')
+        customer.set_password('budget')
+        db.session.add_all([admin, customer])
+        db.session.flush()
+
+        address = Address(
+            user_id=customer.id, full_name=customer.name, phone='0000000000',
+            address_line1='1 Budget Street', city='Test', state='Test', pincode='000000'
+        )
+        db.session.add(address)
+        db.session.flush()
+
+        for j in range(args.items):
+            db.session.add(CartItem(user_id=customer.id, product_id=products[j].id, quantity=1, size='S'))
+            db.session.add(WishlistItem(user_id=customer.id, product_id=products[j].id))
+
+        order_ids = []
+        for i in range(args.orders):
+            order = Order(
+                order_number=f'BUDGET-{suffix}-{i}', receipt_number=f'Q{suffix[-7:]}{i}'[:20],
+                user_id=customer.id, address_id=address.id, total_amount=0, payment_method='card'
+            )
+            db.session.add(order)
+            db.session.flush()
+            for j in range(args.items):
+                product = products[(i + j) % len(products)]
+                db.session.add(OrderItem(order_id=order.id, product_id=product.id, quantity=1, price=product.price))
+                order.total_amount += product.price
+            db.session.add(PaymentDetail(order_id=order.id, payment_method='card', card_number_last4='4242'))
+            order_ids.append(order.id)
+
+        db.session.commit()
+        return {
+            'admin': create_access_token(identity=str(admin.id)),
+            'customer': create_access_token(identity=str(customer.id)),
+            'user_ids': [admin.id, customer.id],
+            'product': (products[0].id, products[0].slug),
+            'product_ids': [product.id for product in products],
+            'section': (sections[0].id, sections[0].slug),
+            'section_ids': [section.id for section in sections],
+            'order_ids': order_ids,
+        }
+
+def checks(data):
+    """(endpoint, method, url, json body, token) for every budgeted endpoint"""
+    product_id, product_slug = data['product']
+    section_id, section_slug = data['section']
+    admin, customer = data['admin'], data['customer']
+    order_id = data['order_ids'][0]
+    return [
+        ('products.get_products', 'GET', '/api/products', None, None),
+        ('products.get_products', 'GET', f'/api/products?category={section_slug}&sort=price_asc&limit=5', None, None),
+        ('products.get_products', 'GET', '/api/products?search=soap&limit=5', None, None),
+        ('products.get_products', 'GET', '/api/products?size=S&color=Red&sort=title&fields=id,title,price', None, None),
+        ('products.get_product', 'GET', f'/api/products/{product_id}', None, None),
+        ('products.get_product_by_slug', 'GET', f'/api/products/slug/{product_slug}', None, None),
+        ('products.get_sections', 'GET', '/api/products/sections', None, None),
+        ('get_sections', 'GET', '/api/sections', None, None),
+        ('cart.get_cart', 'GET', '/api/cart', None, customer),
+        ('cart.batch_update_cart', 'POST', '/api/cart/batch', {'operations': [
+            {'op': 'add', 'product_id': pid, 'quantity': 1, 'size': 'M'} for pid in data['product_ids'][:5]
+        ]}, customer),
+        ('cart.merge_cart', 'POST', '/api/cart/merge', {'lines': [
+            {'product_id': pid, 'quantity': 1, 'color': 'Red'} for pid in data['product_ids'][5:10]
+        ]}, customer),
+        ('wishlist.get_wishlist', 'GET', '/api/wishlist', None, customer),
+        ('orders.get_orders', 'GET', '/api/orders?limit=5', None, customer),
+        ('orders.get_order', 'GET', f'/api/orders/{order_id}', None, customer),
+        ('admin.get_sections', 'GET', '/api/admin/sections', None, admin),
+        ('admin.get_all_products', 'GET', '/api/admin/products?per_page=10', None, admin),
+        ('admin.get_all_products', 'GET', f'/api/admin/products?section_id={section_id}&count=exact', None, admin),
+        ('admin.get_all_products', 'GET', '/api/admin/products?search=soap&count=none', None, admin),
+        ('admin.get_all_orders', 'GET', '/api/admin/orders?per_page=5', None, admin),
+        ('admin.get_all_orders', 'GET', '/api/admin/orders?status=pending&search=budget&count=exact', None, admin),
+        ('admin.get_admin_order', 'GET', f'/api/admin/orders/{order_id}', None, admin),
+    ]
+
+def request(client, method, url, body, token):
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    return client.open(url, method=method, json=body, headers=headers)
+
+def run_check(client, method, url, body, token):
+    """Call one endpoint, and its next page when it has one; returns (status, queries) per call"""
+    results = []
+    response = request(client, method, url, body, token)
+    results.append((url, response.status_code, response.headers.get('X-Query-Count')))
+
+    next_cursor = response.headers.get('X-Next-Cursor')
+    if method == 'GET' and next_cursor:
+        separator = '&' if '?' in url else '?'
+        page_url = f'{url}{separator}cursor={next_cursor}'
+        response = request(client, method, page_url, body, token)
+        results.append((page_url, response.status_code, response.headers.get('X-Query-Count')))
+    return results
+
+def clear_caches(app):
+    """Drop everything cached between requests: catalog entries, counts and the search index"""
+    with app.app_context():
+        catalog_cache().backend.clear()
+        invalidate_search_index()
+
+def cleanup(app, data):
+    with app.app_context():
+        CartItem.query.filter(CartItem.user_id.in_(data['user_ids'])).delete(synchronize_session=False)
+        WishlistItem.query.filter(WishlistItem.user_id.in_(data['user_ids'])).delete(synchronize_session=False)
+        for order in Order.query.filter(Order.user_id.in_(data['user_ids'])).all():
+            db.session.delete(order)
+        for user in User.query.filter(User.id.in_(data['user_ids'])).all():
+            db.session.delete(user)
+        Product.query.filter(Product.id.in_(data['product_ids'])).delete(synchronize_session=False)
+        Section.query.filter(Section.id.in_(data['section_ids'])).delete(synchronize_session=False)
+        db.session.commit()
+
+def test_query_budgets():
+    print("=== QUERY BUDGET CHECK ===")
+    print(f"Products: {args.products}, orders: {args.orders}, items per order: {args.items}")
+
+    app = create_app()
+    app.testing = True
+    data = setup(app)
+    client = app.test_client()
+
+    budgets = {
+        endpoint: view.query_budget
+        for endpoint, view in app.view_functions.items() if hasattr(view, 'query_budget')
+    }
+    all_checks = checks(data)
+    failures = []
+
+    # Requests run outside any app context, each in its own (and its own g) as
+    # when served, so nothing per request carries over from one check to the next
+    for cache_state in ('cold', 'warm'):
+        print(f"\n--- {cache_state} cache ---")
+        for endpoint, method, url, body, token in all_checks:
+            if cache_state == 'cold':
+                clear_caches(app)
+            try:
+                for called, status, queries in run_check(client, method, url, body, token):
+                    mark = '✅' if status < 400 else '❌'
+                    print(f"{mark} {method} {called} -> {status}, {queries}/{budgets.get(endpoint)} queries")
+                    if status >= 400:
+                        failures.append(f'{method} {called}: HTTP {status}')
+            except AssertionError as e:
+                print(f"❌ {method} {url} over budget:\n{e}")
+                failures.append(f'{method} {url}: over budget')
+
+    unchecked = sorted(set(budgets) - {check[0] for check in all_checks})
+    for endpoint in unchecked:
+        print(f"❌ {endpoint} has a query budget but no check")
+        failures.append(f'{endpoint}: not checked')
+
+    if args.use_env_db:
+        cleanup(app, data)
+
+    if failures:
+        print(f"\n❌ {len(failures)} failure(s):")
+        for failure in failures:
+            print(f"   - {failure}")
+        return False
+    print(f"\n✅ All {len(budgets)} budgeted endpoints stayed within budget")
+    return True
+
+if __name__ == '__main__':
+    sys.exit(0 if test_query_budgets() else 1)
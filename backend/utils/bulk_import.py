@@ -0,0 +1,528 @@
+"""
+Bulk product import from the upload template (.xlsx, .csv or legacy .xls).
+
+POST /api/admin/bulk-upload-products saves the upload to IMPORT_FOLDER,
+checks its header row and starts an ImportJob on a background thread. It
+answers 202 with the job id right away.
+GET /api/admin/bulk-upload-products/<job_id> reports progress, rows/sec and
+ETA. /rows lists the outcome of every row.
+
+The sheet is streamed in chunks of IMPORT_CHUNK_SIZE rows. CSV goes through
+pandas' chunked reader and XLSX through openpyxl's read-only row iterator, so
+memory stays flat however long the file is. Only legacy .xls is loaded whole.
+Each chunk is handled in turn:
+
+1. It is validated column by column with pandas. Values are coerced in one
+   pass, SKUs and slugs are checked against the database with IN queries, and
+   sections come from a dict loaded once. The images of the rows that pass
+   are submitted to a process pool of BULK_IMAGE_WORKERS workers. Each
+   image file is processed once per run however many rows list it, and a
+   file stored by an earlier upload or import isn't processed at all.
+2. Once its images finish, the chunk's products are inserted with one
+   executemany inside a savepoint. A missing or broken image is reported on
+   that row, and the product is still created with the images that did work.
+3. The chunk's products, its ImportRow results and the job's checkpoint
+   (chunks_done) are committed together.
+
+A job that failed or was cut off by a restart can be resumed:
+POST .../<job_id>/resume, or upload the same file again. The resumed run
+skips the chunks that are already committed, so no row is imported twice.
+"""
+import hashlib
+import itertools
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timedelta
+import openpyxl
+import pandas as pd
+from sqlalchemy.exc import IntegrityError
+from models import db, Product, Section, ImportJob, ImportRow
+from utils.cache import bump_catalog_version
+from utils.images import process_bulk_image, variant_entry
+from utils.image_store import stored_file_hash, find_stored_image, remember_image
+from utils.storage import storage, storage_settings
+from utils.search import invalidate_search_index
+
+REQUIRED_COLUMNS = ['sku', 'title', 'slug', 'price', 'section_slug']
+SHEET_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+TEMPLATE_SHEET = 'Upload Template'
+
+# Rows read, validated and committed together
+IMPORT_CHUNK_SIZE = 1000
+# Values per IN (...) lookup; keeps large sheets under the database's parameter limit
+LOOKUP_BATCH_SIZE = 1000
+
+TRUE_VALUES = {'true', 'yes', 'y', '1', '1.0'}
+
+# Error messages included in the status response; /rows has all of them
+MAX_REPORTED_ERRORS = 1000
+
+# A 'running' job whose checkpoint hasn't moved for this long (seconds) is
+# taken to have died with its process and may be resumed
+STALE_JOB_AFTER = 15 * 60
+
+
+def save_upload(file, folder):
+    """Copy an uploaded sheet into folder; returns its path and SHA-256"""
+    os.makedirs(folder, exist_ok=True)
+    extension = os.path.splitext(file.filename)[1].lower()
+    fd, path = tempfile.mkstemp(dir=folder, prefix='import-', suffix=extension)
+    digest = hashlib.sha256()
+    with os.fdopen(fd, 'wb') as f:
+        for block in iter(lambda: file.stream.read(1 << 20), b''):
+            digest.update(block)
+            f.write(block)
+    return path, digest.hexdigest()
+
+
+def find_unfinished_import(file_hash):
+    """The job already importing this exact file, unless it completed"""
+    return ImportJob.query.filter(
+        ImportJob.file_hash == file_hash,
+        ImportJob.status != 'completed'
+    ).order_by(ImportJob.created_at.desc()).first()
+
+
+def create_import_job(path, filename, file_hash):
+    job = ImportJob(file_path=path, filename=filename, file_hash=file_hash,
+                    chunk_size=IMPORT_CHUNK_SIZE)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def import_job_status(job, rows_url):
+    """The job's progress, its counts and the first error messages"""
+    data = job.to_dict()
+    error_rows = job.rows.filter(ImportRow.error_count > 0) \
+        .order_by(ImportRow.row_number).limit(MAX_REPORTED_ERRORS)
+    data['results'] = {
+        'success': job.created_count,
+        'failed': job.failed_count,
+        'errors': [error for row in error_rows for error in row.errors][:MAX_REPORTED_ERRORS],
+        'rows_url': rows_url
+    }
+    return data
+
+
+def _extension(path):
+    return os.path.splitext(path)[1].lower()
+
+
+def _header(values):
+    return [str(value).strip() if value is not None else f'Unnamed: {index}'
+            for index, value in enumerate(values)]
+
+
+def _open_workbook(path):
+    """Read-only workbook and its 'Upload Template' sheet, or its first sheet"""
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    if TEMPLATE_SHEET in workbook.sheetnames:
+        return workbook, workbook[TEMPLATE_SHEET]
+    return workbook, workbook.worksheets[0]
+
+
+def _read_xls(path, **kwargs):
+    with pd.ExcelFile(path) as book:
+        sheet = TEMPLATE_SHEET if TEMPLATE_SHEET in book.sheet_names else 0
+        return book.parse(sheet, **kwargs)
+
+
+def sheet_columns(path):
+    """Column names from the header row"""
+    extension = _extension(path)
+    if extension == '.csv':
+        return _header(pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns)
+    if extension == '.xlsx':
+        workbook, sheet = _open_workbook(path)
+        try:
+            return _header(next(sheet.iter_rows(values_only=True), ()))
+        finally:
+            workbook.close()
+    return _header(_read_xls(path, nrows=0).columns)
+
+
+def count_sheet_rows(path):
+    """Number of data rows as far as it can be told without parsing; None if unknown"""
+    extension = _extension(path)
+    if extension == '.csv':
+        lines = 0
+        last = b'\n'
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                lines += block.count(b'\n')
+                last = block[-1:]
+        if last != b'\n':
+            lines += 1
+        return max(lines - 1, 0)
+    if extension == '.xlsx':
+        workbook, sheet = _open_workbook(path)
+        try:
+            return max(sheet.max_row - 1, 0) if sheet.max_row else None
+        finally:
+            workbook.close()
+    return None
+
+
+def iter_sheet_chunks(path, chunk_size=IMPORT_CHUNK_SIZE, skip_chunks=0):
+    """
+    DataFrames of up to chunk_size rows, starting after the first skip_chunks
+    chunks. Their index counts data rows from 0 across chunks, so index + 2 is
+    the row number in the sheet.
+    """
+    extension = _extension(path)
+    skip_rows = skip_chunks * chunk_size
+    if extension == '.csv':
+        with pd.read_csv(path, chunksize=chunk_size, dtype=str, encoding='utf-8-sig',
+                         skiprows=range(1, skip_rows + 1)) as reader:
+            for chunk in reader:
+                chunk.index += skip_rows
+                yield chunk.rename(columns=str.strip)
+    elif extension == '.xlsx':
+        workbook, sheet = _open_workbook(path)
+        try:
+            rows = sheet.iter_rows(values_only=True)
+            columns = _header(next(rows, ()))
+            width = len(columns)
+            offset = skip_rows
+            # Skipped rows are never turned into DataFrames
+            for _ in itertools.islice(rows, skip_rows):
+                pass
+            while True:
+                batch = [row[:width] + (None,) * (width - len(row))
+                         for row in itertools.islice(rows, chunk_size)]
+                if not batch:
+                    break
+                yield pd.DataFrame(batch, columns=columns, index=range(offset, offset + len(batch)))
+                offset += len(batch)
+        finally:
+            workbook.close()
+    else:
+        # Legacy .xls has no streaming reader
+        df = _read_xls(path)
+        for start in range(skip_rows, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+
+def missing_columns(columns):
+    return [col for col in REQUIRED_COLUMNS if col not in columns]
+
+
+def _split_list(value):
+    if pd.isna(value):
+        return []
+    return [item.strip() for item in str(value).split(',') if item.strip()]
+
+
+def _text(df, column, default=''):
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    return df[column].fillna(default).astype(str).str.strip()
+
+
+def _number(df, column):
+    """Numeric values of a column (NaN when blank) and a mask of cells that aren't numbers"""
+    if column not in df.columns:
+        return pd.Series(float('nan'), index=df.index), pd.Series(False, index=df.index)
+    raw = df[column].replace(r'^\s*$', None, regex=True)
+    values = pd.to_numeric(raw, errors='coerce')
+    return values, raw.notna() & values.isna()
+
+
+def _boolean(df, column, default):
+    """Boolean column; blank cells take the default"""
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=bool)
+    values = df[column].astype(str).str.strip().str.lower().isin(TRUE_VALUES)
+    return values.where(df[column].notna(), default).astype(bool)
+
+
+def _existing(column, values):
+    """The values that are already taken in a Product column"""
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), LOOKUP_BATCH_SIZE):
+        batch = values[start:start + LOOKUP_BATCH_SIZE]
+        found.update(db.session.scalars(db.select(column).where(column.in_(batch))))
+    return found
+
+
+def validate_rows(df):
+    """
+    Coerce and check a sheet column by column. Returns a DataFrame of the
+    Product fields of the valid rows (with their row_number and
+    image_filenames) and a list of (row_number, sku, error) for the rest.
+    """
+    # Skip empty rows
+    df = df[df['sku'].notna() & df['title'].notna()]
+
+    price, _ = _number(df, 'price')
+    original_price, bad_original_price = _number(df, 'original_price')
+    stock, bad_stock = _number(df, 'stock')
+    rows = pd.DataFrame({
+        'row_number': df.index + 2,
+        'sku': df['sku'].astype(str).str.strip(),
+        'title': df['title'].astype(str).str.strip(),
+        'slug': _text(df, 'slug'),
+        'description': _text(df, 'description'),
+        'price': price,
+        'original_price': original_price.astype(object).where(original_price.notna(), None),
+        'is_on_sale': _boolean(df, 'is_on_sale', False),
+        'stock': stock.fillna(0),
+        'section_slug': _text(df, 'section_slug').str.lower(),
+        'sizes': _text(df, 'sizes').map(_split_list),
+        'colors': _text(df, 'colors').map(_split_list),
+        'is_active': _boolean(df, 'is_active', True),
+        'image_filenames': _text(df, 'image_filenames').map(_split_list),
+    }, index=df.index)
+
+    section_ids = {section.slug: section.id for section in Section.query.all()}
+    section_id = rows['section_slug'].map(section_ids)
+    existing_skus = _existing(Product.sku, rows['sku'].unique())
+    existing_slugs = _existing(Product.slug, rows['slug'].unique())
+
+    # The first failing check is the row's error
+    checks = [
+        (rows['sku'].duplicated() | rows['sku'].isin(existing_skus),
+         "Product with SKU '" + rows['sku'] + "' already exists"),
+        (section_id.isna(),
+         "Section '" + rows['section_slug'] + f"' not found. Available: {list(section_ids)}"),
+        (rows['slug'] == '', 'Missing slug'),
+        (rows['slug'].duplicated() | rows['slug'].isin(existing_slugs),
+         "Product with slug '" + rows['slug'] + "' already exists"),
+        (price.isna(), 'Price must be a number'),
+        (bad_original_price, 'Original price must be a number'),
+        (bad_stock, 'Stock must be a number'),
+    ]
+    error = pd.Series(None, index=rows.index, dtype=object)
+    for failed, message in checks:
+        error = error.where(error.notna() | ~failed, message)
+
+    failed = error.notna()
+    rejected = list(zip(
+        rows.loc[failed, 'row_number'].tolist(),
+        rows.loc[failed, 'sku'].tolist(),
+        ('Row ' + rows.loc[failed, 'row_number'].astype(str) + ': ' + error[failed]).tolist()
+    ))
+    valid = rows[~failed].drop(columns='section_slug').assign(
+        section_id=section_id[~failed].astype(int),
+        stock=rows.loc[~failed, 'stock'].astype(int)
+    )
+    return valid, rejected
+
+
+def start_import_job(app, job_id):
+    """
+    Run a queued job, or resume a failed or stale one, on a background
+    thread. Returns False if it completed or is already running.
+    """
+    now = datetime.utcnow()
+    claimed = ImportJob.query.filter(
+        ImportJob.id == job_id,
+        db.or_(
+            ImportJob.status.in_(('queued', 'failed')),
+            db.and_(ImportJob.status == 'running',
+                    ImportJob.updated_at < now - timedelta(seconds=STALE_JOB_AFTER))
+        )
+    ).update({
+        'status': 'running',
+        'error': None,
+        'run_started_at': now,
+        'run_start_rows': ImportJob.rows_done,
+        'finished_at': None
+    }, synchronize_session=False)
+    db.session.commit()
+    if not claimed:
+        return False
+
+    thread = threading.Thread(target=run_import_job, args=(app, job_id),
+                              name=f'product-import-{job_id[:8]}', daemon=True)
+    thread.start()
+    return True
+
+
+def run_import_job(app, job_id):
+    with app.app_context():
+        try:
+            job = db.session.get(ImportJob, job_id)
+            if job.total_rows is None:
+                job.total_rows = count_sheet_rows(job.file_path)
+                db.session.commit()
+            _import_rows(app, job)
+            job.status = 'completed'
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            app.logger.exception('Bulk product import %s failed', job_id)
+            _mark_failed(app, job_id, str(e))
+        else:
+            # Nothing left to resume from
+            if os.path.exists(job.file_path):
+                os.remove(job.file_path)
+        finally:
+            db.session.remove()
+
+
+def _mark_failed(app, job_id, error):
+    try:
+        ImportJob.query.filter_by(id=job_id).update({
+            'status': 'failed',
+            'error': error,
+            'finished_at': datetime.utcnow()
+        }, synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        app.logger.exception('Could not record the failure of import %s', job_id)
+
+
+class _ImageWork:
+    """The images of one import run, optimized in a process pool"""
+
+    def __init__(self, app, folder='products'):
+        self.workers = app.config['BULK_IMAGE_WORKERS']
+        self.settings = storage_settings(app.config)
+        self.folder = folder
+        self.pool = None
+        self.futures = {}  # source key -> Future of its manifest, or None if missing
+        self.unrecorded = {}  # Future -> hash of a source not in stored_images yet
+
+    def submit(self, source_key):
+        """Future of the manifest of a bulk_images file; None if there is no such file"""
+        if source_key in self.futures:
+            return self.futures[source_key]
+
+        future = None
+        if storage().exists(source_key):
+            digest = stored_file_hash(source_key)
+            manifest = find_stored_image(self.folder, digest)
+            if manifest is not None:
+                future = Future()
+                future.set_result(manifest)
+            else:
+                if self.pool is None:
+                    # The pool only starts once some row has an image that isn't stored yet
+                    self.pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context('spawn')
+                    )
+                future = self.pool.submit(process_bulk_image, source_key, self.folder, self.settings)
+                self.unrecorded[future] = digest
+        self.futures[source_key] = future
+        return future
+
+    def result(self, future):
+        """The manifest; the first time, also record the source in the chunk's transaction"""
+        manifest = future.result()
+        digest = self.unrecorded.pop(future, None)
+        if digest is not None:
+            remember_image(self.folder, digest, manifest['filename'])
+        return manifest
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+
+def _import_rows(app, job):
+    image_work = _ImageWork(app)
+    try:
+        for chunk in iter_sheet_chunks(job.file_path, job.chunk_size, job.chunks_done):
+            _import_chunk(job, chunk, image_work)
+    finally:
+        image_work.shutdown()
+
+
+def _import_chunk(job, chunk, image_work):
+    rows, rejected = validate_rows(chunk)
+    results = [(row_number, sku, 'error', 0, [error]) for row_number, sku, error in rejected]
+
+    # Stage 1: start the image work of every valid row
+    pending = []
+    for fields in rows.to_dict('records'):
+        row_number = fields.pop('row_number')
+        errors = []
+        images = []
+        for filename in fields.pop('image_filenames'):
+            future = image_work.submit(f'bulk_images/{filename}')
+            if future is None:
+                errors.append(f"Row {row_number}: Image '{filename}' not found in bulk_images folder")
+                continue
+            images.append((filename, future))
+        pending.append((row_number, fields, images, errors))
+
+    # Stage 2: insert the chunk once its images finish
+    images_done = images_failed = 0
+    for row_number, fields, images, errors in pending:
+        fields['images'] = []
+        fields['image_variants'] = []
+        for filename, future in images:
+            images_done += 1
+            try:
+                manifest = image_work.result(future)
+                entry = variant_entry(storage(), image_work.folder, manifest)
+                fields['images'].append(entry['src'])
+                fields['image_variants'].append(entry)
+            except Exception as e:
+                images_failed += 1
+                errors.append(f"Row {row_number}: Failed to process image '{filename}': {str(e)}")
+
+    failed = _insert_products([fields for _, fields, _, _ in pending]) if pending else set()
+    for row_number, fields, images, errors in pending:
+        if fields['sku'] in failed:
+            results.append((row_number, fields['sku'], 'error', 0, [
+                f"Row {row_number}: Product with SKU '{fields['sku']}' or slug '{fields['slug']}' already exists"
+            ]))
+        else:
+            results.append((row_number, fields['sku'], 'created', len(fields['images']), errors))
+
+    # Stage 3: the row results and the checkpoint commit with the products
+    created = sum(1 for result in results if result[2] == 'created')
+    if results:
+        db.session.execute(db.insert(ImportRow), [{
+            'job_id': job.id,
+            'row_number': row_number,
+            'sku': sku,
+            'status': status,
+            'images': images,
+            'error_count': len(errors),
+            'errors': errors
+        } for row_number, sku, status, images, errors in results])
+    job.chunks_done += 1
+    job.rows_done += len(chunk)
+    job.created_count += created
+    job.failed_count += len(results) - created
+    job.images_done += images_done
+    job.images_failed += images_failed
+    db.session.commit()
+
+    if created:
+        bump_catalog_version()
+        invalidate_search_index()
+
+
+def _insert_products(mappings):
+    """
+    Insert products with one executemany inside a savepoint. If another
+    writer added a clashing SKU or slug since validation, retry one row per
+    savepoint so only the clashing rows are dropped. Returns their SKUs.
+    """
+    try:
+        with db.session.begin_nested():
+            db.session.execute(db.insert(Product), mappings)
+        return set()
+    except IntegrityError:
+        pass
+
+    failed = set()
+    for fields in mappings:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(Product), [fields])
+        except IntegrityError:
+            failed.add(fields['sku'])
+    return failed
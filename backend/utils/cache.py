@@ -0,0 +1,247 @@
+"""
+Catalog cache.
+
+Storefront catalog reads (product listing, product detail, sections) are
+cached under a global catalog version. Every write that can change what
+those endpoints return (admin product/section edits, bulk imports, stock
+changes from orders) calls bump_catalog_version() after committing. From then
+on readers build new keys, and stale entries expire on their own.
+
+Backends, selected with CACHE_TYPE:
+
+- simple    : in-process LRU bounded by CACHE_MAX_ENTRIES (the default). Each
+              worker caches its own entries, but the version is kept in the
+              cache_versions table, so a bump in one worker invalidates all of
+              them. That costs one primary key lookup per request.
+- redis     : shared Redis server (REDIS_HOST/PORT/DB/PASSWORD), needs `redis`
+- fakeredis : in-memory Redis stand-in for tests, needs `fakeredis`
+- null      : no caching
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, g, has_request_context
+from sqlalchemy.exc import IntegrityError
+from models import db, CacheVersion
+
+VERSION_KEY = 'catalog:version'
+
+
+class LRUCache:
+    """Thread-safe in-process cache with an entry bound and per-entry TTL"""
+
+    def __init__(self, max_entries=1024, default_timeout=300):
+        self.max_entries = max_entries
+        self.default_timeout = default_timeout
+        self._entries = OrderedDict()
+        self._counters = {}  # Kept apart from entries so they are never evicted
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        expires_at = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisCache:
+    """Cache on a redis-py compatible client; values are stored as JSON"""
+
+    def __init__(self, client, default_timeout=300):
+        self.client = client
+        self.default_timeout = default_timeout
+
+    def get(self, key):
+        raw = self.client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, timeout=None):
+        timeout = self.default_timeout if timeout is None else timeout
+        self.client.set(key, json.dumps(value), ex=timeout or None)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+    def counter(self, key):
+        return int(self.client.get(key) or 0)
+
+    def clear(self):
+        self.client.flushdb()
+
+
+class NullCache:
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def incr(self, key):
+        return 0
+
+    def counter(self, key):
+        return 0
+
+    def clear(self):
+        pass
+
+
+class DatabaseCounters:
+    """Counters in the cache_versions table, shared by every process using the database"""
+
+    def counter(self, key):
+        value = db.session.execute(
+            db.select(CacheVersion.version).where(CacheVersion.name == key)
+        ).scalar()
+        return value or 0
+
+    def incr(self, key):
+        """Increment and commit; call it after the change it announces was committed"""
+        updated = db.session.execute(
+            db.update(CacheVersion).where(CacheVersion.name == key).values(version=CacheVersion.version + 1)
+        ).rowcount
+        if not updated:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(CacheVersion(name=key, version=1))
+            except IntegrityError:
+                # Created by a concurrent bump
+                db.session.execute(
+                    db.update(CacheVersion).where(CacheVersion.name == key).values(version=CacheVersion.version + 1)
+                )
+        db.session.commit()
+        return self.counter(key)
+
+
+def create_redis_client(config, fake=False):
+    """Redis client from REDIS_* settings, or an in-memory fakeredis one"""
+    if fake:
+        try:
+            import fakeredis
+        except ImportError:
+            raise RuntimeError('fakeredis backends require the fakeredis package (pip install fakeredis)')
+        return fakeredis.FakeRedis()
+
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError('redis backends require the redis package (pip install redis)')
+    return redis.Redis(
+        host=config['REDIS_HOST'],
+        port=config['REDIS_PORT'],
+        db=config['REDIS_DB'],
+        password=config['REDIS_PASSWORD'],
+    )
+
+
+def create_cache_backend(config):
+    cache_type = config['CACHE_TYPE'].lower()
+    timeout = config['CACHE_DEFAULT_TIMEOUT']
+
+    if cache_type in ('simple', 'lru'):
+        return LRUCache(config['CACHE_MAX_ENTRIES'], timeout)
+
+    if cache_type in ('redis', 'fakeredis'):
+        return RedisCache(create_redis_client(config, fake=cache_type == 'fakeredis'), timeout)
+
+    if cache_type == 'null':
+        return NullCache()
+
+    raise ValueError(f'Unsupported cache type: {cache_type}')
+
+
+class CatalogCache:
+    def __init__(self, backend, counters=None):
+        self.backend = backend
+        # Where the version lives; an in-process backend can't share it
+        self.counters = counters or backend
+
+    def version(self):
+        """The catalog version, read once per request"""
+        if has_request_context() and 'catalog_version' in g:
+            return g.catalog_version
+        version = self.counters.counter(VERSION_KEY)
+        if has_request_context():
+            g.catalog_version = version
+        return version
+
+    def bump(self):
+        version = self.counters.incr(VERSION_KEY)
+        if has_request_context():
+            g.catalog_version = version
+        return version
+
+    def key(self, name, params=None):
+        digest = ''
+        if params:
+            encoded = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+            digest = hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+        return f'catalog:{self.version()}:{name}:{digest}'
+
+    def get_or_set(self, name, params, builder):
+        """
+        Return the cached value for (name, params) under the current catalog
+        version, calling builder() on a miss. Results of None are not cached.
+        """
+        key = self.key(name, params)
+        value = self.backend.get(key)
+        if value is None:
+            value = builder()
+            if value is not None:
+                self.backend.set(key, value)
+        return value
+
+
+def init_cache(app):
+    backend = create_cache_backend(app.config)
+    counters = DatabaseCounters() if isinstance(backend, LRUCache) else None
+    app.extensions['catalog_cache'] = CatalogCache(backend, counters)
+
+
+def catalog_cache():
+    return current_app.extensions['catalog_cache']
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog read; call after committing a catalog change"""
+    return catalog_cache().bump()
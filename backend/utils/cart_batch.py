@@ -0,0 +1,293 @@
+"""
+Batched cart changes (POST /api/cart/batch).
+
+Restoring a saved cart or merging a guest cart used to take one request per
+line, each with its own product lookup, duplicate check and commit. A batch
+applies a list of operations in one transaction:
+
+    {"operations": [
+        {"op": "add", "product_id": 5, "quantity": 2, "size": "M", "color": null},
+        {"op": "update", "item_id": 12, "quantity": 3},
+        {"op": "remove", "item_id": 14}
+    ]}
+
+- The user's cart lines are loaded with one query, and the products the batch
+  adds with one IN query.
+- Operations run in order against those rows in memory. An add merges into
+  the line with the same product, size and color, including a line added
+  earlier in the batch. Updating a line to quantity 0 removes it.
+- Each product whose cart total changed gets its stock hold set once. Only
+  growing totals check availability; lowered ones shrink the hold.
+- Changed and removed lines are written in one flush, new lines with one
+  executemany INSERT, and the cart is read back with one query. A batch of
+  any size costs the same six statements. An invalid operation or missing
+  stock rejects the whole batch and leaves the cart as it was.
+
+A guest cart is merged at login (POST /api/cart/merge) by merge_guest_cart:
+
+    {"lines": [{"product_id": 5, "quantity": 2, "size": "M", "color": null}, ...]}
+
+It checks stock and holds it per product, then writes every line with one
+upsert (upsert_cart_lines). The upsert relies on the unique index on
+(user_id, product_id, size, color). Lines that can't be merged (product gone,
+out of stock) are returned instead of failing the login.
+"""
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import joinedload
+from models import db, CartItem, Product
+from utils.loading import cart_item_loader_options
+from utils.reservations import hold_stock, shrink_hold
+from utils.stock import OutOfStockError
+
+MAX_BATCH_OPERATIONS = 100
+MAX_MERGE_LINES = 100
+
+
+class CartBatchError(Exception):
+    def __init__(self, message, status=400):
+        self.status = status
+        super().__init__(message)
+
+
+def _is_count(value, minimum):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= minimum
+
+
+def validate_operations(operations):
+    if not isinstance(operations, list) or not operations:
+        raise CartBatchError('operations must be a non-empty list')
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise CartBatchError(f'At most {MAX_BATCH_OPERATIONS} operations per batch')
+
+    for index, op in enumerate(operations):
+        if not isinstance(op, dict) or op.get('op') not in ('add', 'update', 'remove'):
+            raise CartBatchError(f'Operation {index}: op must be add, update or remove')
+        id_field = 'product_id' if op['op'] == 'add' else 'item_id'
+        if not _is_count(op.get(id_field), 1):
+            raise CartBatchError(f'Operation {index}: {id_field} required')
+        if op['op'] == 'add' and not _is_count(op.get('quantity', 1), 1):
+            raise CartBatchError(f'Operation {index}: quantity must be a positive integer')
+        if op['op'] == 'update' and not _is_count(op.get('quantity'), 0):
+            raise CartBatchError(f'Operation {index}: quantity must be a non-negative integer')
+
+
+def line_key(product_id, size, color):
+    """A cart line's unique key; no size or color is stored as ''"""
+    return product_id, size or '', color or ''
+
+
+def _totals(lines):
+    totals = {}
+    for line in lines:
+        totals[line.product_id] = totals.get(line.product_id, 0) + line.quantity
+    return totals
+
+
+def _set_holds(user_id, products, before, after):
+    """
+    Hold each changed product's new total. Only growing totals check
+    availability; lowered ones shrink or release the hold once every grow has
+    succeeded. If a grow fails, the holds already grown are restored.
+    """
+    changed = [product_id for product_id in sorted(set(before) | set(after))
+               if before.get(product_id, 0) != after.get(product_id, 0)]
+    grows = [product_id for product_id in changed if after.get(product_id, 0) > before.get(product_id, 0)]
+    shrinks = [product_id for product_id in changed if product_id not in grows]
+
+    reserved_until = {}
+    grown = []
+    try:
+        for product_id in grows:
+            expires_at = hold_stock(user_id, products[product_id], after[product_id])
+            grown.append(products[product_id])
+            reserved_until[str(product_id)] = expires_at.isoformat()
+    except OutOfStockError:
+        for product in grown:
+            shrink_hold(user_id, product, before.get(product.id, 0))
+        raise
+
+    for product_id in shrinks:
+        expires_at = shrink_hold(user_id, products[product_id], after.get(product_id, 0))
+        reserved_until[str(product_id)] = expires_at.isoformat() if expires_at else None
+    return reserved_until
+
+
+def apply_cart_batch(user_id, operations):
+    """
+    Apply the operations and commit. Returns the cart's items (as in GET
+    /api/cart) and {product_id: hold expiry} of the products whose hold
+    changed. Raises CartBatchError without changing anything.
+    """
+    validate_operations(operations)
+    try:
+        return _apply(user_id, operations)
+    except CartBatchError:
+        # Undo the in-memory changes to the loaded lines
+        db.session.rollback()
+        raise
+
+
+def _apply(user_id, operations):
+    lines = CartItem.query.options(*cart_item_loader_options()).filter_by(user_id=user_id).all()
+    before = _totals(lines)
+    by_id = {line.id: line for line in lines}
+    by_key = {line_key(line.product_id, line.size, line.color): line for line in lines}
+    products = {line.product_id: line.product for line in lines}
+
+    wanted = {op['product_id'] for op in operations if op['op'] == 'add'} - products.keys()
+    if wanted:
+        for product in Product.query.options(joinedload(Product.section)).filter(Product.id.in_(wanted)):
+            products[product.id] = product
+
+    added = []
+    removed = set()
+    for index, op in enumerate(operations):
+        if op['op'] == 'add':
+            product = products.get(op['product_id'])
+            if product is None or not product.is_active:
+                raise CartBatchError(f'Operation {index}: Product not found', 404)
+            key = line_key(product.id, op.get('size'), op.get('color'))
+            line = by_key.get(key)
+            if line is None:
+                # Never added to the session; inserted in bulk below
+                line = CartItem(product_id=product.id, quantity=0, size=key[1], color=key[2])
+                by_key[key] = line
+                added.append(line)
+            elif line.id in removed:
+                # Removed earlier in the batch; the add starts it afresh
+                removed.discard(line.id)
+                line.quantity = 0
+            line.quantity += op.get('quantity', 1)
+            continue
+
+        line = by_id.get(op['item_id'])
+        if line is None or line.id in removed:
+            raise CartBatchError(f'Operation {index}: Cart item not found', 404)
+        if op['op'] == 'remove' or op['quantity'] == 0:
+            removed.add(line.id)
+        else:
+            line.quantity = op['quantity']
+
+    kept = [line for line in lines if line.id not in removed] + added
+    try:
+        reserved_until = _set_holds(user_id, products, before, _totals(kept))
+    except OutOfStockError as e:
+        raise CartBatchError(f'Insufficient stock for {e.title}')
+
+    for line in lines:
+        if line.id in removed:
+            db.session.delete(line)
+    db.session.flush()
+    if added:
+        db.session.execute(db.insert(CartItem), [
+            {'user_id': user_id, 'product_id': line.product_id, 'quantity': line.quantity,
+             'size': line.size, 'color': line.color}
+            for line in added
+        ])
+
+    cart = CartItem.query.options(*cart_item_loader_options()).filter_by(user_id=user_id).order_by(CartItem.id).all()
+    items = [item.to_dict() for item in cart]
+    db.session.commit()
+    return items, reserved_until
+
+
+def upsert_cart_lines(user_id, lines):
+    """
+    Add {line_key: quantity} to the user's cart with one INSERT ... ON
+    DUPLICATE KEY UPDATE (MySQL) / ON CONFLICT DO UPDATE (PostgreSQL,
+    SQLite). Missing lines are inserted and existing ones grow by the
+    quantity, so concurrent adds can't create duplicate lines. Not committed.
+    """
+    table = CartItem.__table__
+    rows = [
+        {'user_id': user_id, 'product_id': product_id, 'size': size, 'color': color, 'quantity': quantity}
+        for (product_id, size, color), quantity in lines.items()
+    ]
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('mysql', 'mariadb'):
+        stmt = mysql.insert(table).values(rows)
+        stmt = stmt.on_duplicate_key_update(quantity=table.c.quantity + stmt.inserted.quantity)
+    elif dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = insert(table).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.product_id, table.c.size, table.c.color],
+            set_={'quantity': table.c.quantity + stmt.excluded.quantity},
+        )
+    else:
+        raise RuntimeError(f'Cart upsert is not supported on {dialect}')
+
+    db.session.execute(stmt)
+
+
+def validate_guest_lines(lines):
+    if not isinstance(lines, list):
+        raise CartBatchError('lines must be a list')
+    if len(lines) > MAX_MERGE_LINES:
+        raise CartBatchError(f'At most {MAX_MERGE_LINES} lines per merge')
+
+    for index, line in enumerate(lines):
+        if not isinstance(line, dict) or not _is_count(line.get('product_id'), 1):
+            raise CartBatchError(f'Line {index}: product_id required')
+        if not _is_count(line.get('quantity', 1), 1):
+            raise CartBatchError(f'Line {index}: quantity must be a positive integer')
+        for option in ('size', 'color'):
+            if not isinstance(line.get(option) or '', str):
+                raise CartBatchError(f'Line {index}: {option} must be a string')
+
+
+def merge_guest_cart(user_id, lines):
+    """
+    Add a guest cart's lines to the user's cart and commit. Lines for the same
+    product option are summed, here and with the user's own lines. Returns
+    the cart's items, {product_id: hold expiry} and the lines that were
+    skipped, each with an error.
+    """
+    validate_guest_lines(lines)
+
+    guest = {}
+    for line in lines:
+        key = line_key(line['product_id'], line.get('size'), line.get('color'))
+        guest[key] = guest.get(key, 0) + line.get('quantity', 1)
+
+    wanted = {product_id for product_id, _, _ in guest}
+    products = {}
+    in_cart = {}
+    if wanted:
+        products = {product.id: product for product in Product.query.filter(Product.id.in_(wanted))}
+        in_cart = dict(
+            db.session.query(CartItem.product_id, db.func.sum(CartItem.quantity))
+            .filter(CartItem.user_id == user_id, CartItem.product_id.in_(wanted))
+            .group_by(CartItem.product_id)
+        )
+
+    reserved_until = {}
+    errors = {}
+    for product_id in sorted(wanted):
+        product = products.get(product_id)
+        if product is None or not product.is_active:
+            errors[product_id] = 'Product not found'
+            continue
+        added = sum(quantity for key, quantity in guest.items() if key[0] == product_id)
+        try:
+            expires_at = hold_stock(user_id, product, (in_cart.get(product_id) or 0) + added)
+        except OutOfStockError:
+            errors[product_id] = f'Insufficient stock for {product.title}'
+            continue
+        reserved_until[str(product_id)] = expires_at.isoformat() if expires_at else None
+
+    merged = {key: quantity for key, quantity in guest.items() if key[0] not in errors}
+    if merged:
+        upsert_cart_lines(user_id, merged)
+
+    cart = CartItem.query.options(*cart_item_loader_options()).filter_by(user_id=user_id).order_by(CartItem.id).all()
+    items = [item.to_dict() for item in cart]
+    db.session.commit()
+
+    skipped = [
+        {'product_id': product_id, 'size': size or None, 'color': color or None,
+         'quantity': quantity, 'error': errors[product_id]}
+        for (product_id, size, color), quantity in guest.items() if product_id in errors
+    ]
+    return items, reserved_until, skipped
@@ -0,0 +1,72 @@
+"""
+HTTP conditional requests.
+
+@conditional(validator) runs validator(*view_args) before the view. The
+validator is a cheap query returning (seed, last_modified). Its seed is
+usually row versions such as counts and max(updated_at). The ETag is a hash of
+the request URL and the seed. When the client's If-None-Match (or, without
+it, If-Modified-Since) still matches, a 304 is returned and the view never
+runs, so nothing is loaded or serialized.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from functools import wraps
+from flask import request, current_app
+
+
+def compute_etag(seed):
+    payload = json.dumps([request.path, sorted(request.args.items(multi=True)), seed],
+                         separators=(',', ':'), default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _as_utc(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    # Columns store naive UTC; HTTP dates have second precision
+    return value.replace(tzinfo=timezone.utc, microsecond=0)
+
+
+def is_not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains(etag) or request.if_none_match.star_tag
+    if request.if_modified_since and last_modified:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def set_validators(response, etag, last_modified, private):
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Always revalidate; a matching validator makes that a bodiless 304
+    response.headers['Cache-Control'] = 'private, no-cache' if private else 'public, no-cache'
+    if private:
+        response.vary.add('Authorization')
+    return response
+
+
+def conditional(validator, private=False):
+    """
+    Answer If-None-Match / If-Modified-Since with 304 before running the view.
+    Use private=True for per-user responses (place it under @jwt_required()).
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            seed, last_modified = validator(*args, **kwargs)
+            etag = compute_etag(seed)
+            last_modified = _as_utc(last_modified)
+
+            if is_not_modified(etag, last_modified):
+                return set_validators(current_app.response_class(status=304), etag, last_modified, private)
+
+            response = current_app.make_response(fn(*args, **kwargs))
+            if response.status_code == 200:
+                set_validators(response, etag, last_modified, private)
+            return response
+        return wrapper
+    return decorator
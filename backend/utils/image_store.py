@@ -0,0 +1,169 @@
+"""
+Deduplicated product image storage.
+
+Stored images are named after a hash of their optimized pixels
+(utils/images.store_image), so one file can back any number of products.
+The stored_images table maps the sha256 of uploaded bytes to that file. An
+upload of a file that was stored before is one lookup, with no decoding or
+encoding.
+
+An image's reference count is the number of products whose images list a URL
+of it (any form that resolves to its storage key). It is counted with a query
+when the image is released rather than kept in a counter, so it can never
+drift from Product.images. release_images removes a file once no product
+references it and it hasn't been uploaded or imported for IMAGE_GC_GRACE
+seconds. The grace period protects an image that was just uploaded for a
+product form that hasn't been saved yet. Files spared that way are swept
+later by gc_product_images.py.
+"""
+import hashlib
+import re
+import time
+from io import BytesIO
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from models import db, Product, StoredImage
+from utils.images import load_image, store_image, load_manifest, mark_used, remove_image, uploaded_file
+from utils.storage import READ_CHUNK_SIZE, storage
+
+# Folders whose files are content addressed and may be garbage collected
+IMAGE_FOLDERS = ('products',)
+
+# Sizes and formats written next to a stored image by save_variants
+VARIANT_NAME = re.compile(r'-\d+w\.[a-z]+$')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+
+
+def source_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def stored_file_hash(key):
+    """sha256 of a stored file, streamed"""
+    digest = hashlib.sha256()
+    with storage().open(key) as f:
+        for block in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def find_stored_image(folder, digest):
+    """Manifest of the image stored from a file with this hash; None if there is none any more"""
+    stored = StoredImage.query.filter_by(folder=folder, source_hash=digest).first()
+    if stored is None:
+        return None
+    manifest = load_manifest(storage(), folder, stored.filename)
+    if manifest is not None:
+        mark_used(storage(), folder, stored.filename)
+    return manifest
+
+
+def remember_image(folder, digest, filename):
+    """Record which image a file was stored as; committed by the caller"""
+    stored = StoredImage.query.filter_by(folder=folder, source_hash=digest).first()
+    if stored is not None:
+        # The image it pointed to was collected and has just been stored again
+        stored.filename = filename
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(StoredImage(folder=folder, source_hash=digest, filename=filename))
+    except IntegrityError:
+        # A concurrent upload of the same file recorded it first
+        pass
+
+
+def store_upload(data, folder='products'):
+    """
+    Store the bytes of an uploaded image and return its manifest. The same
+    bytes uploaded again return the stored image right away.
+    """
+    digest = source_hash(data)
+    manifest = find_stored_image(folder, digest)
+    if manifest is None:
+        with load_image(BytesIO(data)) as img:
+            manifest = store_image(img, storage(), folder)
+        remember_image(folder, digest, manifest['filename'])
+        db.session.commit()
+    return manifest
+
+
+def _recently_used(folder, filename):
+    modified = storage().modified(f'{folder}/{filename}')
+    return modified is not None and time.time() - modified < current_app.config['IMAGE_GC_GRACE']
+
+
+def _collect(folder, filename):
+    remove_image(storage(), folder, filename)
+    StoredImage.query.filter_by(folder=folder, filename=filename).delete(synchronize_session=False)
+
+
+def is_referenced(folder, filename):
+    """
+    Whether some product lists this stored image, under any URL that resolves
+    to its key (another host, base URL or the legacy /api/admin/uploads/ form)
+    """
+    # Content-addressed names are unique, so only rows mentioning it can match
+    candidates = db.session.query(Product.images).filter(
+        db.cast(Product.images, db.Text).contains(filename, autoescape=True)
+    )
+    return any(
+        uploaded_file(storage(), url) == (folder, filename)
+        for images, in candidates for url in images or []
+    )
+
+
+def release_images(urls):
+    """
+    Remove the files of these image URLs that no product uses any more. Call
+    it after the commit that dropped them. Returns the removed filenames.
+    """
+    removed = []
+    for url in set(urls or []):
+        location = uploaded_file(storage(), url)
+        if location is None or location[0] not in IMAGE_FOLDERS:
+            continue
+        folder, filename = location
+        if is_referenced(folder, filename) or _recently_used(folder, filename):
+            continue
+        if storage().exists(f'{folder}/{filename}'):
+            _collect(folder, filename)
+            removed.append(filename)
+    if removed:
+        db.session.commit()
+    return removed
+
+
+def referenced_images(folder):
+    """Filenames in folder that some product lists in its images"""
+    filenames = set()
+    for images, in db.session.query(Product.images).yield_per(1000):
+        for url in images or []:
+            location = uploaded_file(storage(), url)
+            if location and location[0] == folder:
+                filenames.add(location[1])
+    return filenames
+
+
+def unused_images(folder):
+    """Stored images in folder that no product references and that are past the grace period"""
+    names = storage().listdir(folder)
+    if not names:
+        return []
+    referenced = referenced_images(folder)
+    return sorted(
+        name for name in names
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+        and not VARIANT_NAME.search(name)
+        and name not in referenced
+        and not _recently_used(folder, name)
+    )
+
+
+def collect_unused_images(folder):
+    """Remove every unused image in folder (see unused_images); returns their filenames"""
+    removed = unused_images(folder)
+    for filename in removed:
+        _collect(folder, filename)
+    db.session.commit()
+    return removed
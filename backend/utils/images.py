@@ -0,0 +1,230 @@
+"""
+Product image processing shared by single uploads and bulk imports.
+
+Files are read and written through a storage backend (utils/storage.py) by
+folder and filename. Only process_bulk_image runs in worker processes; it
+builds its own backend from storage settings.
+
+An upload is decoded once (load_image). Large JPEGs are scaled down by the
+decoder itself, and every file is written once, atomically, as a .jpg.
+
+Every stored product image gets srcset variants next to it:
+- `<stem>-<width>w.jpg` at each of VARIANT_WIDTHS narrower than the image
+- the same widths plus the full width as WebP, and as AVIF where Pillow
+  supports it
+- a `<stem>.json` manifest listing them
+
+Product.image_variants keeps the srcset data of each entry of
+Product.images, built from those manifests.
+
+Stored images are content addressed: the file is named after a hash of the
+optimized pixels, so the same photo is kept (and encoded) once however many
+products use it. utils/image_store.py decides when a file can be removed.
+"""
+import hashlib
+import json
+import os
+from io import BytesIO
+from PIL import Image, features
+from utils.storage import IMMUTABLE_CACHE, split_key, worker_storage
+
+MAX_IMAGE_WIDTH = 1200
+JPEG_QUALITY = 85
+
+# Narrower copies for grid cards, the mini cart and small screens
+VARIANT_WIDTHS = (320, 640, 960)
+
+# (MIME type, Pillow format, extension, save options), best compression first.
+# A format is skipped when Pillow was built without it.
+MODERN_FORMATS = (
+    ('image/avif', 'AVIF', '.avif', {'quality': 55, 'speed': 8}),
+    ('image/webp', 'WEBP', '.webp', {'quality': 80, 'method': 4}),
+)
+
+
+def load_image(source):
+    """
+    Decode an image from a path or file object. JPEGs wider than
+    MAX_IMAGE_WIDTH are decoded at a reduced DCT scale (1/2, 1/4 or 1/8),
+    which skips most of the decoding work for camera-sized photos.
+    """
+    img = Image.open(source)
+    if img.format == 'JPEG' and img.width > MAX_IMAGE_WIDTH:
+        img.draft('RGB', (MAX_IMAGE_WIDTH, max(1, img.height * MAX_IMAGE_WIDTH // img.width)))
+    img.load()
+    return img
+
+
+def optimize_image(img):
+    """Convert to RGB and cap the width at MAX_IMAGE_WIDTH"""
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    if img.width > MAX_IMAGE_WIDTH:
+        ratio = MAX_IMAGE_WIDTH / img.width
+        new_height = int(img.height * ratio)
+        # reducing_gap box-reduces by an integer factor before the LANCZOS pass
+        img = img.resize((MAX_IMAGE_WIDTH, new_height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    return img
+
+
+def encode(img, image_format, **options):
+    buffer = BytesIO()
+    img.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def save_encoded(storage, folder, name, img, image_format, **options):
+    # Every name is derived from the content hash, so the file never changes
+    storage.save(f'{folder}/{name}', encode(img, image_format, **options), cache_control=IMMUTABLE_CACHE)
+
+
+def modern_formats():
+    return [entry for entry in MODERN_FORMATS if features.check(entry[1].lower())]
+
+
+def manifest_name(filename):
+    return f'{os.path.splitext(filename)[0]}.json'
+
+
+def save_variants(img, storage, folder, filename):
+    """
+    Write the srcset variants of an optimized image that is stored as
+    folder/filename, and their manifest. Returns the manifest.
+    """
+    stem = os.path.splitext(filename)[0]
+    widths = [width for width in VARIANT_WIDTHS if width < img.width]
+    resized = {
+        width: img.resize((width, max(1, round(img.height * width / img.width))),
+                          Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for width in widths
+    }
+    resized[img.width] = img
+
+    variants = {'image/jpeg': []}
+    for width in widths:
+        name = f'{stem}-{width}w.jpg'
+        save_encoded(storage, folder, name, resized[width], 'JPEG', quality=JPEG_QUALITY, optimize=True)
+        variants['image/jpeg'].append([width, name])
+    variants['image/jpeg'].append([img.width, filename])
+
+    for mime_type, image_format, extension, options in modern_formats():
+        variants[mime_type] = []
+        for width, variant in resized.items():
+            name = f'{stem}-{width}w{extension}'
+            save_encoded(storage, folder, name, variant, image_format, **options)
+            variants[mime_type].append([width, name])
+
+    manifest = {
+        'filename': filename,
+        'width': img.width,
+        'height': img.height,
+        'variants': variants
+    }
+    # Written last: a manifest means every file it lists exists
+    storage.save(f'{folder}/{manifest_name(filename)}', json.dumps(manifest).encode('utf-8'),
+                 cache_control=IMMUTABLE_CACHE)
+    return manifest
+
+
+def load_manifest(storage, folder, filename):
+    """Manifest of a stored image; None if it has none"""
+    try:
+        with storage.open(f'{folder}/{manifest_name(filename)}') as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def mark_used(storage, folder, filename):
+    """Bump the image's modification time; recently used files are spared by garbage collection"""
+    storage.touch(f'{folder}/{filename}')
+
+
+def content_name(img):
+    """Filename of an optimized image, from a hash of its mode, size and pixels"""
+    digest = hashlib.sha256(f'{img.mode}:{img.width}x{img.height}:'.encode())
+    digest.update(img.tobytes())
+    return f'{digest.hexdigest()[:32]}.jpg'
+
+
+def store_image(img, storage, folder):
+    """
+    Optimize a decoded image into folder, with its variants, and return the
+    manifest. An image whose pixels are already stored is not written again.
+    """
+    img = optimize_image(img)
+    filename = content_name(img)
+    manifest = load_manifest(storage, folder, filename)
+    if manifest is not None:
+        mark_used(storage, folder, filename)
+        return manifest
+    save_encoded(storage, folder, filename, img, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    return save_variants(img, storage, folder, filename)
+
+
+def remove_image(storage, folder, filename):
+    """Delete a stored image, its variants and its manifest"""
+    names = {filename}
+    manifest = load_manifest(storage, folder, filename)
+    if manifest is not None:
+        for files in manifest['variants'].values():
+            names.update(name for _, name in files)
+    # The manifest goes first, so no one reuses an image that is half deleted
+    storage.delete(f'{folder}/{manifest_name(filename)}')
+    for name in names:
+        storage.delete(f'{folder}/{name}')
+
+
+def process_bulk_image(source_key, dest_folder, settings):
+    """
+    Store an image from the bulk_images folder in dest_folder (see
+    store_image) and return the manifest. Raises if the image can't be read.
+    Runs in a worker process; settings come from storage_settings().
+    """
+    storage = worker_storage(settings)
+    with storage.open(source_key) as f:
+        data = f.read()
+    with load_image(BytesIO(data)) as img:
+        return store_image(img, storage, dest_folder)
+
+
+def uploaded_file(storage, url):
+    """(folder, filename) of a URL of a stored file; None for any other URL"""
+    key = storage.key_for_url(url)
+    return split_key(key) if key else None
+
+
+def variant_entry(storage, folder, manifest):
+    """srcset data of one image, as stored in Product.image_variants"""
+    def srcset(files):
+        return ', '.join(f"{storage.url(f'{folder}/{name}')} {width}w" for width, name in files)
+
+    return {
+        'src': storage.url(f"{folder}/{manifest['filename']}"),
+        'width': manifest['width'],
+        'height': manifest['height'],
+        'srcset': srcset(manifest['variants']['image/jpeg']),
+        'sources': [
+            {'type': mime_type, 'srcset': srcset(files)}
+            for mime_type, files in manifest['variants'].items()
+            if mime_type != 'image/jpeg'
+        ]
+    }
+
+
+def image_variants(urls, storage):
+    """
+    Product.image_variants for a list of image URLs. The entry is None for
+    images without a manifest (external URLs or files uploaded before variants).
+    """
+    entries = []
+    for url in urls or []:
+        entry = None
+        location = uploaded_file(storage, url)
+        if location:
+            folder, filename = location
+            manifest = load_manifest(storage, folder, filename)
+            if manifest is not None:
+                entry = variant_entry(storage, folder, manifest)
+        entries.append(entry)
+    return entries
@@ -0,0 +1,159 @@
+"""
+Development index advisor (INDEX_ADVISOR=True).
+
+Records the shape of every SELECT each endpoint issues (the SQL with its
+placeholders, so every call of a query counts as one shape). The first time
+an endpoint issues a shape, the advisor EXPLAINs it on the same connection
+with the same parameters and flags:
+
+- full scans: sqlite `SCAN <table>` without an index, mysql `type: ALL`,
+  postgresql `Seq Scan`
+- sorts no index provides: sqlite `USE TEMP B-TREE`, mysql `Using filesort`,
+  postgresql `Sort`
+
+Flagged shapes are logged as warnings. GET /api/debug/index-advisor lists
+every endpoint's shapes with call counts and findings.
+
+Streamed queries (yield_per) are counted but not EXPLAINed: their rows are
+still unread on the connection.
+
+Planners scan tiny tables whatever indexes exist (PostgreSQL in particular),
+so use it against realistic data. It costs one EXPLAIN per new shape and
+keeps every shape in memory, so never enable it in production.
+"""
+import json
+import threading
+from flask import has_request_context, jsonify, request
+from sqlalchemy import event
+from models import db
+
+
+def _sqlite_plan(cursor, statement, parameters):
+    cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+    details = [row[-1] for row in cursor.fetchall()]
+    scans = [detail for detail in details
+             if detail.startswith('SCAN ') and ' USING ' not in detail
+             and not detail.startswith(('SCAN CONSTANT ROW', 'SCAN (subquery'))]
+    sorts = [detail for detail in details if 'TEMP B-TREE' in detail]
+    return scans, sorts
+
+
+def _mysql_plan(cursor, statement, parameters):
+    cursor.execute('EXPLAIN ' + statement, parameters)
+    columns = [column[0] for column in cursor.description]
+    rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    scans = [f"{row['table']} (type ALL, ~{row['rows']} rows)" for row in rows if row.get('type') == 'ALL']
+    sorts = [f"{row['table']} ({row['Extra']})" for row in rows if 'filesort' in (row.get('Extra') or '')]
+    return scans, sorts
+
+
+def _postgresql_plan(cursor, statement, parameters):
+    # A failed EXPLAIN must not abort the request's transaction
+    cursor.execute('SAVEPOINT index_advisor')
+    try:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + statement, parameters)
+        plan = cursor.fetchone()[0]
+    except Exception:
+        cursor.execute('ROLLBACK TO SAVEPOINT index_advisor')
+        raise
+    cursor.execute('RELEASE SAVEPOINT index_advisor')
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans, sorts = [], []
+    nodes = [plan[0]['Plan']]
+    while nodes:
+        node = nodes.pop()
+        if node['Node Type'] == 'Seq Scan':
+            scans.append(f"{node['Relation Name']} (~{node.get('Plan Rows')} rows)")
+        elif node['Node Type'] == 'Sort':
+            sorts.append(', '.join(node.get('Sort Key', [])))
+        nodes.extend(node.get('Plans', []))
+    return scans, sorts
+
+
+PLANNERS = {
+    'sqlite': _sqlite_plan,
+    'mysql': _mysql_plan,
+    'mariadb': _mysql_plan,
+    'postgresql': _postgresql_plan,
+}
+
+
+class IndexAdvisor:
+    """{endpoint: {statement: {'count', 'full_scans', 'sorts'}}}, filled by an engine event"""
+
+    def __init__(self, app):
+        self.app = app
+        self.shapes = {}
+        self._lock = threading.Lock()
+
+    def attach(self, engine):
+        self.planner = PLANNERS.get(engine.dialect.name)
+        event.listen(engine, 'after_cursor_execute', self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if executemany or not has_request_context() or not statement.lstrip().upper().startswith('SELECT'):
+            return
+        endpoint = request.endpoint or request.path
+
+        with self._lock:
+            shapes = self.shapes.setdefault(endpoint, {})
+            shape = shapes.get(statement)
+            if shape is not None:
+                shape['count'] += 1
+                return
+            shape = shapes[statement] = {'count': 1, 'full_scans': [], 'sorts': []}
+
+        if self.planner is None:
+            return
+        # A streamed result (yield_per) is still being read from the connection;
+        # on MySQL's unbuffered cursor an EXPLAIN would discard its rows
+        if context is not None and context.execution_options.get('stream_results'):
+            shape['skipped'] = 'streamed result'
+            return
+        # A plain DBAPI cursor: its EXPLAIN doesn't fire this event again
+        explain_cursor = conn.connection.cursor()
+        try:
+            shape['full_scans'], shape['sorts'] = self.planner(explain_cursor, statement, parameters)
+        except Exception as e:
+            shape['error'] = str(e)
+        finally:
+            explain_cursor.close()
+
+        if shape['full_scans']:
+            self.app.logger.warning(
+                'Index advisor: %s scans %s in\n%s', endpoint, ', '.join(shape['full_scans']), statement
+            )
+
+    def report(self):
+        with self._lock:
+            return {
+                endpoint: [{'statement': statement, **shape} for statement, shape in shapes.items()]
+                for endpoint, shapes in sorted(self.shapes.items())
+            }
+
+    def findings(self):
+        """Only the shapes with a full scan or an unindexed sort"""
+        findings = {}
+        for endpoint, shapes in self.report().items():
+            flagged = [shape for shape in shapes if shape['full_scans'] or shape['sorts']]
+            if flagged:
+                findings[endpoint] = flagged
+        return findings
+
+
+def init_index_advisor(app):
+    if not app.config['INDEX_ADVISOR']:
+        return
+
+    advisor = IndexAdvisor(app)
+    with app.app_context():
+        advisor.attach(db.engine)
+    app.extensions['index_advisor'] = advisor
+
+    @app.route('/api/debug/index-advisor')
+    def debug_index_advisor():
+        if request.args.get('all'):
+            return jsonify(advisor.report())
+        return jsonify(advisor.findings())
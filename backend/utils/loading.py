@@ -0,0 +1,38 @@
+"""
+Eager loading strategies for list endpoints.
+
+Serializing a product reads `product.section`, and cart/wishlist/order items
+serialize their product, so loading these lazily costs one extra query per row.
+Every list route applies the matching options below so a page is fetched with
+a fixed number of queries regardless of its size:
+
+- many-to-one relations (section, address, payment details) are joined
+- one-to-many collections (order items) use selectin, one IN query per page
+"""
+from sqlalchemy.orm import joinedload, selectinload
+from models import Product, CartItem, WishlistItem, Order, OrderItem
+
+
+def product_loader_options():
+    return (joinedload(Product.section),)
+
+
+def cart_item_loader_options():
+    return (joinedload(CartItem.product).joinedload(Product.section),)
+
+
+def wishlist_item_loader_options():
+    return (joinedload(WishlistItem.product).joinedload(Product.section),)
+
+
+def order_loader_options():
+    return (
+        joinedload(Order.address),
+        joinedload(Order.payment_details),
+        selectinload(Order.order_items).joinedload(OrderItem.product).joinedload(Product.section),
+    )
+
+
+def admin_order_loader_options():
+    """The order graph plus its customer, for Order.to_dict(include_user=True)"""
+    return (joinedload(Order.user), *order_loader_options())
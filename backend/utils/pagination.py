@@ -0,0 +1,157 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+from flask import current_app
+from models import db
+from utils.cache import catalog_cache
+
+# Totals for listings: estimate (statistics or a cached count), exact (COUNT(*) every time) or none
+COUNT_MODES = ('estimate', 'exact', 'none')
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row on a page into an opaque cursor"""
+    payload = []
+    for value in values:
+        if isinstance(value, datetime):
+            payload.append({'dt': value.isoformat()})
+        else:
+            payload.append(value)
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(payload, list):
+        raise ValueError('Invalid cursor')
+
+    values = []
+    for value in payload:
+        if isinstance(value, dict) and 'dt' in value:
+            values.append(datetime.fromisoformat(value['dt']))
+        else:
+            values.append(value)
+    return values
+
+
+def keyset_filter(order_columns, values, descending):
+    """
+    Build the WHERE clause that selects rows strictly after `values` in the
+    ordering given by `order_columns`. The last column must be unique (the
+    primary key) so that ties on the leading columns are broken deterministically.
+    """
+    if len(values) != len(order_columns):
+        raise ValueError('Invalid cursor')
+
+    clauses = []
+    for i, column in enumerate(order_columns):
+        equal_prefix = [order_columns[j] == values[j] for j in range(i)]
+        beyond = column < values[i] if descending else column > values[i]
+        clauses.append(db.and_(*equal_prefix, beyond))
+    return db.or_(*clauses)
+
+
+def keyset_paginate(query, order_columns, cursor=None, limit=20, descending=False):
+    """
+    Fetch one page of `query` ordered by `order_columns` using keyset (seek)
+    pagination. Returns (items, next_cursor); next_cursor is None on the last page.
+
+    Rows are fetched with limit + 1 so the existence of a next page is known
+    without a COUNT(*) query.
+    """
+    if cursor:
+        query = query.filter(keyset_filter(order_columns, decode_cursor(cursor), descending))
+
+    ordering = [column.desc() if descending else column.asc() for column in order_columns]
+    rows = query.order_by(*ordering).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in order_columns])
+    return rows, next_cursor
+
+
+def ranked_paginate(query, id_column, ranked_ids, cursor=None, limit=20):
+    """
+    Fetch one page of `query` restricted to `ranked_ids`, keeping their order
+    (e.g. search relevance). The cursor encodes the position in the ranked list.
+    Returns (items, next_cursor).
+    """
+    offset = 0
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+            raise ValueError('Invalid cursor')
+        offset = values[0]
+
+    if not ranked_ids:
+        return [], None
+
+    # Apply the query's own filters to the ranked ids in one id-only query
+    matching = {row[0] for row in query.with_entities(id_column).filter(id_column.in_(ranked_ids))}
+    ordered = [item_id for item_id in ranked_ids if item_id in matching]
+    window = ordered[offset:offset + limit]
+    if not window:
+        return [], None
+
+    rows = {getattr(row, id_column.key): row for row in query.filter(id_column.in_(window))}
+    items = [rows[item_id] for item_id in window if item_id in rows]
+
+    next_cursor = encode_cursor([offset + limit]) if offset + limit < len(ordered) else None
+    return items, next_cursor
+
+
+def table_row_estimate(table):
+    """Row count from the database's table statistics, without scanning; None where there are none"""
+    dialect = db.engine.dialect.name
+    if dialect in ('mysql', 'mariadb'):
+        return db.session.execute(db.text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :name"
+        ), {'name': table.name}).scalar()
+    if dialect == 'postgresql':
+        estimate = db.session.execute(db.text(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"
+        ), {'name': table.name}).scalar()
+        # -1 until the table is first analyzed
+        return estimate if estimate is not None and estimate >= 0 else None
+    return None
+
+
+def count_rows(query, table, mode, filters=None):
+    """
+    Total rows of a listing for one of COUNT_MODES. Returns (total, is_estimate).
+
+    exact runs COUNT(*) over the filtered query. estimate reads the table
+    statistics when nothing is filtered (MySQL information_schema, PostgreSQL
+    pg_class); otherwise it reuses a COUNT(*) for LISTING_COUNT_CACHE_TTL
+    seconds. none skips counting.
+    """
+    if mode == 'none':
+        return None, False
+    if mode == 'exact':
+        return query.order_by(None).count(), False
+
+    if not filters:
+        estimate = table_row_estimate(table)
+        if estimate is not None:
+            return estimate, True
+
+    encoded = json.dumps([table.name, filters], sort_keys=True, separators=(',', ':'), default=str)
+    key = 'count:' + hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+    cache = catalog_cache().backend
+    total = cache.get(key)
+    if total is None:
+        total = query.order_by(None).count()
+        cache.set(key, total, current_app.config['LISTING_COUNT_CACHE_TTL'])
+    return total, True
@@ -0,0 +1,71 @@
+import threading
+from functools import wraps
+from flask import current_app
+from sqlalchemy import event
+from models import db
+
+
+class QueryCounter:
+    """
+    Count the SQL statements executed by the current thread while active.
+
+        with QueryCounter() as counter:
+            ...
+        counter.count, counter.statements
+    """
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.count = 0
+        self.statements = []
+        self._thread_id = None
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # The engine is shared, only record statements issued by our thread
+        if threading.get_ident() == self._thread_id:
+            self.count += 1
+            self.statements.append(statement)
+
+    def __enter__(self):
+        if self.engine is None:
+            self.engine = db.engine
+        self._thread_id = threading.get_ident()
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+        return False
+
+
+def query_budget(max_queries):
+    """
+    Declare the number of queries an endpoint may issue.
+
+    Under TESTING exceeding the budget raises AssertionError so regressions
+    (e.g. a relationship that starts loading lazily) fail loudly; otherwise it
+    is logged when LOG_SQL_QUERIES is enabled. In debug/testing the actual count
+    is returned in the X-Query-Count header.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with QueryCounter() as counter:
+                rv = fn(*args, **kwargs)
+
+            if counter.count > max_queries:
+                message = (f'{fn.__name__} issued {counter.count} queries '
+                           f'(budget {max_queries}):\n' + '\n'.join(counter.statements))
+                if current_app.testing:
+                    raise AssertionError(message)
+                if current_app.config.get('LOG_SQL_QUERIES'):
+                    current_app.logger.warning(message)
+
+            if current_app.debug or current_app.testing:
+                rv = current_app.make_response(rv)
+                rv.headers['X-Query-Count'] = str(counter.count)
+            return rv
+        # Lets test_query_budgets.py find every budgeted endpoint
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
@@ -0,0 +1,211 @@
+"""
+Background receipt rendering.
+
+reportlab rendering is CPU bound. Doing it on the request thread means a burst
+of downloads after a sale ties up every Flask worker. Receipts are therefore
+pre-rendered when an order is placed or its status changes. The work runs in
+a pool of RECEIPT_WORKERS processes, so it never holds the GIL of the
+serving process.
+
+- At most RECEIPT_QUEUE_SIZE receipts are queued or rendering at once. Beyond
+  that a job stays 'queued' in the receipt_jobs table and is submitted by the
+  next download or status poll, so bursts cannot grow memory without bound.
+- The receipt_jobs table records one row per order:
+  queued -> rendering -> ready | failed. After a restart, jobs left 'queued'
+  or 'rendering' are submitted again the next time they are asked for.
+- /receipt sends the cached file when it exists. Otherwise it answers
+  202 Accepted with a poll URL.
+
+RECEIPT_WORKERS=0 disables the pool, and receipts are rendered inline on
+download as before.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from flask import current_app, jsonify, send_file
+from sqlalchemy.exc import IntegrityError
+from models import db, ReceiptJob
+from utils.receipts import receipt_cache_path, receipt_data, render_to_file, cached_receipt
+
+
+class ReceiptRenderer:
+    def __init__(self, app):
+        self.app = app
+        self.workers = app.config['RECEIPT_WORKERS']
+        self.slots = threading.BoundedSemaphore(app.config['RECEIPT_QUEUE_SIZE'])
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def executor(self):
+        # Started on first use; spawn keeps the workers free of the parent's
+        # threads and database connections
+        with self.lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def enqueue(self, order):
+        """
+        Make sure the current version of the order's receipt is rendered or
+        on its way, and return its ReceiptJob
+        """
+        path = receipt_cache_path(order)
+        receipt_file = os.path.basename(path)
+
+        job = order.receipt_job
+        if job is None:
+            job = ReceiptJob(order_id=order.id, receipt_file=receipt_file)
+            db.session.add(job)
+        elif job.receipt_file != receipt_file:
+            job.receipt_file = receipt_file
+            job.status = 'queued'
+            job.error = None
+
+        if os.path.exists(path):
+            job.status = 'ready'
+        elif job.status == 'ready':
+            # The cached file was removed; render it again
+            job.status = 'queued'
+
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another request created the job for this order first
+            db.session.rollback()
+            return self.enqueue(order)
+
+        if job.status in ('queued', 'rendering') and self._submit(order, path):
+            # Only if the render hasn't already finished and marked it ready
+            ReceiptJob.query.filter_by(id=job.id, status='queued').update(
+                {'status': 'rendering'}, synchronize_session=False
+            )
+            db.session.commit()
+            db.session.refresh(job)
+        return job
+
+    def _submit(self, order, path):
+        """Hand a render to the pool; False if the queue is full"""
+        with self.lock:
+            if path in self.in_flight:
+                return True
+            if not self.slots.acquire(blocking=False):
+                return False
+            self.in_flight.add(path)
+
+        try:
+            data = receipt_data(order)
+            try:
+                future = self.executor.submit(render_to_file, data, path)
+            except BrokenProcessPool:
+                # A worker died (e.g. killed for memory); start a fresh pool
+                self._reset_executor()
+                future = self.executor.submit(render_to_file, data, path)
+        except Exception:
+            self._release(path)
+            raise
+        future.add_done_callback(partial(self._finished, order.id, os.path.basename(path), path))
+        return True
+
+    def _reset_executor(self):
+        with self.lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, path):
+        with self.lock:
+            self.in_flight.discard(path)
+        self.slots.release()
+
+    def _finished(self, order_id, receipt_file, path, future):
+        self._release(path)
+        error = future.exception()
+        with self.app.app_context():
+            try:
+                ReceiptJob.query.filter_by(order_id=order_id, receipt_file=receipt_file).update({
+                    'status': 'failed' if error else 'ready',
+                    'error': str(error) if error else None,
+                }, synchronize_session=False)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception('Could not record receipt job result for order %s', order_id)
+            finally:
+                db.session.remove()
+        if error:
+            self.app.logger.error('Rendering receipt for order %s failed: %s', order_id, error)
+
+
+def init_receipt_renderer(app):
+    if app.config['RECEIPT_WORKERS'] > 0:
+        app.extensions['receipt_renderer'] = ReceiptRenderer(app)
+
+
+def receipt_renderer():
+    return current_app.extensions.get('receipt_renderer')
+
+
+def prerender_receipt(order):
+    """Queue a render after an order was committed; never fails the caller"""
+    renderer = receipt_renderer()
+    if renderer is None:
+        return
+    try:
+        renderer.enqueue(order)
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception('Could not queue receipt for order %s', order.id)
+
+
+def send_receipt(path, order):
+    return send_file(
+        path,
+        as_attachment=True,
+        download_name=f'receipt_{order.receipt_number}.pdf',
+        mimetype='application/pdf'
+    )
+
+
+def receipt_response(order, poll_url):
+    """The cached PDF, or 202 with a poll URL while it renders"""
+    path = receipt_cache_path(order)
+    if os.path.exists(path):
+        return send_receipt(path, order)
+
+    renderer = receipt_renderer()
+    if renderer is None:
+        return send_receipt(cached_receipt(order), order)
+
+    job = renderer.enqueue(order)
+    if job.status == 'ready':
+        return send_receipt(path, order)
+    if job.status == 'failed':
+        # Retry once inline so a worker crash doesn't leave the receipt unavailable
+        return send_receipt(cached_receipt(order), order)
+
+    response = jsonify({'status': job.status, 'poll_url': poll_url})
+    response.status_code = 202
+    response.headers['Location'] = poll_url
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+def receipt_status(order, download_url, poll_url):
+    renderer = receipt_renderer()
+    if renderer is None or os.path.exists(receipt_cache_path(order)):
+        return {'status': 'ready', 'download_url': download_url}
+
+    job = renderer.enqueue(order)
+    if job.status == 'ready':
+        return {'status': 'ready', 'download_url': download_url}
+    if job.status == 'failed':
+        return {'status': 'failed', 'error': job.error, 'download_url': download_url}
+    return {'status': job.status, 'poll_url': poll_url}
@@ -0,0 +1,417 @@
+"""
+Order receipt PDFs.
+
+Everything in a receipt that doesn't depend on the order is built once per
+process by ReceiptTemplate: paragraph styles, table styles and the
+downscaled logo. render_receipt() only lays out the order-specific flowables.
+
+Rendered receipts are cached on disk in RECEIPT_CACHE_FOLDER. The file name
+is derived from (order id, order updated_at, TEMPLATE_VERSION). Any change to
+an order moves it to a new file, and repeat downloads are served straight
+from disk without rendering. Bump TEMPLATE_VERSION when the layout changes.
+"""
+import glob
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from flask import current_app
+from reportlab.lib.pagesizes import letter
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib import colors
+from PIL import Image as PILImage
+
+TEMPLATE_VERSION = 1
+
+LOGO_PATHS = (
+    os.path.join('public', 'truaxis_logo.png'),
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 'public', 'truaxis_logo.png'),
+)
+
+LOGO_WIDTH = 1.5*inch
+LOGO_HEIGHT = 0.6*inch
+LOGO_DPI = 300
+
+CONTACT_INFO = """
+<b>Contact:</b> support@truaxisventures.com | +91-XXXXXXXXXX | www.truaxisventures.com<br/>
+<i>This is a computer-generated receipt and does not require a signature.</i>
+"""
+
+
+class ReceiptTemplate:
+    """Order-independent parts of a receipt, built once"""
+
+    def __init__(self):
+        styles = getSampleStyleSheet()
+        self.normal_style = styles['Normal']
+
+        # Custom styles - more compact
+        self.company_style = ParagraphStyle(
+            'CompanyStyle',
+            parent=styles['Heading1'],
+            fontSize=22,
+            spaceAfter=3,
+            alignment=1,  # Center alignment
+            textColor=colors.HexColor('#1f2937'),
+            fontName='Helvetica-Bold'
+        )
+        self.tagline_style = ParagraphStyle(
+            'TaglineStyle',
+            parent=styles['Normal'],
+            fontSize=10,
+            spaceAfter=12,
+            alignment=1,
+            textColor=colors.HexColor('#6b7280'),
+            fontName='Helvetica-Oblique'
+        )
+        self.receipt_title_style = ParagraphStyle(
+            'ReceiptTitle',
+            parent=styles['Heading2'],
+            fontSize=16,
+            spaceAfter=15,
+            alignment=1,
+            textColor=colors.HexColor('#2563eb'),
+            fontName='Helvetica-Bold'
+        )
+        self.section_header_style = ParagraphStyle(
+            'SectionHeader',
+            parent=styles['Heading3'],
+            fontSize=12,
+            spaceAfter=6,
+            spaceBefore=8,
+            textColor=colors.HexColor('#1f2937'),
+            fontName='Helvetica-Bold',
+            backColor=colors.HexColor('#f9fafb')
+        )
+        self.footer_style = ParagraphStyle(
+            'FooterStyle',
+            parent=styles['Normal'],
+            fontSize=9,
+            alignment=1,
+            textColor=colors.HexColor('#6b7280'),
+            spaceAfter=5
+        )
+        self.contact_style = ParagraphStyle(
+            'ContactStyle',
+            parent=styles['Normal'],
+            fontSize=8,
+            alignment=1,
+            textColor=colors.HexColor('#6b7280'),
+            leading=10
+        )
+
+        self.line_style = TableStyle([
+            ('LINEABOVE', (0, 0), (-1, -1), 2, colors.HexColor('#2563eb')),
+        ])
+        self.info_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f8fafc')),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('TOPPADDING', (0, 0), (-1, -1), 4),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+            ('LEFTPADDING', (0, 0), (-1, -1), 6),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb')),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ])
+        self.box_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor('#f8fafc')),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('LEFTPADDING', (0, 0), (-1, -1), 8),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#e5e7eb')),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ])
+        self.items_style = TableStyle([
+            # Header row styling
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2563eb')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 9),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+
+            # Data rows styling
+            ('ALIGN', (0, 1), (0, -4), 'LEFT'),
+            ('ALIGN', (1, 1), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 1), (-1, -4), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -4), 8),
+            ('TOPPADDING', (0, 0), (-1, -4), 4),
+            ('BOTTOMPADDING', (0, 0), (-1, -4), 4),
+            ('LEFTPADDING', (0, 0), (-1, -1), 6),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+
+            # Subtotal and total rows
+            ('FONTNAME', (2, -3), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (2, -3), (-1, -1), 9),
+            ('BACKGROUND', (2, -1), (-1, -1), colors.HexColor('#f3f4f6')),
+
+            # Grid lines
+            ('GRID', (0, 0), (-1, -4), 1, colors.HexColor('#e5e7eb')),
+            ('LINEABOVE', (2, -3), (-1, -3), 1, colors.HexColor('#d1d5db')),
+            ('LINEABOVE', (2, -1), (-1, -1), 2, colors.HexColor('#2563eb')),
+
+            # Alternating row colors for better readability
+            ('ROWBACKGROUNDS', (0, 1), (-1, -4), [colors.white, colors.HexColor('#f9fafb')]),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ])
+
+        self.logo_png = self._load_logo()
+
+    @staticmethod
+    def _load_logo():
+        """
+        Downscale the logo once to LOGO_DPI at its printed size and keep the
+        PNG bytes. Receipts fall back to text without it.
+        """
+        for path in LOGO_PATHS:
+            if os.path.exists(path):
+                try:
+                    with PILImage.open(path) as source:
+                        source.thumbnail((int(LOGO_WIDTH / inch * LOGO_DPI), int(LOGO_HEIGHT / inch * LOGO_DPI)))
+                        data = io.BytesIO()
+                        source.save(data, format='PNG')
+                    return data.getvalue()
+                except Exception:
+                    return None
+        return None
+
+    def header(self):
+        story = []
+        if self.logo_png is not None:
+            # A new flowable per receipt: flowables keep per-render state
+            # (canvas, image reader), so one instance can't be shared by
+            # receipts rendered in parallel threads
+            logo = Image(io.BytesIO(self.logo_png), width=LOGO_WIDTH, height=LOGO_HEIGHT)
+            logo.hAlign = 'CENTER'
+            story.append(logo)
+            story.append(Spacer(1, 5))
+
+        # Company name and tagline
+        story.append(Paragraph("TruAxis Ventures", self.company_style))
+        story.append(Paragraph("Your Trusted E-commerce Partner", self.tagline_style))
+
+        # Add a horizontal line
+        line = Table([['', '']], colWidths=[5*inch, 0])
+        line.setStyle(self.line_style)
+        story.append(line)
+        story.append(Spacer(1, 10))
+
+        # Receipt title
+        story.append(Paragraph("PAYMENT RECEIPT", self.receipt_title_style))
+        return story
+
+    def box(self, text):
+        table = Table([[Paragraph(text, self.normal_style)]], colWidths=[6*inch])
+        table.setStyle(self.box_style)
+        return table
+
+    def footer(self):
+        return [
+            Paragraph("Thank you for choosing TruAxis Ventures!", self.footer_style),
+            Paragraph(CONTACT_INFO, self.contact_style),
+        ]
+
+
+_template = None
+_template_lock = threading.Lock()
+
+
+def receipt_template():
+    global _template
+    if _template is None:
+        with _template_lock:
+            if _template is None:
+                _template = ReceiptTemplate()
+    return _template
+
+
+def receipt_data(order):
+    """
+    Everything a receipt shows, as plain picklable data, so it can be
+    rendered away from the database session (e.g. in a worker process)
+    """
+    address = order.address
+    address_lines = [
+        address.full_name,
+        address.address_line1,
+    ]
+    if address.address_line2:
+        address_lines.append(address.address_line2)
+    address_lines.extend([
+        f"{address.city}, {address.state} - {address.pincode}",
+        f"Phone: {address.phone}"
+    ])
+
+    payment_info = None
+    payment = order.payment_details
+    if payment:
+        if payment.payment_method == 'card':
+            payment_info = f"Card: **** **** **** {payment.card_number_last4} | {payment.card_holder_name}"
+        elif payment.payment_method == 'upi':
+            payment_info = f"UPI: {payment.upi_id} | {payment.upi_name}"
+        else:
+            payment_info = "Cash on Delivery"
+
+    items = []
+    for item in order.order_items:
+        item_name = item.product.title
+        item_details = []
+        if item.size:
+            item_details.append(f"Size: {item.size}")
+        if item.color:
+            item_details.append(f"Color: {item.color}")
+
+        if item_details:
+            item_name += f" ({', '.join(item_details)})"
+        items.append((item_name, item.quantity, item.price))
+
+    return {
+        'receipt_number': order.receipt_number,
+        'order_number': order.order_number,
+        'date': order.created_at.strftime('%d %b %Y, %I:%M %p'),
+        'payment_method': order.payment_method.upper(),
+        'payment_status': order.payment_status.title(),
+        'customer_name': order.user.name,
+        'customer_email': order.user.email,
+        'customer_phone': order.user.phone or 'N/A',
+        'address_lines': address_lines,
+        'payment_info': payment_info,
+        'items': items,
+        'total_amount': order.total_amount,
+    }
+
+
+def render_receipt(data):
+    """Render receipt_data() output and return the PDF bytes"""
+    template = receipt_template()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=letter,
+        rightMargin=50,
+        leftMargin=50,
+        topMargin=50,
+        bottomMargin=50
+    )
+    story = template.header()
+
+    # Two-column layout for receipt details and customer info
+    left_data = [
+        ['Receipt No:', data['receipt_number']],
+        ['Order No:', data['order_number']],
+        ['Date:', data['date']],
+        ['Payment:', data['payment_method']],
+        ['Status:', data['payment_status']],
+    ]
+    right_data = [
+        ['Customer:', data['customer_name']],
+        ['Email:', data['customer_email']],
+        ['Phone:', data['customer_phone']],
+        ['', ''],
+        ['', ''],
+    ]
+    combined_data = [left + right for left, right in zip(left_data, right_data)]
+
+    info_table = Table(combined_data, colWidths=[1.2*inch, 1.8*inch, 1*inch, 2*inch])
+    info_table.setStyle(template.info_style)
+    story.append(info_table)
+    story.append(Spacer(1, 12))
+
+    # Shipping address
+    story.append(Paragraph("SHIPPING ADDRESS", template.section_header_style))
+    story.append(template.box("<br/>".join(data['address_lines'])))
+    story.append(Spacer(1, 12))
+
+    # Payment details section (if available)
+    if data['payment_info']:
+        story.append(Paragraph("PAYMENT DETAILS", template.section_header_style))
+        story.append(template.box(data['payment_info']))
+        story.append(Spacer(1, 12))
+
+    # Order items section
+    story.append(Paragraph("ORDER SUMMARY", template.section_header_style))
+    items_data = [['ITEM DESCRIPTION', 'QTY', 'UNIT PRICE', 'TOTAL']]
+
+    subtotal = 0
+    for item_name, quantity, price in data['items']:
+        item_total = price * quantity
+        subtotal += item_total
+        items_data.append([
+            item_name,
+            str(quantity),
+            f"Rs.{price:.2f}",
+            f"Rs.{item_total:.2f}"
+        ])
+
+    # Subtotal and total rows
+    items_data.append(['', '', 'Subtotal:', f"Rs.{subtotal:.2f}"])
+    items_data.append(['', '', 'Tax & Fees:', 'Rs.0.00'])
+    items_data.append(['', '', 'TOTAL AMOUNT:', f"Rs.{data['total_amount']:.2f}"])
+
+    items_table = Table(items_data, colWidths=[3.5*inch, 0.6*inch, 1*inch, 0.9*inch])
+    items_table.setStyle(template.items_style)
+    story.append(items_table)
+    story.append(Spacer(1, 15))
+
+    story.extend(template.footer())
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def render_to_file(data, path):
+    """Render a receipt straight into the cache; runs in worker processes"""
+    write_atomic(path, render_receipt(data))
+    remove_stale_receipts(path)
+    return path
+
+
+def receipt_cache_path(order):
+    """Cache file for the current version of an order's receipt"""
+    version = f'{order.id}:{order.updated_at.isoformat() if order.updated_at else ""}:{TEMPLATE_VERSION}'
+    digest = hashlib.sha256(version.encode('utf-8')).hexdigest()[:32]
+    return os.path.join(current_app.config['RECEIPT_CACHE_FOLDER'], f'{order.id}-{digest}.pdf')
+
+
+def write_atomic(path, data):
+    """Write to a temp file in the same folder and rename it into place"""
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def remove_stale_receipts(path):
+    """Remove cached receipts of older versions of the same order"""
+    folder, name = os.path.split(path)
+    order_id = name.split('-', 1)[0]
+    for stale in glob.glob(os.path.join(folder, f'{order_id}-*.pdf')):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def cached_receipt(order):
+    """Path of the order's receipt PDF, rendering and caching it on a miss"""
+    path = receipt_cache_path(order)
+    if not os.path.exists(path):
+        render_to_file(receipt_data(order), path)
+    return path
@@ -0,0 +1,295 @@
+"""
+Stock reservations.
+
+Adding a product to the cart places a hold on it for RESERVATION_TTL seconds.
+A hold is the user's total cart quantity for that product. A new or larger
+hold is only granted while
+
+    held by other users + requested quantity <= products.stock
+
+so shoppers learn that an item is gone when they add it, not after filling in
+payment details. Lowering or releasing a hold never checks availability
+(shrink_hold): a hold that has expired is not granted again, so removing a
+line can't fail because other shoppers hold the stock meanwhile. Holds live
+outside the database, so they don't write to the products.stock row. The only
+stock write is the atomic decrement at checkout (see utils.stock). Checkout
+renews the buyer's holds, turns them into that decrement and then releases
+them.
+
+Holds that are not renewed expire on their own. Expired holds are ignored
+when availability is computed, and a background sweeper thread drops them
+every RESERVATION_SWEEP_INTERVAL seconds.
+
+Backends, selected with RESERVATION_BACKEND:
+
+- memory    : in-process (the default). Holds are per process, so with several
+              workers use redis.
+- redis     : shared Redis server (REDIS_HOST/PORT/DB/PASSWORD), needs `redis`
+- fakeredis : in-memory Redis stand-in for tests, needs `fakeredis`
+- null      : no holds; stock is only checked at checkout
+"""
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from models import db, CartItem
+from utils.cache import create_redis_client
+from utils.stock import OutOfStockError
+
+
+class MemoryReservationStore:
+    """Thread-safe in-process holds: {product_id: {user_id: (quantity, expires_at)}}"""
+
+    def __init__(self):
+        self._holds = {}
+        self._lock = threading.Lock()
+
+    def _live_holds(self, product_id, now):
+        holds = self._holds.get(product_id, {})
+        for user_id in [user_id for user_id, (_, expires_at) in holds.items() if expires_at <= now]:
+            del holds[user_id]
+        return holds
+
+    def reserve(self, product_id, user_id, quantity, stock, ttl):
+        now = time.time()
+        with self._lock:
+            holds = self._live_holds(product_id, now)
+            current = holds.get(user_id, (0, 0))[0]
+            others = sum(held for holder, (held, _) in holds.items() if holder != user_id)
+            # Shrinking or renewing a hold always succeeds
+            if quantity > current and others + quantity > stock:
+                return None
+            expires_at = now + ttl
+            holds[user_id] = (quantity, expires_at)
+            self._holds[product_id] = holds
+            return expires_at
+
+    def shrink(self, product_id, user_id, quantity, ttl):
+        now = time.time()
+        with self._lock:
+            holds = self._live_holds(product_id, now)
+            if user_id not in holds:
+                return None
+            expires_at = now + ttl
+            holds[user_id] = (min(quantity, holds[user_id][0]), expires_at)
+            return expires_at
+
+    def release(self, product_id, user_id):
+        with self._lock:
+            holds = self._holds.get(product_id)
+            if holds is not None:
+                holds.pop(user_id, None)
+                if not holds:
+                    del self._holds[product_id]
+
+    def held(self, product_id):
+        with self._lock:
+            return sum(quantity for quantity, _ in self._live_holds(product_id, time.time()).values())
+
+    def sweep(self):
+        now = time.time()
+        released = 0
+        with self._lock:
+            for product_id in list(self._holds):
+                before = len(self._holds[product_id])
+                holds = self._live_holds(product_id, now)
+                released += before - len(holds)
+                if not holds:
+                    del self._holds[product_id]
+        return released
+
+
+class RedisReservationStore:
+    """
+    Holds in one Redis hash per product (field user_id -> "quantity:expires_at").
+    Updates use WATCH/MULTI, so concurrent reservations for the same product
+    from any number of workers are serialized by Redis.
+    """
+
+    KEY_PREFIX = 'holds:'
+    INDEX_KEY = 'holds:products'
+
+    def __init__(self, client):
+        self.client = client
+
+    def _key(self, product_id):
+        return f'{self.KEY_PREFIX}{product_id}'
+
+    @staticmethod
+    def _parse(raw_holds, now):
+        live, expired = {}, []
+        for field, raw in raw_holds.items():
+            field = field.decode() if isinstance(field, bytes) else field
+            raw = raw.decode() if isinstance(raw, bytes) else raw
+            quantity, expires_at = raw.split(':')
+            if float(expires_at) <= now:
+                expired.append(field)
+            else:
+                live[field] = int(quantity)
+        return live, expired
+
+    def reserve(self, product_id, user_id, quantity, stock, ttl):
+        key = self._key(product_id)
+
+        def transaction(pipe):
+            now = time.time()
+            live, expired = self._parse(pipe.hgetall(key), now)
+            current = live.get(user_id, 0)
+            others = sum(held for holder, held in live.items() if holder != user_id)
+            if quantity > current and others + quantity > stock:
+                return None
+            expires_at = now + ttl
+            pipe.multi()
+            if expired:
+                pipe.hdel(key, *expired)
+            pipe.hset(key, user_id, f'{quantity}:{expires_at}')
+            pipe.sadd(self.INDEX_KEY, product_id)
+            return expires_at
+
+        return self.client.transaction(transaction, key, value_from_callable=True)
+
+    def shrink(self, product_id, user_id, quantity, ttl):
+        key = self._key(product_id)
+
+        def transaction(pipe):
+            now = time.time()
+            live, _ = self._parse(pipe.hgetall(key), now)
+            if user_id not in live:
+                return None
+            expires_at = now + ttl
+            pipe.multi()
+            pipe.hset(key, user_id, f'{min(quantity, live[user_id])}:{expires_at}')
+            return expires_at
+
+        return self.client.transaction(transaction, key, value_from_callable=True)
+
+    def release(self, product_id, user_id):
+        self.client.hdel(self._key(product_id), user_id)
+
+    def held(self, product_id):
+        live, _ = self._parse(self.client.hgetall(self._key(product_id)), time.time())
+        return sum(live.values())
+
+    def sweep(self):
+        released = 0
+        for product_id in self.client.smembers(self.INDEX_KEY):
+            product_id = product_id.decode() if isinstance(product_id, bytes) else product_id
+            key = self._key(product_id)
+
+            def transaction(pipe):
+                live, expired = self._parse(pipe.hgetall(key), time.time())
+                pipe.multi()
+                if expired:
+                    pipe.hdel(key, *expired)
+                if not live:
+                    pipe.srem(self.INDEX_KEY, product_id)
+                return len(expired)
+
+            released += self.client.transaction(transaction, key, value_from_callable=True)
+        return released
+
+
+class NullReservationStore:
+    def reserve(self, product_id, user_id, quantity, stock, ttl):
+        return time.time() + ttl
+
+    def shrink(self, product_id, user_id, quantity, ttl):
+        return time.time() + ttl
+
+    def release(self, product_id, user_id):
+        pass
+
+    def held(self, product_id):
+        return 0
+
+    def sweep(self):
+        return 0
+
+
+def create_reservation_store(config):
+    backend = config['RESERVATION_BACKEND'].lower()
+
+    if backend == 'memory':
+        return MemoryReservationStore()
+
+    if backend in ('redis', 'fakeredis'):
+        return RedisReservationStore(create_redis_client(config, fake=backend == 'fakeredis'))
+
+    if backend == 'null':
+        return NullReservationStore()
+
+    raise ValueError(f'Unsupported reservation backend: {backend}')
+
+
+def start_sweeper(app, store, interval):
+    def sweep_forever():
+        while True:
+            time.sleep(interval)
+            try:
+                released = store.sweep()
+                if released:
+                    app.logger.info('Released %d expired stock holds', released)
+            except Exception:
+                app.logger.exception('Stock hold sweep failed')
+
+    thread = threading.Thread(target=sweep_forever, name='reservation-sweeper', daemon=True)
+    thread.start()
+    return thread
+
+
+def init_reservations(app):
+    store = create_reservation_store(app.config)
+    app.extensions['reservations'] = store
+
+    interval = app.config['RESERVATION_SWEEP_INTERVAL']
+    if interval > 0 and not app.testing:
+        start_sweeper(app, store, interval)
+
+
+def reservations():
+    return current_app.extensions['reservations']
+
+
+def cart_quantity(user_id, product_id):
+    """Total quantity of a product across the user's cart lines (sizes/colors)"""
+    return db.session.query(db.func.coalesce(db.func.sum(CartItem.quantity), 0)).filter(
+        CartItem.user_id == user_id, CartItem.product_id == product_id
+    ).scalar()
+
+
+def hold_stock(user_id, product, quantity):
+    """
+    Set the user's hold on `product` to `quantity` units and renew it. Returns
+    the hold's expiry (naive UTC) or None when quantity is 0. Raises
+    OutOfStockError when the units are held by other shoppers or sold.
+    """
+    if quantity <= 0:
+        release_holds(user_id, [product.id])
+        return None
+
+    expires_at = reservations().reserve(
+        product.id, str(user_id), quantity, product.stock, current_app.config['RESERVATION_TTL']
+    )
+    if expires_at is None:
+        raise OutOfStockError(product.id, product.title)
+    return datetime.utcfromtimestamp(expires_at)
+
+
+def shrink_hold(user_id, product, quantity):
+    """
+    Lower the user's hold on `product` to `quantity` units (or release it at 0)
+    without checking availability. Renews a live hold; an expired one stays
+    expired. Returns the expiry (naive UTC) or None when nothing is held.
+    """
+    if quantity <= 0:
+        release_holds(user_id, [product.id])
+        return None
+
+    expires_at = reservations().shrink(product.id, str(user_id), quantity, current_app.config['RESERVATION_TTL'])
+    return datetime.utcfromtimestamp(expires_at) if expires_at is not None else None
+
+
+def release_holds(user_id, product_ids):
+    store = reservations()
+    for product_id in product_ids:
+        store.release(product_id, str(user_id))
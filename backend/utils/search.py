@@ -0,0 +1,248 @@
+"""
+Product search.
+
+The default backend is an in-process inverted index over product title, sku
+and description, ranked with BM25. Query terms also match as prefixes, so
+"sham" finds "shampoo". The index is built from the products table on first
+use. Admin writes update it incrementally. It is also rebuilt every
+SEARCH_INDEX_TTL seconds so that several worker processes converge.
+
+With SEARCH_BACKEND=fulltext the database does the matching instead:
+MySQL FULLTEXT (boolean mode) or PostgreSQL tsvector. Create the indexes with
+migrate_product_search_index.py. Other databases fall back to the in-process
+index.
+"""
+import math
+import re
+import threading
+import time
+from bisect import bisect_left
+from flask import current_app
+from models import db, Product
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Relative weight of a term occurrence in each field
+FIELD_WEIGHTS = {'title': 3.0, 'sku': 2.0, 'description': 1.0}
+
+# Score multiplier for a query term that only matched as a prefix
+PREFIX_MATCH_WEIGHT = 0.3
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+class InvertedIndex:
+    """BM25 ranked inverted index with prefix matching"""
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.postings = {}      # term -> {doc_id: weighted term frequency}
+            self.doc_terms = {}     # doc_id -> terms, for removal
+            self.doc_lengths = {}   # doc_id -> weighted document length
+            self.doc_active = {}    # doc_id -> is_active
+            self.total_length = 0.0
+            self._sorted_terms = None
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, doc_id, fields, is_active=True):
+        """Index (or re-index) a document given as {field name: text}"""
+        frequencies = {}
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS.get(field, 1.0)
+            for term in tokenize(text):
+                frequencies[term] = frequencies.get(term, 0.0) + weight
+
+        with self._lock:
+            self.remove(doc_id)
+            for term, frequency in frequencies.items():
+                if term not in self.postings:
+                    self.postings[term] = {}
+                    self._sorted_terms = None
+                self.postings[term][doc_id] = frequency
+            length = sum(frequencies.values())
+            self.doc_terms[doc_id] = tuple(frequencies)
+            self.doc_lengths[doc_id] = length
+            self.doc_active[doc_id] = is_active
+            self.total_length += length
+
+    def remove(self, doc_id):
+        with self._lock:
+            for term in self.doc_terms.pop(doc_id, ()):
+                documents = self.postings.get(term)
+                if documents is None:
+                    continue
+                documents.pop(doc_id, None)
+                if not documents:
+                    del self.postings[term]
+                    self._sorted_terms = None
+            self.total_length -= self.doc_lengths.pop(doc_id, 0.0)
+            self.doc_active.pop(doc_id, None)
+
+    def _expand(self, token):
+        """Yield (term, weight) for the exact term and every indexed term it prefixes"""
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.postings)
+        terms = self._sorted_terms
+        i = bisect_left(terms, token)
+        while i < len(terms) and terms[i].startswith(token):
+            yield terms[i], 1.0 if terms[i] == token else PREFIX_MATCH_WEIGHT
+            i += 1
+
+    def search(self, query, active_only=False, limit=None):
+        """
+        Return doc ids matching every query token, best match first.
+        Ties are broken by doc id so results are stable.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return []
+
+        with self._lock:
+            document_count = len(self.doc_lengths)
+            if not document_count:
+                return []
+            average_length = self.total_length / document_count or 1.0
+
+            scores = None
+            for token in tokens:
+                token_scores = {}
+                for term, weight in self._expand(token):
+                    documents = self.postings[term]
+                    df = len(documents)
+                    idf = math.log(1 + (document_count - df + 0.5) / (df + 0.5))
+                    for doc_id, tf in documents.items():
+                        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                        score = weight * idf * tf * (self.k1 + 1) / (tf + norm)
+                        # A token counts once per document, via its best matching term
+                        if score > token_scores.get(doc_id, 0.0):
+                            token_scores[doc_id] = score
+
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {doc_id: score + token_scores[doc_id]
+                              for doc_id, score in scores.items() if doc_id in token_scores}
+                if not scores:
+                    return []
+
+            if active_only:
+                scores = {doc_id: score for doc_id, score in scores.items() if self.doc_active.get(doc_id)}
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [doc_id for doc_id, score in ranked]
+
+
+class ProductSearchIndex:
+    """Process-wide product index, built lazily from the products table"""
+
+    def __init__(self):
+        self.index = InvertedIndex()
+        self.built_at = None
+        self._build_lock = threading.Lock()
+
+    def ensure_built(self):
+        ttl = current_app.config['SEARCH_INDEX_TTL']
+        if self.built_at is not None and (not ttl or time.monotonic() - self.built_at < ttl):
+            return
+        with self._build_lock:
+            if self.built_at is not None and (not ttl or time.monotonic() - self.built_at < ttl):
+                return
+            self.rebuild()
+
+    def rebuild(self):
+        rows = db.session.query(
+            Product.id, Product.title, Product.sku, Product.description, Product.is_active
+        ).yield_per(1000)
+
+        fresh = InvertedIndex()
+        for row in rows:
+            fresh.add(row.id, {'title': row.title, 'sku': row.sku, 'description': row.description},
+                      bool(row.is_active))
+        self.index = fresh
+        self.built_at = time.monotonic()
+
+    def add(self, product):
+        if self.built_at is None:
+            return  # Picked up by the first build
+        self.index.add(product.id, {
+            'title': product.title,
+            'sku': product.sku,
+            'description': product.description,
+        }, bool(product.is_active))
+
+    def remove(self, product_id):
+        if self.built_at is not None:
+            self.index.remove(product_id)
+
+    def invalidate(self):
+        """Force a rebuild on the next search, e.g. after a bulk import"""
+        self.built_at = None
+
+    def search(self, query, active_only=False, limit=None):
+        self.ensure_built()
+        return self.index.search(query, active_only=active_only, limit=limit)
+
+
+product_index = ProductSearchIndex()
+
+
+def _fulltext_search(query, active_only, limit):
+    """Ranked product ids from MySQL FULLTEXT / PostgreSQL tsvector, or None if unsupported"""
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+
+    dialect = db.engine.dialect.name
+    if dialect in ('mysql', 'mariadb'):
+        match = db.text('MATCH (title, sku, description) AGAINST (:terms IN BOOLEAN MODE)')
+        params = {'terms': ' '.join(f'+{token}*' for token in tokens)}
+        ranking = db.text('MATCH (title, sku, description) AGAINST (:terms IN BOOLEAN MODE) DESC')
+    elif dialect == 'postgresql':
+        document = "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(sku, '') || ' ' || coalesce(description, ''))"
+        match = db.text(f"{document} @@ to_tsquery('simple', :terms)")
+        params = {'terms': ' & '.join(f'{token}:*' for token in tokens)}
+        ranking = db.text(f"ts_rank({document}, to_tsquery('simple', :terms)) DESC")
+    else:
+        return None
+
+    statement = db.select(Product.id).where(match)
+    if active_only:
+        statement = statement.where(Product.is_active.is_(True))
+    statement = statement.order_by(ranking, Product.id).limit(limit)
+    return [row[0] for row in db.session.execute(statement, params)]
+
+
+def search_product_ids(query, active_only=False, limit=None):
+    """Return the ids of products matching `query`, best match first; every match unless `limit` is given"""
+    if current_app.config['SEARCH_BACKEND'] == 'fulltext':
+        ids = _fulltext_search(query, active_only, limit)
+        if ids is not None:
+            return ids
+    return product_index.search(query, active_only=active_only, limit=limit)
+
+
+def index_product(product):
+    """Update the in-process index after a product was created or changed"""
+    product_index.add(product)
+
+
+def unindex_product(product_id):
+    """Drop a deleted product from the in-process index"""
+    product_index.remove(product_id)
+
+
+def invalidate_search_index():
+    """Rebuild the in-process index on next use (after bulk changes)"""
+    product_index.invalidate()
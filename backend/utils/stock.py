@@ -0,0 +1,89 @@
+"""
+Atomic stock updates.
+
+Stock is never read into Python and written back. Each checkout decrements
+every product it touches in one conditional UPDATE:
+
+    UPDATE products
+       SET stock = stock - CASE id WHEN :id1 THEN :q1 ... END
+     WHERE id IN (...) AND stock >= CASE id WHEN :id1 THEN :q1 ... END
+
+The database checks and applies the decrement under its own row locks, so two
+concurrent checkouts can never oversell. If fewer rows than products were
+updated, one of them lacked stock and the transaction is rolled back.
+"""
+import random
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+from models import db, Product
+
+
+class OutOfStockError(Exception):
+    def __init__(self, product_id, title=None):
+        self.product_id = product_id
+        self.title = title
+        super().__init__(f'Insufficient stock for {title or product_id}')
+
+
+def _quantity_case(quantities):
+    return db.case(quantities, value=Product.id)
+
+
+def decrement_stock(quantities):
+    """
+    Take {product_id: quantity} out of stock in one statement. If any product
+    cannot be covered the transaction is rolled back and OutOfStockError names
+    it, so call this before adding anything else to the session.
+    """
+    if not quantities:
+        return
+    quantity = _quantity_case(quantities)
+    result = db.session.execute(
+        db.update(Product)
+        .where(Product.id.in_(quantities), Product.stock >= quantity)
+        .values(stock=Product.stock - quantity, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == len(quantities):
+        return
+
+    # Undo the rows that were decremented, then find out which product ran short
+    db.session.rollback()
+    short = db.session.query(Product.id, Product.title).filter(
+        Product.id.in_(quantities), Product.stock < quantity
+    ).first()
+    raise OutOfStockError(*short) if short else OutOfStockError(next(iter(quantities)))
+
+
+def restore_stock(quantities):
+    """Put {product_id: quantity} back into stock in one statement"""
+    if not quantities:
+        return
+    quantity = _quantity_case(quantities)
+    db.session.execute(
+        db.update(Product)
+        .where(Product.id.in_(quantities))
+        .values(stock=Product.stock + quantity, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def run_with_retry(transaction):
+    """
+    Run transaction() and retry it with exponential backoff and jitter when the
+    database reports a transient conflict (deadlock, lock wait timeout, SQLite
+    "database is locked"). The session is rolled back before each retry, so
+    transaction() must do all of its work inside the call.
+    """
+    attempts = current_app.config['CHECKOUT_MAX_RETRIES']
+    backoff = current_app.config['CHECKOUT_RETRY_BACKOFF']
+    for attempt in range(attempts):
+        try:
+            return transaction()
+        except OperationalError:
+            db.session.rollback()
+            if attempt == attempts - 1:
+                raise
+            time.sleep(backoff * (2 ** attempt) * (0.5 + random.random()))
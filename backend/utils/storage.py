@@ -0,0 +1,296 @@
+"""
+Upload storage.
+
+Uploaded files are addressed by key ('<folder>/<filename>', e.g.
+'products/<hash>.jpg' or 'bulk_images/shirt.jpg') and only read or written
+through the storage backend. App nodes then need no shared disk.
+
+Backends, selected with STORAGE_BACKEND:
+
+- local : files under UPLOAD_FOLDER (the default), served by /uploads/<key>
+          and linked as UPLOAD_BASE_URL/<key>
+- s3    : a bucket (AWS_S3_BUCKET), needs `boto3`. AWS_S3_ENDPOINT_URL
+          points it at any S3-compatible store: MinIO, or a local moto
+          server in tests (`moto_server -p 5001`). Files larger than
+          S3_MULTIPART_THRESHOLD are uploaded as multipart uploads with
+          S3_MAX_CONCURRENCY parts in parallel. Reads are streamed. Links
+          use AWS_S3_CUSTOM_DOMAIN when set, else the bucket's own URL.
+
+USE_S3_STORAGE=True selects s3 as well.
+
+Writes are atomic on both backends: readers see the old file or the new
+one, never a partial file.
+"""
+import mimetypes
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+from io import BytesIO
+from urllib.parse import urlparse
+from flask import current_app
+from werkzeug.security import safe_join
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+# For files whose key never points at different bytes (content addressed images)
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+
+# Config keys a backend is built from; worker processes get them as a dict
+STORAGE_SETTINGS = (
+    'STORAGE_BACKEND', 'UPLOAD_FOLDER', 'UPLOAD_BASE_URL',
+    'AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_S3_BUCKET', 'AWS_S3_REGION',
+    'AWS_S3_ENDPOINT_URL', 'AWS_S3_CUSTOM_DOMAIN', 'S3_MULTIPART_THRESHOLD', 'S3_MAX_CONCURRENCY',
+)
+
+# Paths the app serves stored files under (see utils/uploads.py); older
+# product rows link images as /api/admin/uploads/<key>
+SERVED_PATHS = ('/uploads/', '/api/admin/uploads/')
+
+# Not in every platform's MIME table yet
+mimetypes.add_type('image/avif', '.avif')
+mimetypes.add_type('image/webp', '.webp')
+
+
+def content_type(key):
+    return mimetypes.guess_type(key)[0] or 'application/octet-stream'
+
+
+def served_key(url):
+    """Key of a URL under one of SERVED_PATHS, on any host; None for other URLs"""
+    path = urlparse(url).path
+    for prefix in SERVED_PATHS:
+        if path.startswith(prefix):
+            return path[len(prefix):]
+    return None
+
+
+def split_key(key):
+    """(folder, filename) of a key; None unless it is exactly that"""
+    parts = key.split('/')
+    if len(parts) != 2 or any(part in ('', '.', '..') for part in parts):
+        return None
+    return parts[0], parts[1]
+
+
+class LocalStorage:
+    """Files under a local folder"""
+
+    def __init__(self, root, base_url):
+        self.root = root
+        self.base_url = base_url.rstrip('/')
+
+    def path(self, key):
+        """Filesystem path of key; None if it points outside the folder"""
+        return safe_join(self.root, key)
+
+    def _path(self, key):
+        path = self.path(key)
+        if path is None:
+            raise ValueError(f'Invalid storage key: {key}')
+        return path
+
+    def save(self, key, data, cache_control=None):
+        """Write bytes or a file object to key (cache_control is for object stores)"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                if isinstance(data, bytes):
+                    f.write(data)
+                else:
+                    shutil.copyfileobj(data, f, READ_CHUNK_SIZE)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def open(self, key):
+        """Binary file object for reading; FileNotFoundError if key doesn't exist"""
+        return open(self._path(key), 'rb')
+
+    def exists(self, key):
+        path = self.path(key)
+        return path is not None and os.path.isfile(path)
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def modified(self, key):
+        """Last modification as a timestamp; None if key doesn't exist"""
+        try:
+            return os.path.getmtime(self._path(key))
+        except FileNotFoundError:
+            return None
+
+    def touch(self, key):
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def listdir(self, folder):
+        """Filenames in folder"""
+        path = self._path(folder)
+        if not os.path.isdir(path):
+            return []
+        return [name for name in os.listdir(path)
+                if not name.endswith('.tmp') and os.path.isfile(os.path.join(path, name))]
+
+    def url(self, key):
+        return f'{self.base_url}/{key}'
+
+    def key_for_url(self, url):
+        """
+        Key of a URL made by url() or of one of the app's SERVED_PATHS; any
+        host is accepted. None for other URLs.
+        """
+        prefix = urlparse(self.base_url).path + '/'
+        path = urlparse(url).path
+        return path[len(prefix):] if path.startswith(prefix) else served_key(url)
+
+
+class S3Storage:
+    """Objects in an S3 (or S3-compatible) bucket"""
+
+    def __init__(self, client, bucket, base_url, transfer_config):
+        self.client = client
+        self.bucket = bucket
+        self.base_url = base_url.rstrip('/')
+        self.transfer_config = transfer_config
+
+    def path(self, key):
+        return None
+
+    def _missing(self, error):
+        return error.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound')
+
+    def save(self, key, data, cache_control=None):
+        """Upload bytes or a file object; multipart and parallel above S3_MULTIPART_THRESHOLD"""
+        if isinstance(data, bytes):
+            data = BytesIO(data)
+        extra_args = {'ContentType': content_type(key)}
+        if cache_control:
+            extra_args['CacheControl'] = cache_control
+        self.client.upload_fileobj(data, self.bucket, key, ExtraArgs=extra_args, Config=self.transfer_config)
+
+    def open(self, key):
+        """Streaming body (read(), iter_chunks()); FileNotFoundError if key doesn't exist"""
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=key)['Body']
+        except ClientError as e:
+            if self._missing(e):
+                raise FileNotFoundError(key)
+            raise
+
+    def _head(self, key):
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if self._missing(e):
+                return None
+            raise
+
+    def exists(self, key):
+        return self._head(key) is not None
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def modified(self, key):
+        head = self._head(key)
+        return head['LastModified'].timestamp() if head else None
+
+    def touch(self, key):
+        # Copying an object onto itself is the only way to bump LastModified
+        head = self._head(key)
+        if head is None:
+            return
+        extra_args = {'ContentType': head.get('ContentType', content_type(key))}
+        if head.get('CacheControl'):
+            extra_args['CacheControl'] = head['CacheControl']
+        self.client.copy_object(
+            Bucket=self.bucket, Key=key, CopySource={'Bucket': self.bucket, 'Key': key},
+            MetadataDirective='REPLACE', **extra_args
+        )
+
+    def listdir(self, folder):
+        names = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f'{folder}/', Delimiter='/'):
+            names.extend(item['Key'][len(folder) + 1:] for item in page.get('Contents', []))
+        return names
+
+    def url(self, key):
+        return f'{self.base_url}/{key}'
+
+    def key_for_url(self, url):
+        """Key of a bucket URL, or of an old link through the app's SERVED_PATHS"""
+        prefix = self.base_url + '/'
+        return url[len(prefix):] if url.startswith(prefix) else served_key(url)
+
+
+def create_storage(settings):
+    backend = settings['STORAGE_BACKEND'].lower()
+
+    if backend == 'local':
+        return LocalStorage(settings['UPLOAD_FOLDER'], settings['UPLOAD_BASE_URL'])
+
+    if backend == 's3':
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError:
+            raise RuntimeError('s3 storage requires the boto3 package (pip install boto3)')
+        client = boto3.client(
+            's3',
+            region_name=settings['AWS_S3_REGION'],
+            endpoint_url=settings['AWS_S3_ENDPOINT_URL'],
+            aws_access_key_id=settings['AWS_ACCESS_KEY_ID'],
+            aws_secret_access_key=settings['AWS_SECRET_ACCESS_KEY'],
+        )
+        bucket = settings['AWS_S3_BUCKET']
+        if settings['AWS_S3_CUSTOM_DOMAIN']:
+            base_url = f"https://{settings['AWS_S3_CUSTOM_DOMAIN']}"
+        elif settings['AWS_S3_ENDPOINT_URL']:
+            base_url = f"{settings['AWS_S3_ENDPOINT_URL'].rstrip('/')}/{bucket}"
+        else:
+            base_url = f"https://{bucket}.s3.{settings['AWS_S3_REGION']}.amazonaws.com"
+        transfer_config = TransferConfig(
+            multipart_threshold=settings['S3_MULTIPART_THRESHOLD'],
+            multipart_chunksize=settings['S3_MULTIPART_THRESHOLD'],
+            max_concurrency=settings['S3_MAX_CONCURRENCY'],
+        )
+        return S3Storage(client, bucket, base_url, transfer_config)
+
+    raise ValueError(f'Unsupported storage backend: {backend}')
+
+
+def storage_settings(config):
+    return {name: config[name] for name in STORAGE_SETTINGS}
+
+
+@lru_cache(maxsize=4)
+def _worker_storage(settings):
+    return create_storage(dict(settings))
+
+
+def worker_storage(settings):
+    """Backend for a worker process, built once per process from storage_settings()"""
+    return _worker_storage(tuple(sorted(settings.items())))
+
+
+def init_storage(app):
+    app.extensions['storage'] = create_storage(storage_settings(app.config))
+
+
+def storage():
+    return current_app.extensions['storage']
@@ -0,0 +1,84 @@
+"""
+Serving stored uploads (/uploads/<key> and /api/admin/uploads/<key>).
+
+Product images are content addressed (see utils/images.py): a URL never
+points at different bytes, so those folders are sent with
+`Cache-Control: immutable` and a one year max-age. Browsers and CDNs then
+stop revalidating them. Anything else (e.g. staged bulk_images) keeps a short
+max-age.
+
+Python sends files through werkzeug's conditional send_file, which gives
+strong ETags, If-None-Match/If-Modified-Since 304s, HEAD and Range (206)
+requests. Behind a web server, UPLOAD_SENDFILE hands the file over instead so
+no worker streams image bytes:
+- 'x-accel-redirect' (nginx): the response only carries an X-Accel-Redirect
+  to UPLOAD_ACCEL_PREFIX, an internal location aliasing UPLOAD_FOLDER
+- 'x-sendfile' (Apache mod_xsendfile, lighttpd): an X-Sendfile header with
+  the file's path
+The web server then handles ETags, ranges and HEAD itself.
+
+With object storage (STORAGE_BACKEND=s3) image URLs point at the bucket or
+CDN. These routes only serve old links, by streaming the object through.
+"""
+import os
+from urllib.parse import quote
+from flask import current_app, jsonify, send_file, stream_with_context
+from utils.image_store import IMAGE_FOLDERS
+from utils.storage import IMMUTABLE_CACHE, READ_CHUNK_SIZE, LocalStorage, content_type, split_key, storage
+
+DEFAULT_CACHE = 'public, max-age=3600'
+
+
+def is_immutable(filename):
+    folder, _, name = filename.partition('/')
+    return folder in IMAGE_FOLDERS and name != ''
+
+
+def stream_upload(filename):
+    """Stream a file from object storage in READ_CHUNK_SIZE blocks"""
+    try:
+        body = storage().open(filename)
+    except FileNotFoundError:
+        return None
+
+    def chunks():
+        with body:
+            for block in iter(lambda: body.read(READ_CHUNK_SIZE), b''):
+                yield block
+
+    return current_app.response_class(stream_with_context(chunks()), mimetype=content_type(filename))
+
+
+def send_local_upload(path, filename):
+    mode = current_app.config['UPLOAD_SENDFILE']
+    if mode in ('x-accel-redirect', 'x-sendfile'):
+        # Empty body; the web server sends the file
+        response = current_app.response_class(mimetype=content_type(filename))
+        if mode == 'x-accel-redirect':
+            response.headers['X-Accel-Redirect'] = quote(current_app.config['UPLOAD_ACCEL_PREFIX'] + filename)
+        else:
+            response.headers['X-Sendfile'] = path
+    elif is_immutable(filename):
+        # The name already identifies the content. Unlike werkzeug's default
+        # ETag, it doesn't change when a repeated upload touches the mtime.
+        response = send_file(path, conditional=True, etag=f'{filename}-{os.path.getsize(path):x}')
+        response.accept_ranges = 'bytes'
+    else:
+        response = send_file(path, conditional=True, etag=True)
+        response.accept_ranges = 'bytes'
+    return response
+
+
+def send_upload(filename):
+    """Response for a stored file; 404 for anything outside the storage or missing"""
+    if isinstance(storage(), LocalStorage):
+        path = storage().path(filename)
+        response = send_local_upload(path, filename) if path and os.path.isfile(path) else None
+    else:
+        response = stream_upload(filename) if split_key(filename) else None
+    if response is None:
+        return jsonify({'error': 'File not found'}), 404
+
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE if is_immutable(filename) else DEFAULT_CACHE
+    response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
@@ -33,7 +33,7 @@ function App() {
   const checkAuth = useAdminAuthStore((state) => state.checkAuth);
   const isAdmin = isAdminDomain();
   const isLoggedIn = useAuthStore((state) => state.isLoggedIn);
-  const fetchCart = useCartStore((state) => state.fetchCart);
+  const mergeGuestCart = useCartStore((state) => state.mergeGuestCart);
   const fetchWishlist = useWishlistStore((state) => state.fetchWishlist);
   const clearLocalCart = useCartStore((state) => state.clearLocalCart);
   const clearWishlist = useWishlistStore((state) => state.clearWishlist);
@@ -44,17 +44,17 @@ function App() {
     }
   }, [isAdmin, checkAuth]);
 
-  // Fetch cart and wishlist when user is logged in, clear when logged out
+  // Fetch cart (merging any guest cart into it) and wishlist when user is logged in, clear when logged out
   useEffect(() => {
     if (isLoggedIn && !isAdmin) {
-      fetchCart();
+      mergeGuestCart();
       fetchWishlist();
     } else if (!isLoggedIn && !isAdmin) {
       // Clear cart and wishlist when user logs out
       clearLocalCart();
       clearWishlist();
     }
-  }, [isLoggedIn, isAdmin, fetchCart, fetchWishlist, clearLocalCart, clearWishlist]);
+  }, [isLoggedIn, isAdmin, mergeGuestCart, fetchWishlist, clearLocalCart, clearWishlist]);
 
   return (
     <Router>
@@ -2,6 +2,7 @@ import { motion, AnimatePresence } from 'framer-motion';
 import { Link } from 'react-router-dom';
 import { useCartStore } from '../stores/cartStore';
 import { formatPrice } from '../utils/priceFormatter';
+import ProductImage from './ProductImage';
 
 const MiniCart = ({ isOpen, onClose }) => {
   const items = useCartStore((state) => state.items);
@@ -73,16 +74,12 @@ const MiniCart = ({ isOpen, onClose }) => {
                       const price = product.is_on_sale ? product.price : product.original_price || product.price;
                       return (
                         <div key={`${item.id}-${item.size}-${item.color}`} className="flex space-x-4">
-                          <img
-                            src={product.images && product.images[0] ? product.images[0] : 'https://images.unsplash.com/photo-1556912172-45b7abe8b7e4?w=200'}
-                            alt={product.title}
+                          <ProductImage
+                            product={product}
+                            sizes="80px"
+                            fallback="https://images.unsplash.com/photo-1556912172-45b7abe8b7e4?w=200"
                             className="w-20 h-20 object-cover rounded bg-gray-200"
                             loading="lazy"
-                            onError={(e) => {
-                              if (e.target.src !== 'https://images.unsplash.com/photo-1556912172-45b7abe8b7e4?w=200') {
-                                e.target.src = 'https://images.unsplash.com/photo-1556912172-45b7abe8b7e4?w=200';
-                              }
-                            }}
                           />
                           <div className="flex-1">
                             <h3 className="font-medium text-sm">{product.title}</h3>
@@ -3,21 +3,41 @@ import { useOrderStore } from '../stores/orderStore';
 import { useToast } from '../hooks/useToast';
 import { formatPrice } from '../utils/priceFormatter';
 import api from '../utils/api';
+import ProductImage from './ProductImage';
 
 export default function OrderList() {
-  const { orders, loading, fetchOrders, cancelOrder } = useOrderStore();
+  const { orders, nextCursor, loading, fetchOrders, fetchMoreOrders, fetchOrder, cancelOrder } = useOrderStore();
   const { showSuccess, showError } = useToast();
   const [expandedOrder, setExpandedOrder] = useState(null);
+  // Full orders (items, address), loaded when an order is first expanded
+  const [details, setDetails] = useState({});
 
   useEffect(() => {
     fetchOrders();
   }, []);
 
+  const toggleDetails = async (orderId) => {
+    if (expandedOrder === orderId) {
+      setExpandedOrder(null);
+      return;
+    }
+    setExpandedOrder(orderId);
+    if (!details[orderId]) {
+      const result = await fetchOrder(orderId);
+      if (result.success) {
+        setDetails((current) => ({ ...current, [orderId]: result.order }));
+      } else {
+        showError(result.error || 'Failed to load order details');
+      }
+    }
+  };
+
   const handleCancelOrder = async (orderId) => {
     if (!confirm('Are you sure you want to cancel this order?')) return;
     
     const result = await cancelOrder(orderId);
     if (result.success) {
+      setDetails((current) => ({ ...current, [orderId]: result.order }));
       showSuccess('Order cancelled successfully');
     } else {
       showError(result.error || 'Failed to cancel order');
@@ -26,9 +46,19 @@ export default function OrderList() {
 
   const downloadReceipt = async (orderId, receiptNumber) => {
     try {
-      const response = await api.get(`/orders/${orderId}/receipt`, {
-        responseType: 'blob'
-      });
+      // The receipt may still be rendering (202); retry until the PDF is ready
+      let response;
+      for (let attempt = 0; attempt < 30; attempt++) {
+        response = await api.get(`/orders/${orderId}/receipt`, {
+          responseType: 'blob'
+        });
+        if (response.status !== 202) break;
+        const retryAfter = Number(response.headers['retry-after']) || 1;
+        await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+      }
+      if (response.status === 202) {
+        throw new Error('Receipt is still being generated');
+      }
       
       const url = window.URL.createObjectURL(new Blob([response.data]));
       const link = document.createElement('a');
@@ -75,119 +105,149 @@ export default function OrderList() {
         </div>
       ) : (
         <div className="space-y-4">
-          {orders.map((order) => (
-            <div key={order.id} className="bg-white rounded-lg shadow-md overflow-hidden">
-              <div className="p-6">
-                <div className="flex justify-between items-start mb-4">
-                  <div>
-                    <h3 className="text-lg font-semibold mb-1">Order #{order.order_number}</h3>
-                    {order.receipt_number && (
-                      <p className="text-sm text-gray-500 mb-1">Receipt: {order.receipt_number}</p>
-                    )}
-                    <p className="text-sm text-gray-600">
-                      Placed on {new Date(order.created_at).toLocaleDateString('en-US', {
-                        year: 'numeric',
-                        month: 'long',
-                        day: 'numeric'
-                      })}
-                    </p>
-                    {order.payment_method && (
+          {orders.map((order) => {
+            const detail = details[order.id];
+            const itemCount = order.item_count ?? order.items?.reduce((count, item) => count + item.quantity, 0) ?? 0;
+            return (
+              <div key={order.id} className="bg-white rounded-lg shadow-md overflow-hidden">
+                <div className="p-6">
+                  <div className="flex justify-between items-start mb-4">
+                    <div>
+                      <h3 className="text-lg font-semibold mb-1">Order #{order.order_number}</h3>
+                      {order.receipt_number && (
+                        <p className="text-sm text-gray-500 mb-1">Receipt: {order.receipt_number}</p>
+                      )}
                       <p className="text-sm text-gray-600">
-                        Payment: {order.payment_method.toUpperCase()}
+                        Placed on {new Date(order.created_at).toLocaleDateString('en-US', {
+                          year: 'numeric',
+                          month: 'long',
+                          day: 'numeric'
+                        })}
                       </p>
-                    )}
-                  </div>
-                  <div className="text-right">
-                    <span className={`inline-block px-3 py-1 rounded-full text-sm font-semibold ${getStatusColor(order.status)}`}>
-                      {order.status.charAt(0).toUpperCase() + order.status.slice(1)}
-                    </span>
-                    <p className="text-lg font-bold mt-2">{formatPrice(order.total_amount)}</p>
+                      {order.payment_method && (
+                        <p className="text-sm text-gray-600">
+                          Payment: {order.payment_method.toUpperCase()}
+                        </p>
+                      )}
+                    </div>
+                    <div className="text-right">
+                      <span className={`inline-block px-3 py-1 rounded-full text-sm font-semibold ${getStatusColor(order.status)}`}>
+                        {order.status.charAt(0).toUpperCase() + order.status.slice(1)}
+                      </span>
+                      <p className="text-lg font-bold mt-2">{formatPrice(order.total_amount)}</p>
+                    </div>
                   </div>
-                </div>
 
-                {/* Order Items Summary */}
-                <div className="border-t border-gray-200 pt-4">
-                  <p className="text-sm text-gray-600 mb-2">
-                    {order.items?.length || 0} item(s)
-                  </p>
-                  
-                  {expandedOrder === order.id && order.items && (
-                    <div className="space-y-3 mt-4">
-                      {order.items.map((item, index) => (
-                        <div key={index} className="flex items-center space-x-4 p-3 bg-gray-50 rounded-lg">
-                          {item.product?.images?.[0] && (
-                            <img
-                              src={item.product.images[0]}
-                              alt={item.product.title}
-                              className="w-16 h-16 object-cover rounded"
-                            />
-                          )}
-                          <div className="flex-1">
-                            <h4 className="font-medium">{item.product?.title || 'Product'}</h4>
-                            <p className="text-sm text-gray-600">
-                              Quantity: {item.quantity}
-                              {item.size && ` • Size: ${item.size}`}
-                              {item.color && ` • Color: ${item.color}`}
-                            </p>
-                          </div>
-                          <p className="font-semibold">{formatPrice(item.price * item.quantity)}</p>
-                        </div>
+                  {/* Order Items Summary */}
+                  <div className="border-t border-gray-200 pt-4">
+                    <div className="flex items-center space-x-3 mb-2">
+                      {order.thumbnails?.map((product) => (
+                        <ProductImage
+                          key={product.id}
+                          product={product}
+                          sizes="48px"
+                          className="w-12 h-12 object-cover rounded"
+                        />
                       ))}
+                      <p className="text-sm text-gray-600">
+                        {itemCount} item(s)
+                      </p>
                     </div>
-                  )}
-                </div>
-
-                {/* Shipping Address */}
-                {order.address && (
-                  <div className="border-t border-gray-200 pt-4 mt-4">
-                    <h4 className="font-semibold mb-2">Shipping Address</h4>
-                    <p className="text-sm text-gray-700">{order.address.full_name}</p>
-                    <p className="text-sm text-gray-700">{order.address.address_line1}</p>
-                    {order.address.address_line2 && (
-                      <p className="text-sm text-gray-700">{order.address.address_line2}</p>
+                    
+                    {expandedOrder === order.id && !detail && (
+                      <p className="text-sm text-gray-500 mt-4">Loading details...</p>
+                    )}
+                    
+                    {expandedOrder === order.id && detail?.items && (
+                      <div className="space-y-3 mt-4">
+                        {detail.items.map((item, index) => (
+                          <div key={index} className="flex items-center space-x-4 p-3 bg-gray-50 rounded-lg">
+                            {item.product?.images?.[0] && (
+                              <img
+                                src={item.product.images[0]}
+                                alt={item.product.title}
+                                className="w-16 h-16 object-cover rounded"
+                              />
+                            )}
+                            <div className="flex-1">
+                              <h4 className="font-medium">{item.product?.title || 'Product'}</h4>
+                              <p className="text-sm text-gray-600">
+                                Quantity: {item.quantity}
+                                {item.size && ` • Size: ${item.size}`}
+                                {item.color && ` • Color: ${item.color}`}
+                              </p>
+                            </div>
+                            <p className="font-semibold">{formatPrice(item.price * item.quantity)}</p>
+                          </div>
+                        ))}
+                      </div>
                     )}
-                    <p className="text-sm text-gray-700">
-                      {order.address.city}, {order.address.state} {order.address.pincode}
-                    </p>
-                    <p className="text-sm text-gray-700">Phone: {order.address.phone}</p>
                   </div>
-                )}
 
-                {/* Actions */}
-                <div className="flex justify-between items-center mt-4 pt-4 border-t border-gray-200">
-                  <div className="flex space-x-4">
-                    <button
-                      onClick={() => setExpandedOrder(expandedOrder === order.id ? null : order.id)}
-                      className="text-primary-600 hover:text-primary-700 font-medium text-sm"
-                    >
-                      {expandedOrder === order.id ? 'Hide Details' : 'View Details'}
-                    </button>
+                  {/* Shipping Address */}
+                  {expandedOrder === order.id && detail?.address && (
+                    <div className="border-t border-gray-200 pt-4 mt-4">
+                      <h4 className="font-semibold mb-2">Shipping Address</h4>
+                      <p className="text-sm text-gray-700">{detail.address.full_name}</p>
+                      <p className="text-sm text-gray-700">{detail.address.address_line1}</p>
+                      {detail.address.address_line2 && (
+                        <p className="text-sm text-gray-700">{detail.address.address_line2}</p>
+                      )}
+                      <p className="text-sm text-gray-700">
+                        {detail.address.city}, {detail.address.state} {detail.address.pincode}
+                      </p>
+                      <p className="text-sm text-gray-700">Phone: {detail.address.phone}</p>
+                    </div>
+                  )}
+
+                  {/* Actions */}
+                  <div className="flex justify-between items-center mt-4 pt-4 border-t border-gray-200">
+                    <div className="flex space-x-4">
+                      <button
+                        onClick={() => toggleDetails(order.id)}
+                        className="text-primary-600 hover:text-primary-700 font-medium text-sm"
+                      >
+                        {expandedOrder === order.id ? 'Hide Details' : 'View Details'}
+                      </button>
+                      
+                      {order.receipt_number && (
+                        <button
+                          onClick={() => downloadReceipt(order.id, order.receipt_number)}
+                          className="text-green-600 hover:text-green-700 font-medium text-sm flex items-center space-x-1"
+                        >
+                          <svg className="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                            <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M12 10v6m0 0l-3-3m3 3l3-3m2 8H7a2 2 0 01-2-2V5a2 2 0 012-2h5.586a1 1 0 01.707.293l5.414 5.414a1 1 0 01.293.707V19a2 2 0 01-2 2z" />
+                          </svg>
+                          <span>Download Receipt</span>
+                        </button>
+                      )}
+                    </div>
                     
-                    {order.receipt_number && (
+                    {(order.status === 'pending' || order.status === 'confirmed') && (
                       <button
-                        onClick={() => downloadReceipt(order.id, order.receipt_number)}
-                        className="text-green-600 hover:text-green-700 font-medium text-sm flex items-center space-x-1"
+                        onClick={() => handleCancelOrder(order.id)}
+                        className="px-4 py-2 text-red-600 hover:bg-red-50 rounded-lg transition-colors text-sm font-medium"
                       >
-                        <svg className="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-                          <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M12 10v6m0 0l-3-3m3 3l3-3m2 8H7a2 2 0 01-2-2V5a2 2 0 012-2h5.586a1 1 0 01.707.293l5.414 5.414a1 1 0 01.293.707V19a2 2 0 01-2 2z" />
-                        </svg>
-                        <span>Download Receipt</span>
+                        Cancel Order
                       </button>
                     )}
                   </div>
-                  
-                  {(order.status === 'pending' || order.status === 'confirmed') && (
-                    <button
-                      onClick={() => handleCancelOrder(order.id)}
-                      className="px-4 py-2 text-red-600 hover:bg-red-50 rounded-lg transition-colors text-sm font-medium"
-                    >
-                      Cancel Order
-                    </button>
-                  )}
                 </div>
               </div>
+            );
+          })}
+          
+          {nextCursor && (
+            <div className="text-center">
+              <button
+                onClick={fetchMoreOrders}
+                disabled={loading}
+                className="px-6 py-2 border border-gray-300 rounded-lg text-sm font-medium hover:bg-gray-50 disabled:opacity-50"
+              >
+                {loading ? 'Loading...' : 'Load More Orders'}
+              </button>
             </div>
-          ))}
+          )}
         </div>
       )}
     </div>
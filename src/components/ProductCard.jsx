@@ -3,6 +3,7 @@ import { useCartStore } from '../stores/cartStore';
 import { useWishlistStore } from '../stores/wishlistStore';
 import { useToast } from '../hooks/useToast';
 import { formatPrice } from '../utils/priceFormatter';
+import ProductImage from './ProductImage';
 
 const ProductCard = ({ product }) => {
   const addItem = useCartStore((state) => state.addItem);
@@ -33,16 +34,11 @@ const ProductCard = ({ product }) => {
   return (
     <Link to={`/product/${product.slug}`} className="card block">
       <div className="relative">
-        <img
-          src={product.images && product.images[0] ? product.images[0] : 'https://images.unsplash.com/photo-1556912172-45b7abe8b7e4?w=500'}
-          alt={product.title}
+        <ProductImage
+          product={product}
+          sizes="(min-width: 1024px) 25vw, (min-width: 640px) 50vw, 100vw"
           className="w-full h-48 md:h-56 lg:h-64 object-cover bg-gray-200"
           loading="lazy"
-          onError={(e) => {
-            if (e.target.src !== 'https://images.unsplash.com/photo-1556912172-45b7abe8b7e4?w=500') {
-              e.target.src = 'https://images.unsplash.com/photo-1556912172-45b7abe8b7e4?w=500';
-            }
-          }}
         />
         {product.is_on_sale && (
           <span className="absolute top-1 left-1 md:top-2 md:left-2 bg-accent-500 text-white px-2 md:px-3 py-0.5 md:py-1 rounded-full text-xs md:text-sm font-semibold shadow-md">
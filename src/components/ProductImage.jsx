@@ -0,0 +1,39 @@
+import { useState } from 'react';
+
+const FALLBACK_IMAGE = 'https://images.unsplash.com/photo-1556912172-45b7abe8b7e4?w=500';
+
+// Product image with its srcset variants (AVIF/WebP sources, JPEG fallback) so
+// the browser downloads the smallest copy that fills `sizes`
+const ProductImage = ({ product, index = 0, sizes, fallback = FALLBACK_IMAGE, ...props }) => {
+  const [failed, setFailed] = useState(false);
+  const src = product.images && product.images[index];
+  const variant = product.image_variants && product.image_variants[index];
+
+  if (failed || !src) {
+    return <img src={fallback} alt={product.title} {...props} />;
+  }
+
+  if (!variant) {
+    return <img src={src} alt={product.title} onError={() => setFailed(true)} {...props} />;
+  }
+
+  return (
+    <picture>
+      {variant.sources.map((source) => (
+        <source key={source.type} type={source.type} srcSet={source.srcset} sizes={sizes} />
+      ))}
+      <img
+        src={variant.src}
+        srcSet={variant.srcset}
+        sizes={sizes}
+        width={variant.width}
+        height={variant.height}
+        alt={product.title}
+        onError={() => setFailed(true)}
+        {...props}
+      />
+    </picture>
+  );
+};
+
+export default ProductImage;
@@ -2,6 +2,7 @@ import { Link } from 'react-router-dom';
 import { useCartStore } from '../stores/cartStore';
 import { formatPrice } from '../utils/priceFormatter';
 import Breadcrumbs from '../components/Breadcrumbs';
+import ProductImage from '../components/ProductImage';
 
 const CartPage = () => {
   const items = useCartStore((state) => state.items);
@@ -57,16 +58,11 @@ const CartPage = () => {
                 key={`${item.id}-${item.size}-${item.color}`}
                 className="bg-white rounded-lg shadow-md p-4 md:p-6 flex flex-col sm:flex-row gap-3 md:gap-4"
               >
-                <img
-                  src={product.images && product.images[0] ? product.images[0] : 'https://images.unsplash.com/photo-1556912172-45b7abe8b7e4?w=500'}
-                  alt={product.title}
+                <ProductImage
+                  product={product}
+                  sizes="(min-width: 640px) 128px, 100vw"
                   className="w-full sm:w-32 h-32 md:h-32 object-cover rounded bg-gray-200"
                   loading="lazy"
-                  onError={(e) => {
-                    if (e.target.src !== 'https://images.unsplash.com/photo-1556912172-45b7abe8b7e4?w=500') {
-                      e.target.src = 'https://images.unsplash.com/photo-1556912172-45b7abe8b7e4?w=500';
-                    }
-                  }}
                 />
                 <div className="flex-1">
                   <h3 className="font-semibold text-base md:text-lg mb-1 md:mb-2">{product.title}</h3>
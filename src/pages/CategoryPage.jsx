@@ -15,6 +15,8 @@ const CategoryPage = () => {
   const [sortBy, setSortBy] = useState('newest');
   const [filters, setFilters] = useState({});
   const [isFilterOpen, setIsFilterOpen] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const categoryMap = {
     'grains-cereals': 'Grains & Cereals',
@@ -35,12 +37,16 @@ const CategoryPage = () => {
     const fetchProducts = async () => {
       try {
         setLoading(true);
+        setNextCursor(null);
         const response = await api.get(`/products?category=${slug}`);
         let productsData = Array.isArray(response?.data) ? response.data : [];
         
         // Fallback to direct data access if API returns empty or fails
         if (productsData.length === 0) {
           productsData = getProductsByCategory(slug);
+        } else {
+          // The API returns one page; the next one starts at this cursor
+          setNextCursor(response.headers?.['x-next-cursor'] || null);
         }
         
         setProducts(productsData);
@@ -104,6 +110,21 @@ const CategoryPage = () => {
     setFilteredProducts(filtered);
   }, [products, filters, sortBy]);
 
+  const loadMoreProducts = async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const response = await api.get(`/products?category=${slug}&cursor=${encodeURIComponent(nextCursor)}`);
+      const productsData = Array.isArray(response?.data) ? response.data : [];
+      setProducts((prev) => [...prev, ...productsData]);
+      setNextCursor(response.headers?.['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Error fetching more products:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleFilterChange = (newFilters) => {
     setFilters((prev) => ({ ...prev, ...newFilters }));
   };
@@ -153,6 +174,18 @@ const CategoryPage = () => {
           </div>
 
           <ProductGrid products={filteredProducts} loading={loading} />
+
+          {nextCursor && !loading && (
+            <div className="mt-8 text-center">
+              <button
+                onClick={loadMoreProducts}
+                disabled={loadingMore}
+                className="bg-primary-600 text-white px-6 py-2 rounded-lg font-semibold hover:bg-primary-700 disabled:opacity-50 disabled:cursor-not-allowed"
+              >
+                {loadingMore ? 'Loading...' : 'Load more products'}
+              </button>
+            </div>
+          )}
         </main>
       </div>
     </div>
@@ -21,9 +21,9 @@ const Home = () => {
     const fetchProducts = async () => {
       try {
         const [personalCareRes, householdRes, miscRes] = await Promise.all([
-          api.get('/products?category=personal-care'),
-          api.get('/products?category=household-cleaning'),
-          api.get('/products?category=miscellaneous'),
+          api.get('/products?category=personal-care&limit=8'),
+          api.get('/products?category=household-cleaning&limit=8'),
+          api.get('/products?category=miscellaneous&limit=8'),
         ]);
 
         // Ensure data is an array before slicing, with fallback
@@ -15,6 +15,8 @@ const OrderManagement = () => {
   const [searchQuery, setSearchQuery] = useState('');
   const [statusFilter, setStatusFilter] = useState('');
   const [downloadingReceipts, setDownloadingReceipts] = useState(new Set());
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   const { showSuccess, showError } = useNotificationStore();
 
@@ -52,21 +54,27 @@ const OrderManagement = () => {
 
   const paginate = (pageNumber) => setCurrentPage(pageNumber);
 
+  const requestOrders = async (cursor) => {
+    const params = new URLSearchParams({ per_page: '100' });
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`http://localhost:5000/api/admin/orders?${params}`, {
+      headers: {
+        'Authorization': `Bearer ${localStorage.getItem('admin_token')}`,
+        'Content-Type': 'application/json'
+      }
+    });
+
+    if (!response.ok) throw new Error('Failed to fetch orders');
+    return response.json();
+  };
+
   const fetchOrders = async () => {
     try {
       setLoading(true);
-      const response = await fetch(`http://localhost:5000/api/admin/orders`, {
-        headers: {
-          'Authorization': `Bearer ${localStorage.getItem('admin_token')}`,
-          'Content-Type': 'application/json'
-        }
-      });
-
-      if (!response.ok) throw new Error('Failed to fetch orders');
-
-      const data = await response.json();
+      const data = await requestOrders();
       setOrders(data.orders);
       setFilteredOrders(data.orders);
+      setNextCursor(data.next_cursor);
     } catch (error) {
       showError('Failed to fetch orders');
     } finally {
@@ -74,6 +82,20 @@ const OrderManagement = () => {
     }
   };
 
+  const loadMoreOrders = async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const data = await requestOrders(nextCursor);
+      setOrders(prev => [...prev, ...data.orders]);
+      setNextCursor(data.next_cursor);
+    } catch (error) {
+      showError('Failed to fetch orders');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const updateOrderStatus = async (orderId, newStatus) => {
     try {
       const response = await fetch(`http://localhost:5000/api/admin/orders/${orderId}/status`, {
@@ -102,11 +124,21 @@ const OrderManagement = () => {
       // Add to downloading set
       setDownloadingReceipts(prev => new Set([...prev, orderId]));
       
-      const response = await fetch(`http://localhost:5000/api/admin/orders/${orderId}/receipt`, {
-        headers: {
-          'Authorization': `Bearer ${localStorage.getItem('admin_token')}`
-        }
-      });
+      // The receipt may still be rendering (202); retry until the PDF is ready
+      let response;
+      for (let attempt = 0; attempt < 30; attempt++) {
+        response = await fetch(`http://localhost:5000/api/admin/orders/${orderId}/receipt`, {
+          headers: {
+            'Authorization': `Bearer ${localStorage.getItem('admin_token')}`
+          }
+        });
+        if (response.status !== 202) break;
+        const retryAfter = Number(response.headers.get('Retry-After')) || 1;
+        await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+      }
+      if (response.status === 202) {
+        throw new Error('Receipt is still being generated, please try again');
+      }
 
       if (!response.ok) {
         const errorData = await response.json().catch(() => ({}));
@@ -478,6 +510,18 @@ const OrderManagement = () => {
             </div>
           </div>
         )}
+
+        {nextCursor && (
+          <div className="px-6 py-4 border-t border-gray-200 text-center">
+            <button
+              onClick={loadMoreOrders}
+              disabled={loadingMore}
+              className="px-4 py-2 text-sm border border-gray-300 rounded-md hover:bg-gray-100 disabled:opacity-50 disabled:cursor-not-allowed transition-colors"
+            >
+              {loadingMore ? 'Loading...' : 'Load more orders'}
+            </button>
+          </div>
+        )}
       </div>
 
       {/* Order Details Modal */}
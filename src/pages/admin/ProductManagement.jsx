@@ -14,6 +14,8 @@ export default function ProductManagement() {
   const [searchQuery, setSearchQuery] = useState('');
   const [selectedSection, setSelectedSection] = useState('');
   const [showBulkUpload, setShowBulkUpload] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // Notification store
   const { showSuccess, showError, confirmDelete } = useNotificationStore();
@@ -46,12 +48,13 @@ export default function ProductManagement() {
   const loadData = async () => {
     try {
       const [productsRes, sectionsRes] = await Promise.all([
-        adminApi.get('/admin/products'),
+        adminApi.get('/admin/products', { params: { per_page: 100 } }),
         adminApi.get('/admin/sections')
       ]);
       
       setProducts(productsRes.data.products);
       setFilteredProducts(productsRes.data.products);
+      setNextCursor(productsRes.data.next_cursor);
       setSections(sectionsRes.data.sections);
     } catch (error) {
       console.error('Failed to load data:', error);
@@ -61,6 +64,21 @@ export default function ProductManagement() {
     }
   };
 
+  const loadMoreProducts = async () => {
+    if (!nextCursor || loadingMore) return;
+    try {
+      setLoadingMore(true);
+      const response = await adminApi.get('/admin/products', { params: { per_page: 100, cursor: nextCursor } });
+      setProducts(prev => [...prev, ...response.data.products]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Failed to load more products:', error);
+      showError('Loading Failed', 'Failed to load more products.');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Pagination logic
   const indexOfLastProduct = currentPage * productsPerPage;
   const indexOfFirstProduct = indexOfLastProduct - productsPerPage;
@@ -492,6 +510,18 @@ export default function ProductManagement() {
         </div>
       )}
 
+      {nextCursor && (
+        <div className="text-center">
+          <button
+            onClick={loadMoreProducts}
+            disabled={loadingMore}
+            className="px-6 py-2 rounded-lg font-medium bg-gray-100 text-gray-700 hover:bg-gray-200 disabled:opacity-50 disabled:cursor-not-allowed transition-all duration-200"
+          >
+            {loadingMore ? 'Loading...' : 'Load more products'}
+          </button>
+        </div>
+      )}
+
       {/* Modal */}
       {showModal && (
         <ProductModal
@@ -926,6 +956,7 @@ function BulkUploadModal({ onClose, onComplete }) {
   const [step, setStep] = useState(1); // 1: Instructions, 2: Upload Images, 3: Upload Excel
   const [uploading, setUploading] = useState(false);
   const [uploadResults, setUploadResults] = useState(null);
+  const [uploadProgress, setUploadProgress] = useState(null);
 
   const downloadTemplate = async () => {
     try {
@@ -995,16 +1026,28 @@ function BulkUploadModal({ onClose, onComplete }) {
         headers: { 'Content-Type': 'multipart/form-data' }
       });
 
-      setUploadResults(response.data.results);
-      alert(response.data.message);
+      // The import runs in the background; poll the job until it finishes
+      let job;
+      do {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        job = (await adminApi.get(`/admin/bulk-upload-products/${response.data.job_id}`)).data;
+        setUploadResults(job.results);
+        setUploadProgress(job.progress);
+      } while (job.status === 'queued' || job.status === 'running');
+
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Bulk upload failed');
+      }
+      alert(job.message);
       
-      if (response.data.results.success > 0) {
+      if (job.results.success > 0) {
         onComplete();
       }
     } catch (error) {
-      alert(error.response?.data?.error || 'Failed to upload products');
+      alert(error.response?.data?.error || error.message || 'Failed to upload products');
     } finally {
       setUploading(false);
+      setUploadProgress(null);
     }
   };
 
@@ -1171,7 +1214,7 @@ function BulkUploadModal({ onClose, onComplete }) {
               <div className="border-2 border-dashed border-gray-300 rounded-lg p-8 bg-gray-50">
                 <input
                   type="file"
-                  accept=".xlsx,.xls"
+                  accept=".xlsx,.xls,.csv"
                   onChange={(e) => e.target.files[0] && handleExcelUpload(e.target.files[0])}
                   className="hidden"
                   id="excel-upload"
@@ -1187,7 +1230,13 @@ function BulkUploadModal({ onClose, onComplete }) {
                     {uploading ? (
                       <div className="flex items-center space-x-2">
                         <div className="w-6 h-6 border-2 border-green-500 border-t-transparent rounded-full animate-spin"></div>
-                        <span>Processing Excel file...</span>
+                        <span>
+                          Processing Excel file...
+                          {uploadProgress?.total_rows > 0 && (
+                            ` ${uploadProgress.finished_rows} / ${uploadProgress.total_rows} rows`
+                          )}
+                          {uploadProgress?.eta_seconds != null && ` (about ${uploadProgress.eta_seconds}s left)`}
+                        </span>
                       </div>
                     ) : (
                       <>
@@ -1196,7 +1245,7 @@ function BulkUploadModal({ onClose, onComplete }) {
                         </svg>
                         <div className="text-xl font-medium">Click to upload Excel file</div>
                         <div className="text-sm mt-2">Upload your completed product template</div>
-                        <div className="text-xs mt-2 text-gray-400">Only .xlsx and .xls files</div>
+                        <div className="text-xs mt-2 text-gray-400">Only .xlsx, .xls and .csv files</div>
                       </>
                     )}
                   </div>
@@ -2,6 +2,12 @@ import { create } from 'zustand';
 import { persist } from 'zustand/middleware';
 import api from '../utils/api';
 
+// Logged-out shoppers keep their cart in localStorage; it is merged into the
+// account's cart at login (mergeGuestCart)
+const isGuest = () => !localStorage.getItem('customer_token');
+const guestLineId = (productId, size, color) => `guest:${productId}:${size || ''}:${color || ''}`;
+const isGuestLine = (itemId) => typeof itemId === 'string' && itemId.startsWith('guest:');
+
 export const useCartStore = create(
   persist(
     (set, get) => ({
@@ -27,13 +33,57 @@ export const useCartStore = create(
         }
       },
       
-      // Clear local cart (for migration from old format)
+      // Clear local cart (for migration from old format); a guest cart is kept
       clearLocalCart: () => {
-        set({ items: [], synced: false });
+        set((state) => ({ items: state.items.filter((item) => item.guest), synced: false }));
+      },
+      
+      // Merge the guest cart into the account's cart in one request, then use the server cart
+      mergeGuestCart: async () => {
+        const lines = get().items
+          .filter((item) => item.guest)
+          .map((item) => ({
+            product_id: item.product.id,
+            quantity: item.quantity,
+            size: item.size,
+            color: item.color
+          }));
+        if (lines.length === 0) {
+          return get().fetchCart();
+        }
+        
+        set({ loading: true });
+        try {
+          const response = await api.post('/cart/merge', { lines });
+          set({ items: response.data.items || [], loading: false, synced: true });
+          return { success: true, skipped: response.data.skipped || [] };
+        } catch (error) {
+          console.error('Failed to merge cart:', error);
+          set({ loading: false });
+          return { success: false, error: error.response?.data?.error };
+        }
       },
       
       // Add item to cart
       addItem: async (product, quantity = 1, selectedSize = null, selectedColor = null) => {
+        if (isGuest()) {
+          const id = guestLineId(product.id, selectedSize, selectedColor);
+          set((state) => {
+            const existingItem = state.items.find((item) => item.id === id);
+            if (existingItem) {
+              return {
+                items: state.items.map((item) =>
+                  item.id === id ? { ...item, quantity: item.quantity + quantity } : item
+                ),
+              };
+            }
+            return {
+              items: [...state.items, { id, guest: true, product, quantity, size: selectedSize, color: selectedColor }],
+            };
+          });
+          return { success: true };
+        }
+        
         try {
           const response = await api.post('/cart', {
             product_id: product.id,
@@ -75,6 +125,11 @@ export const useCartStore = create(
       
       // Remove item from cart
       removeItem: async (itemId) => {
+        if (isGuestLine(itemId)) {
+          set((state) => ({ items: state.items.filter((item) => item.id !== itemId) }));
+          return { success: true };
+        }
+        
         try {
           await api.delete(`/cart/${itemId}`);
           
@@ -100,7 +155,9 @@ export const useCartStore = create(
             return get().removeItem(itemId);
           }
           
-          await api.put(`/cart/${itemId}`, { quantity });
+          if (!isGuestLine(itemId)) {
+            await api.put(`/cart/${itemId}`, { quantity });
+          }
           
           set((state) => ({
             items: state.items.map((item) =>
@@ -115,6 +172,19 @@ export const useCartStore = create(
         }
       },
       
+      // Apply many add/update/remove operations in one request, e.g. to restore a saved cart:
+      // [{ op: 'add', product_id, quantity, size, color }, { op: 'update', item_id, quantity }, { op: 'remove', item_id }]
+      applyBatch: async (operations) => {
+        try {
+          const response = await api.post('/cart/batch', { operations });
+          set({ items: response.data.items || [], synced: true });
+          return { success: true };
+        } catch (error) {
+          console.error('Failed to update cart:', error);
+          return { success: false, error: error.response?.data?.error };
+        }
+      },
+      
       // Clear cart
       clearCart: async () => {
         try {
@@ -1,17 +1,39 @@
 import { create } from 'zustand';
 import api from '../utils/api';
 
-export const useOrderStore = create((set) => ({
+export const useOrderStore = create((set, get) => ({
   orders: [],
+  nextCursor: null, // Cursor of the next page of order summaries, null on the last page
   loading: false,
   currentOrder: null,
   
-  // Fetch all orders
+  // Fetch the first page of order summaries (full details come from fetchOrder)
   fetchOrders: async () => {
     set({ loading: true });
     try {
       const response = await api.get('/orders');
-      set({ orders: response.data.orders || [], loading: false });
+      set({ orders: response.data.orders || [], nextCursor: response.data.next_cursor || null, loading: false });
+      return { success: true };
+    } catch (error) {
+      console.error('Failed to fetch orders:', error);
+      set({ loading: false });
+      return { success: false, error: error.response?.data?.error };
+    }
+  },
+  
+  // Append the next page of order summaries
+  fetchMoreOrders: async () => {
+    const cursor = get().nextCursor;
+    if (!cursor) return { success: true };
+    
+    set({ loading: true });
+    try {
+      const response = await api.get('/orders', { params: { cursor } });
+      set((state) => ({
+        orders: [...state.orders, ...(response.data.orders || [])],
+        nextCursor: response.data.next_cursor || null,
+        loading: false
+      }));
       return { success: true };
     } catch (error) {
       console.error('Failed to fetch orders:', error);